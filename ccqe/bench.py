@@ -0,0 +1,296 @@
+"""
+Benchmark harness for the analysis pipeline.
+
+Generates synthetic Python corpora, times each pipeline stage, and writes
+the measurements as JSON. A run can be compared against a saved baseline
+and fails when a stage got slower than the allowed percentage:
+
+    python -m ccqe.bench --output bench.json
+    python -m ccqe.bench --baseline bench.json --max-regression 20
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .cli import analyze_path
+from .feedback import suggestion_from
+from .model import predict_quality
+from .parser import CommentSpan, extract_python_entities
+from .preprocess import PreparedComment, PreparedSource, build_prepared
+from .scorers import available_scorers, load_scorer
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+_WORDS = (
+    "value result config error check count index buffer cache request "
+    "retry timeout user item total offset limit state token path"
+).split()
+
+_REASONS = (
+    "because the upstream API may return partial pages",
+    "so that retries do not duplicate work",
+    "to avoid recomputing the index on every call",
+    "due to a performance issue with large inputs",
+)
+
+
+def _function(rng: random.Random, name: str, comments: int, docstring: bool) -> List[str]:
+    """Generate one function with the given number of inline comments."""
+    a, b = rng.sample(_WORDS, 2)
+    lines = [f"def {name}({a}, {b}=0):"]
+    if docstring:
+        lines.append(f'    """Compute the {a} from {b} {rng.choice(_REASONS)}.')
+        lines.append("")
+        lines.append(f"    The {b} is clamped to zero and one.")
+        lines.append('    """')
+    for i in range(max(1, comments)):
+        if i < comments:
+            if rng.random() < 0.5:
+                lines.append(f"    # increment {a} by one")
+            else:
+                lines.append(f"    # adjust {b} {rng.choice(_REASONS)}")
+        lines.append(f"    {a} += {rng.randint(0, 9)}")
+        lines.append(f"    if {b} == 0:")
+        lines.append(f"        {b} = {a} * 2 / {rng.randint(1, 9)}")
+    lines.append(f"    return {a} - 1")
+    lines.append("")
+    return lines
+
+
+def _module(rng: random.Random, functions: int, comments: int, docstrings: bool) -> str:
+    lines = ['"""Synthetic module used for benchmarking."""', ""]
+    for i in range(functions):
+        lines.extend(_function(rng, f"func_{i}", comments, docstrings))
+    return "\n".join(lines) + "\n"
+
+
+# name -> (number of files, functions per file, comments per function, docstrings)
+CORPORA: Dict[str, Tuple[int, int, int, bool]] = {
+    "many_small": (400, 3, 1, False),
+    "huge_files": (2, 2000, 2, True),
+    "comment_dense": (40, 50, 8, False),
+    "docstring_heavy": (40, 100, 0, True),
+}
+
+
+def generate_corpus(root: Path, name: str, scale: float = 1.0, seed: int = 0) -> List[Path]:
+    """
+    Write the named synthetic corpus under root and return its files.
+
+    scale multiplies the number of files and functions, so small values
+    give quick smoke runs with the same shape.
+    """
+    n_files, n_funcs, n_comments, docstrings = CORPORA[name]
+    n_files = max(1, round(n_files * scale))
+    n_funcs = max(1, round(n_funcs * scale))
+
+    rng = random.Random(f"{name}:{seed}")
+    target = root / name
+    target.mkdir(parents=True, exist_ok=True)
+    files: List[Path] = []
+    for i in range(n_files):
+        path = target / f"mod_{i:04d}.py"
+        path.write_text(_module(rng, n_funcs, n_comments, docstrings), encoding="utf-8")
+        files.append(path)
+    return files
+
+
+def _best_of(repeat: int, fn: Callable[[], Any]) -> Tuple[float, Any]:
+    """Run fn repeat times and return the fastest wall time and its result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, or None if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def bench_corpus(files: List[Path], repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    Time each pipeline stage over the given files.
+
+    Stages are measured separately, each on the output of the previous
+    one, plus an end-to-end analyze_path run over the corpus directory.
+    Every registered scoring backend that loads without a configuration
+    (see ccqe.scorers) is timed on the whole corpus in one batch, as the
+    stage "score[name]".
+    """
+    def extract() -> List[Tuple[List[CommentSpan], str]]:
+        return [extract_python_entities(f) for f in files]
+
+    t_extract, extracted = _best_of(repeat, extract)
+
+    def prepare() -> List[PreparedComment]:
+        out: List[PreparedComment] = []
+        for spans, text in extracted:
+            source = PreparedSource(text)
+            out.extend(build_prepared(span, source) for span in spans)
+        return out
+
+    t_prepare, prepared = _best_of(repeat, prepare)
+    t_score, scores = _best_of(repeat, lambda: [predict_quality(pc) for pc in prepared])
+    t_suggest, _ = _best_of(repeat, lambda: [suggestion_from(q) for q in scores])
+    backends: List[Tuple[str, float]] = []
+    for name in available_scorers():
+        try:
+            scorer = load_scorer(name)
+        except (ImportError, OSError, ValueError):
+            continue
+        seconds, _ = _best_of(repeat, lambda: list(scorer.score_batch(prepared)))
+        backends.append((f"score[{name}]", seconds))
+    t_total, _ = _best_of(repeat, lambda: analyze_path(files[0].parent))
+
+    n_files = len(files)
+    n_comments = len(prepared)
+    stages: Dict[str, Dict[str, float]] = {}
+    for stage, seconds in (
+        ("extract_python_entities", t_extract),
+        ("build_prepared", t_prepare),
+        ("predict_quality", t_score),
+        ("suggestion_from", t_suggest),
+        *backends,
+        ("analyze_path", t_total),
+    ):
+        per_sec = 1.0 / seconds if seconds > 0 else float("inf")
+        stages[stage] = {
+            "seconds": seconds,
+            "files_per_sec": n_files * per_sec,
+            "comments_per_sec": n_comments * per_sec,
+        }
+    return stages
+
+
+def run(
+    corpora: Optional[List[str]] = None,
+    scale: float = 1.0,
+    repeat: int = 3,
+) -> Dict[str, Any]:
+    """
+    Generate and benchmark each corpus, returning a JSON-ready report.
+
+    Peak RSS is a per-process high-water mark, so for each corpus it covers
+    that corpus and every corpus run before it.
+    """
+    report: Dict[str, Any] = {
+        "python": sys.version.split()[0],
+        "scale": scale,
+        "corpora": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="ccqe-bench-") as tmp:
+        for name in corpora or list(CORPORA):
+            files = generate_corpus(Path(tmp), name, scale)
+            report["corpora"][name] = {
+                "files": len(files),
+                "bytes": sum(f.stat().st_size for f in files),
+                "stages": bench_corpus(files, repeat),
+                "peak_rss_bytes": peak_rss_bytes(),
+            }
+    return report
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float
+) -> List[str]:
+    """
+    List the stages whose throughput dropped by more than max_regression percent.
+
+    Throughput is measured in comments per second, so runs at different
+    scales can still be compared. Only corpora and stages present in both
+    reports are checked.
+    """
+    problems: List[str] = []
+    for name, corpus in current["corpora"].items():
+        base = baseline.get("corpora", {}).get(name)
+        if base is None:
+            continue
+        for stage, stats in corpus["stages"].items():
+            base_stats = base["stages"].get(stage)
+            if not base_stats or stats["comments_per_sec"] <= 0:
+                continue
+            slowdown = 100.0 * (base_stats["comments_per_sec"] / stats["comments_per_sec"] - 1.0)
+            if slowdown > max_regression:
+                problems.append(
+                    f"{name}/{stage}: {stats['comments_per_sec']:.1f} vs "
+                    f"{base_stats['comments_per_sec']:.1f} comments/s (+{slowdown:.1f}% time)"
+                )
+    return problems
+
+
+def format_report(report: Dict[str, Any]) -> List[str]:
+    """Render a benchmark report as human-readable lines."""
+    lines: List[str] = []
+    for name, corpus in report["corpora"].items():
+        rss = corpus["peak_rss_bytes"]
+        rss_text = f"{rss / 2**20:.1f} MiB" if rss is not None else "n/a"
+        lines.append(f"{name}: {corpus['files']} files, {corpus['bytes']} bytes, peak RSS {rss_text}")
+        for stage, stats in corpus["stages"].items():
+            lines.append(
+                f"  {stage:<24} {stats['seconds']:8.4f}s "
+                f"{stats['files_per_sec']:10.1f} files/s "
+                f"{stats['comments_per_sec']:12.1f} comments/s"
+            )
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark the ccqe pipeline")
+    ap.add_argument(
+        "--corpus",
+        action="append",
+        choices=sorted(CORPORA),
+        help="Corpus to run (repeatable; default: all)",
+    )
+    ap.add_argument("--scale", type=float, default=1.0, help="Corpus size multiplier")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest counts")
+    ap.add_argument("--output", type=str, default=None, help="Write the JSON report here")
+    ap.add_argument("--baseline", type=str, default=None, help="JSON report to compare against")
+    ap.add_argument(
+        "--max-regression",
+        type=float,
+        default=10.0,
+        help="Allowed per-stage slowdown in percent (default: 10)",
+    )
+    args = ap.parse_args(argv)
+
+    report = run(args.corpus, args.scale, args.repeat)
+    for line in format_report(report):
+        print(line)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        problems = compare(report, baseline, args.max_regression)
+        if problems:
+            print(f"Regressions above {args.max_regression:.1f}%:")
+            for line in problems:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions above {args.max_regression:.1f}%.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import __version__, model, preprocess, scorers
+from .model import QualityScore
+from .parser import CommentSpan
+
+# hashlib and sqlite3 are imported when a cache is used, so that --no-cache
+# runs do without them (see tests/test_startup.py).
+
+# Default location of the cache, relative to the working directory.
+DEFAULT_CACHE_DIR = Path(".ccqe_cache")
+
+# Default location of the token index (see ccqe.tokenindex).
+DEFAULT_INDEX_PATH = DEFAULT_CACHE_DIR / "tokens.sqlite3"
+
+# Upper bound on the stored payload size before least recently used
+# entries are evicted.
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_DB_NAME = "results.sqlite3"
+
+# The current fingerprint(), until a setter of the options it covers
+# calls invalidate_fingerprint.
+_fingerprint: Optional[str] = None
+
+# Bump when span extraction or the stored payload layout changes, so that
+# entries written by older versions are not reused.
+SCHEMA_VERSION = 1
+
+
+def fingerprint() -> str:
+    """
+    Hash everything that influences the cached results.
+
+    This covers the package and cache schema versions, the synonym and
+    intent vocabularies, the scoring rules, the code normalization tables,
+    the context options, the token weights, and the scoring backend in
+    use. Changing any of them produces a new fingerprint, under which no
+    stored result is found.
+
+    The hash is kept until invalidate_fingerprint is called, which the
+    setters (compile_model, set_token_weights, register_rewrite_rule,
+    set_context_options, set_scorer) do; code that changes the tables
+    directly must call it as well.
+    """
+    global _fingerprint
+    if _fingerprint is None:
+        _fingerprint = _compute_fingerprint()
+    return _fingerprint
+
+
+def invalidate_fingerprint() -> None:
+    """Make the next fingerprint() hash the current options again."""
+    global _fingerprint
+    _fingerprint = None
+
+
+def _compute_fingerprint() -> str:
+    weights = model.REDUNDANCY_OPTIONS["weights"]
+    rules = {
+        "version": __version__,
+        "schema": SCHEMA_VERSION,
+        "synonyms": {k: sorted(v) for k, v in sorted(model.SYNONYM_GROUPS.items())},
+        "intent": sorted(model.INTENT_TOKENS),
+        "length": model.LENGTH_BONUSES,
+        "length_default": model.DEFAULT_LENGTH_BONUS,
+        "intent_bonus": model.INTENT_BONUSES,
+        "redundancy": model.REDUNDANCY_PENALTIES,
+        "labels": model.LABEL_THRESHOLDS,
+        "numbers": preprocess.NUMBER_MAP,
+        "operators": preprocess.OPERATOR_PATTERNS,
+        "rewrites": preprocess.EXTRA_REWRITE_RULES,
+        "context": preprocess.CONTEXT_OPTIONS,
+        "weights": weights.digest if weights is not None else None,
+        "scorer": scorers.active_scorer().fingerprint(),
+    }
+    import hashlib
+
+    blob = json.dumps(rules, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def file_digest(path: Path, data: Optional[bytes] = None) -> str:
+    """Return the SHA-256 hex digest of a file's raw bytes (data, if already read)."""
+    import hashlib
+
+    if data is None:
+        data = path.read_bytes()
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk cache of per-file comment spans and quality scores.
+
+    Entries are keyed by the ruleset fingerprint and the SHA-256 of the
+    file content, so renamed or copied files hit the same entry (the path
+    is re-attached on load) and results computed under other settings are
+    never returned. rules is the fingerprint used for lookups and stores;
+    open_cache brings it up to date. The cache is stored in a SQLite
+    database under the given directory; entries of settings no longer in
+    use age out through prune().
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        import sqlite3
+
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # Autocommit with a generous busy timeout: worker processes write
+        # to the same database concurrently.
+        self._db = sqlite3.connect(
+            str(self.directory / _DB_NAME), timeout=30.0, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Tables of the layout keyed by content digest alone.
+        self._db.execute("DROP TABLE IF EXISTS results")
+        self._db.execute("DROP TABLE IF EXISTS meta")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " rules TEXT NOT NULL, digest TEXT NOT NULL, payload TEXT NOT NULL,"
+            " size INTEGER NOT NULL, used REAL NOT NULL,"
+            " PRIMARY KEY (rules, digest))"
+        )
+        self.rules = fingerprint()
+
+    def get(
+        self, digest: str, path: Path
+    ) -> Optional[Tuple[List[CommentSpan], List[QualityScore]]]:
+        """Return the cached spans and scores for a digest, or None on a miss."""
+        key = (self.rules, digest)
+        row = self._db.execute(
+            "SELECT payload FROM entries WHERE rules = ? AND digest = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        self._db.execute(
+            "UPDATE entries SET used = ? WHERE rules = ? AND digest = ?",
+            (time.time(), *key),
+        )
+
+        spans: List[CommentSpan] = []
+        scores: List[QualityScore] = []
+        for rec in json.loads(row[0]):
+            spans.append(
+                CommentSpan(
+                    file=path,
+                    lineno=rec["lineno"],
+                    text=rec["text"],
+                    context=rec["context"],
+                    func=rec["func"],
+                    cls=rec["cls"],
+                    end_lineno=rec.get("end_lineno"),
+                )
+            )
+            scores.append(
+                QualityScore(label=rec["label"], score=rec["score"], signals=rec["signals"])
+            )
+        return spans, scores
+
+    def put(
+        self, digest: str, spans: List[CommentSpan], scores: List[QualityScore]
+    ) -> None:
+        """Store the spans and scores computed for a file digest."""
+        payload = json.dumps(
+            [
+                {
+                    "lineno": span.lineno,
+                    "text": span.text,
+                    "context": span.context,
+                    "func": span.func,
+                    "cls": span.cls,
+                    "end_lineno": span.end_lineno,
+                    "label": q.label,
+                    "score": q.score,
+                    "signals": q.signals,
+                }
+                for span, q in zip(spans, scores)
+            ]
+        )
+        self._db.execute(
+            "INSERT OR REPLACE INTO entries (rules, digest, payload, size, used)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (self.rules, digest, payload, len(payload), time.time()),
+        )
+
+    def prune(self) -> int:
+        """
+        Evict least recently used entries until the cache fits max_bytes.
+
+        Returns the number of evicted entries.
+        """
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+
+        evicted = 0
+        rows = self._db.execute(
+            "SELECT rowid, size FROM entries ORDER BY used ASC, rowid ASC"
+        ).fetchall()
+        for rowid, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE rowid = ?", (rowid,))
+            total -= size
+            evicted += 1
+        return evicted
+
+    def close(self) -> None:
+        self._db.close()
+
+
+# Caches opened by this process, keyed by pid so that connections are
+# never shared with forked worker processes.
+_open_caches: Dict[Tuple[int, str], ResultCache] = {}
+
+
+def open_cache(directory: Path) -> ResultCache:
+    """
+    Return this process's ResultCache for a directory, opening it once.
+
+    The cache's fingerprint is refreshed on every call, so options
+    changed since the last call (context mode, scorer, token weights,
+    synonyms, rewrite rules) never get results stored under the old ones.
+    It is only hashed again after one of them changed (see fingerprint).
+    """
+    key = (os.getpid(), str(directory))
+    cache = _open_caches.get(key)
+    if cache is None:
+        cache = ResultCache(directory)
+        _open_caches[key] = cache
+    else:
+        cache.rules = fingerprint()
+    return cache
@@ -1,14 +1,439 @@
+from __future__ import annotations
+
 import argparse
-from collections import defaultdict
+import os
+import sys
+import time
+from functools import partial
 from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .parser import CommentSpan, extract_python_entities
+from .preprocess import (
+    CONTEXT_MODES,
+    CONTEXT_OPTIONS,
+    EXTRA_REWRITE_RULES,
+    PreparedSource,
+    build_prepared,
+    register_rewrite_rule,
+    set_context_options,
+)
+from .model import (
+    REDUNDANCY_OPTIONS,
+    SYNONYM_GROUPS,
+    QualityScore,
+    compile_model,
+    load_synonym_groups,
+    set_token_weights,
+)
+from .scorers import SCORER_OPTIONS, active_scorer, set_scorer
+from .summary import Summary
+from .results import CommentResult, ResultStore, format_report_line
+from .formats import WRITERS, make_writer, open_output
+from .cache import DEFAULT_CACHE_DIR, DEFAULT_INDEX_PATH, file_digest, open_cache
+from .discover import DiscoveryConfig, iter_python_files, load_config
+from .source import SourceFile
+from .stream import DEFAULT_STREAM_THRESHOLD, stream_file
+
+# Modules only some runs need (process pools, threaded reads, git, the
+# token index, profiling) are imported where they are used, which keeps
+# starting the CLI for a single file fast; tests/test_startup.py tracks it.
+if TYPE_CHECKING:
+    from .profile import Profile
+    from .tokenindex import TokenWeights
+
+# Per-file outcome of _map_files: results, the file's Summary and Profile.
+# Results of streamed files are an iterator, and the Summary and Profile
+# are only complete once it is exhausted.
+FileOutcome = Tuple[Iterable[CommentResult], Summary, Optional["Profile"]]
+
+
+def score_file(
+    file: Path, profile: Optional[Profile] = None, data: Optional[bytes] = None
+) -> Tuple[List[CommentSpan], List[QualityScore]]:
+    """
+    Extract and score every comment in a single file.
+
+    If profile is given, the time spent in each stage and any parsing
+    fallbacks are recorded in it. data, if given, is the file's content
+    as already read from disk; otherwise the file is memory-mapped (see
+    ccqe.source). Comments are scored in one batch by the active backend
+    (see ccqe.scorers).
+    """
+    clock = time.perf_counter
+    on_fallback = None
+    if profile is not None:
+        on_fallback = partial(_record_fallback, profile, file)
+
+    t0 = clock()
+    with SourceFile(file, data) as source_file:
+        spans, _ = extract_python_entities(file, on_fallback, source_file)
+        t1 = clock()
+        source = PreparedSource(source_file)
+        prepared = [build_prepared(span, source) for span in spans]
+        t2 = clock()
+    scores = list(active_scorer().score_batch(prepared))
+    t3 = clock()
+
+    if profile is not None:
+        profile.record("extract_python_entities", t1 - t0)
+        profile.record("build_prepared", t2 - t1, len(spans))
+        profile.record("predict_quality", t3 - t2, len(spans))
+    return spans, scores
+
+
+def _record_fallback(profile: Profile, file: Path, step: str) -> None:
+    profile.record_fallback(step, file)
+
+
+def analyze_file(
+    file: Path,
+    lines: Optional[Set[int]] = None,
+    cache_dir: Optional[Path] = None,
+    profile: bool = False,
+    data: Optional[bytes] = None,
+) -> Tuple[List[CommentResult], Summary, Optional[Profile]]:
+    """
+    Score every comment in a single file.
+
+    Returns the results for the file together with a Summary holding
+    only this file's counters, and a Profile of the file if profile is
+    true (None otherwise). This is the unit of work handed to worker
+    processes, so it must stay a module-level function.
+
+    When lines is given, only comments whose span covers one of those line
+    numbers are reported. When cache_dir is given, files whose content is
+    already in the result cache are not parsed or scored again. data, if
+    given, is the file's content (see ccqe.ingest); otherwise the file is
+    read here.
+    """
+    clock = time.perf_counter
+    file_profile = None
+    if profile:
+        from .profile import Profile
+
+        file_profile = Profile()
+    start = clock()
+
+    if cache_dir is None:
+        spans, scores = score_file(file, file_profile, data)
+    else:
+        t0 = clock()
+        cache = open_cache(cache_dir)
+        digest = file_digest(file, data)
+        cached = cache.get(digest, file)
+        if file_profile is not None:
+            file_profile.record("cache_lookup", clock() - t0)
+        if cached is None:
+            spans, scores = score_file(file, file_profile, data)
+            t0 = clock()
+            cache.put(digest, spans, scores)
+            if file_profile is not None:
+                file_profile.record("cache_store", clock() - t0)
+        else:
+            spans, scores = cached
+
+    results = list(zip(spans, scores))
+    if lines is not None:
+        results = [(span, q) for span, q in results if span.covers(lines)]
+
+    t0 = clock()
+    out: List[CommentResult] = []
+    summary = Summary(files=1 if results else 0)
+    suggest = active_scorer().suggest
+
+    for span, quality in results:
+        suggestion = suggest(quality)
+
+        summary.add(quality, suggestion)
+        out.append(CommentResult(span=span, quality=quality, suggestion=suggestion))
+
+    if file_profile is not None:
+        end = clock()
+        file_profile.record("suggestion_from", end - t0, len(results))
+        size = len(data) if data is not None else file.stat().st_size
+        file_profile.record_file(file, end - start, size)
+    return out, summary, file_profile
+
+
+def _init_worker(
+    groups: Dict[str, Set[str]],
+    rewrite_rules: List[Tuple[str, str]],
+    context_options: Dict[str, object],
+    token_weights: Optional[TokenWeights] = None,
+    scorer_options: Optional[Dict[str, object]] = None,
+) -> None:
+    """
+    Give a pool worker the same synonyms, rewrite rules, context options,
+    token weights and scoring backend as the parent.
+    """
+    compile_model(groups)
+    set_context_options(**context_options)
+    set_token_weights(token_weights)
+    if scorer_options is not None:
+        set_scorer(**scorer_options)
+    for pattern, replacement in rewrite_rules:
+        if (pattern, replacement) not in EXTRA_REWRITE_RULES:
+            register_rewrite_rule(pattern, replacement)
+
+
+def _streams(file: Path, threshold: Optional[int]) -> bool:
+    """True if file is larger than threshold bytes and is analyzed by ccqe.stream."""
+    if not threshold:
+        return False
+    try:
+        return file.stat().st_size > threshold
+    except OSError:
+        return False
+
+
+def _map_files(
+    files: Iterable[Path],
+    jobs: int,
+    cache_dir: Optional[Path] = None,
+    line_sets: Optional[Sequence[Set[int]]] = None,
+    profile: bool = False,
+    io_threads: int = 0,
+    stream_threshold: Optional[int] = None,
+    sources: Optional[Dict[Path, bytes]] = None,
+) -> Iterator[Tuple[Path, FileOutcome]]:
+    """
+    Run analyze_file over files, yielding (file, result) in input order.
+
+    line_sets, when given, holds the changed lines of each file. sources
+    maps files (as spelled in files) to the content to analyze instead of
+    what is on disk, such as the staged version (see ccqe.gitdiff); those
+    files are never streamed.
+
+    Files larger than stream_threshold bytes are analyzed with
+    ccqe.stream.stream_file in this process instead, in bounded memory;
+    their results are an iterator that must be consumed before the next
+    file is taken. None or 0 turns streaming off.
+
+    In a serial run files may be a lazy iterable, so analysis starts while
+    discovery is still walking the tree; io_threads greater than zero
+    reads files ahead of the analysis in that many threads (see
+    ccqe.ingest). With more than one job the files are collected and
+    spread over a process pool; small chunks keep the workers balanced
+    when file sizes vary a lot.
+    """
+    work = partial(analyze_file, cache_dir=cache_dir, profile=profile)
+    stream = partial(stream_file, profile=profile)
+    lines_iter = iter(line_sets) if line_sets is not None else None
+    sources = sources or {}
+
+    if jobs > 1:
+        files = list(files)
+        if len(files) > 1:
+            yield from _map_files_pool(
+                files, jobs, work, line_sets, stream, stream_threshold, sources
+            )
+            return
+
+    if io_threads <= 0:
+        for file in files:
+            lines = next(lines_iter) if lines_iter is not None else None
+            data = sources.get(file)
+            if data is not None:
+                yield file, work(file, lines, data=data)
+            elif _streams(file, stream_threshold):
+                yield file, stream(file, lines)
+            else:
+                yield file, work(file, lines)
+        return
 
-from .parser import extract_python_entities
-from .preprocess import build_prepared
-from .model import predict_quality
-from .feedback import suggestion_from
+    from .ingest import prefetch_sources
 
+    def read(file: Path) -> Optional[bytes]:
+        if file in sources:
+            return sources[file]
+        return None if _streams(file, stream_threshold) else file.read_bytes()
 
-def analyze_path(path: str | Path) -> list[str]:
+    for file, data in prefetch_sources(files, io_threads, read=read):
+        lines = next(lines_iter) if lines_iter is not None else None
+        if data is None:
+            yield file, stream(file, lines)
+        else:
+            yield file, work(file, lines, data=data)
+
+
+def _map_files_pool(
+    files: List[Path],
+    jobs: int,
+    work: partial,
+    line_sets: Optional[Sequence[Set[int]]] = None,
+    stream: Optional[partial] = None,
+    stream_threshold: Optional[int] = None,
+    sources: Optional[Dict[Path, bytes]] = None,
+) -> Iterator[Tuple[Path, FileOutcome]]:
+    """
+    Process pool side of _map_files.
+
+    Files to stream stay in this process and are analyzed in their turn,
+    while the workers go on with the files after them.
+    """
+    sources = sources or {}
+    streamed = {
+        k
+        for k, file in enumerate(files)
+        if file not in sources and _streams(file, stream_threshold)
+    }
+    pooled = [k for k in range(len(files)) if k not in streamed]
+    args: List[Sequence] = [[files[k] for k in pooled]]
+    if line_sets is not None or sources:
+        args.append([line_sets[k] if line_sets is not None else None for k in pooled])
+    if sources:
+        work = partial(_analyze_source, **work.keywords)
+        args.append([sources.get(files[k]) for k in pooled])
+    workers = max(1, min(jobs, len(pooled)))
+    chunksize = max(1, len(pooled) // (workers * 4))
+    # Workers may not inherit this process's state (spawn/forkserver), so
+    # hand them the current synonym groups, rewrite rules, context
+    # options, token weights and scoring backend explicitly.
+    groups = {canon: set(tokens) for canon, tokens in SYNONYM_GROUPS.items()}
+    rules = list(EXTRA_REWRITE_RULES)
+    initargs = (
+        groups, rules, dict(CONTEXT_OPTIONS), REDUNDANCY_OPTIONS["weights"], dict(SCORER_OPTIONS)
+    )
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=initargs
+    ) as pool:
+        outcomes = pool.map(work, *args, chunksize=chunksize)
+        for k, file in enumerate(files):
+            if k in streamed:
+                yield file, stream(file, line_sets[k] if line_sets is not None else None)
+            else:
+                yield file, next(outcomes)
+
+
+def _analyze_source(
+    file: Path, lines: Optional[Set[int]], data: Optional[bytes], **kwargs
+) -> FileOutcome:
+    """analyze_file with data passed by position, for pool.map."""
+    return analyze_file(file, lines, data=data, **kwargs)
+
+
+def _select_changed(root: Path, changed: Dict[Path, Set[int]]) -> Dict[Path, Set[int]]:
+    """
+    Restrict changed files to Python files under root.
+
+    Keys of changed are absolute paths; the returned keys are spelled
+    relative to root the same way a directory walk would produce them.
+    """
+    base = root.resolve()
+    selected: Dict[Path, Set[int]] = {}
+    for file, lines in changed.items():
+        if file.suffix != ".py" or not file.is_file():
+            continue
+        if file == base:
+            selected[root] = lines
+        elif base in file.parents:
+            selected[root / file.relative_to(base)] = lines
+    return selected
+
+
+def iter_results(
+    path: str | Path,
+    jobs: int = 1,
+    cache_dir: Optional[Path] = None,
+    changed: Optional[Dict[Path, Set[int]]] = None,
+    summary: Optional[Summary] = None,
+    profile: Optional[Profile] = None,
+    io_threads: int = 0,
+    discovery: Optional[DiscoveryConfig] = None,
+    stream_threshold: Optional[int] = DEFAULT_STREAM_THRESHOLD,
+    sources: Optional[Dict[Path, bytes]] = None,
+) -> Iterator[CommentResult]:
+    """
+    Analyze all Python files under the given path, yielding results lazily.
+
+    Results for a file are yielded as soon as that file has been analyzed,
+    in the same order as the report. If summary is given, each file's
+    counters are merged into it once its results are yielded, so it is complete
+    once the iterator is exhausted. A Profile passed as profile is filled
+    the same way with per-stage timings (see ccqe.profile); profiling is
+    skipped entirely when it is None.
+
+    When jobs is greater than one, files are analyzed in a process pool.
+    Per-file results are collected in file order and their summaries are
+    merged the same way as in a serial run, so the output is identical.
+
+    When cache_dir is given, results are read from and written to the
+    on-disk result cache in that directory (see ccqe.cache).
+
+    When changed is given (absolute path -> changed line numbers, see
+    ccqe.gitdiff), only those files are parsed and only comments on changed
+    lines are reported and summarized. sources (absolute path -> content,
+    see ccqe.gitdiff.diff_sources) gives the version of a changed file the
+    line numbers refer to when that is not the file on disk.
+
+    When io_threads is greater than zero and the run is serial, files are
+    read concurrently in that many threads while earlier files are being
+    analyzed; the output does not change.
+
+    Files under a directory are found with ccqe.discover, which skips
+    virtualenvs, VCS and build directories and anything in .gitignore;
+    discovery, if given, adds include/exclude globs (see DiscoveryConfig).
+
+    Files larger than stream_threshold bytes (None or 0: no limit) are
+    tokenized and scored incrementally in bounded memory (see
+    ccqe.stream), without the result cache or AST contexts. Their
+    comments are reported in the order the token stream completes them,
+    so a docstring can follow the comments inside its body.
+    """
+    root = Path(path)
+    line_sets: Optional[List[Set[int]]] = None
+    files: Iterable[Path]
+    file_sources: Dict[Path, bytes] = {}
+    if changed is not None:
+        selected = _select_changed(root, changed)
+        files = sorted(selected)
+        line_sets = [selected[f] for f in files]
+        if sources:
+            for f in files:
+                data = sources.get(f.resolve())
+                if data is not None:
+                    file_sources[f] = data
+    elif root.is_file() and root.suffix == ".py":
+        files = [root]
+    else:
+        files = iter_python_files(root, discovery)
+
+    work = _map_files(
+        files,
+        jobs,
+        cache_dir,
+        line_sets,
+        profile is not None,
+        io_threads,
+        stream_threshold,
+        file_sources,
+    )
+    for file, (file_results, file_summary, file_profile) in work:
+        # Streamed files fill their summary and profile as their results
+        # are consumed, so merge those afterwards.
+        yield from file_results
+        if summary is not None:
+            summary.merge(file_summary)
+        if profile is not None and file_profile is not None:
+            profile.merge(file_profile)
+            profile.notify(file, file_profile)
+
+    if cache_dir is not None:
+        open_cache(cache_dir).prune()
+
+
+def analyze_path(
+    path: str | Path,
+    jobs: int = 1,
+    cache_dir: Optional[Path] = None,
+    changed: Optional[Dict[Path, Set[int]]] = None,
+    discovery: Optional[DiscoveryConfig] = None,
+    stream_threshold: Optional[int] = DEFAULT_STREAM_THRESHOLD,
+    sources: Optional[Dict[Path, bytes]] = None,
+) -> list[str]:
     """
     Analyze all Python files under the given path and return report lines.
 
@@ -16,84 +441,140 @@ def analyze_path(path: str | Path) -> list[str]:
     includes file, line number, inferred context, quality label, score,
     and a short suggestion. At the end of the list a summary section is
     appended with aggregate statistics about the run.
-    """
-    root = Path(path)
-    if root.is_file() and root.suffix == ".py":
-        files = [root]
-    else:
-        files = sorted(root.rglob("*.py"))
-
-    lines: list[str] = []
-
-    # Running statistics used to build the summary block
-    seen_files: set[Path] = set()
-    total_comments = 0
-    label_counts: dict[str, int] = defaultdict(int)
-    redundancy_sum = 0.0
-    redundancy_count = 0
-    needs_intent_count = 0
-
-    for file in files:
-        spans, source = extract_python_entities(file)
-        if spans:
-            seen_files.add(file)
-
-        for span in spans:
-            total_comments += 1
-
-            prepared = build_prepared(span, source)
-            quality = predict_quality(prepared)
-            suggestion = suggestion_from(quality)
-
-            label_counts[quality.label] += 1
-
-            # Redundancy is tracked so we can report an average across all comments
-            red = float(quality.signals.get("redundancy", 0.0) or 0.0)
-            redundancy_sum += red
-            redundancy_count += 1
-
-            # Suggestions that ask for "intent" or "reason" highlight places where
-            # comments explain what the code does but not why it exists
-            s_lower = suggestion.lower()
-            if "intent" in s_lower or "reason" in s_lower:
-                needs_intent_count += 1
-
-            ctx = span.func or span.cls or span.file.name
-            lines.append(
-                f"{span.file}: {span.lineno:3d} | {ctx:<15} | "
-                f"{quality.label:<6} | score={quality.score:.2f} | {suggestion}"
-            )
 
-    summary_lines: list[str] = []
-    summary_lines.append("")  # separate the detailed report from the summary
-    summary_lines.append("Summary:")
-    summary_lines.append(f"  Files processed: {len(seen_files)}")
-    summary_lines.append(f"  Comments analyzed: {total_comments}")
-    for label in ("High", "Medium", "Low"):
-        summary_lines.append(f"  {label}: {label_counts.get(label, 0)}")
-
-    if redundancy_count:
-        avg_red = redundancy_sum / redundancy_count
-        summary_lines.append(f"  Avg redundancy: {avg_red:.2f}")
-
-    if total_comments:
-        pct_intent = 100.0 * needs_intent_count / total_comments
-        summary_lines.append(
-            "  Suggestions asking for intent: "
-            f"{needs_intent_count} ({pct_intent:.1f}% of comments)"
+    Results are collected into a compact ResultStore and the report and
+    summary are rendered from it; see iter_results for the options.
+    """
+    store = ResultStore()
+    store.extend(
+        iter_results(
+            path,
+            jobs,
+            cache_dir,
+            changed,
+            discovery=discovery,
+            stream_threshold=stream_threshold,
+            sources=sources,
         )
+    )
+    return list(store.report_lines()) + store.summary().lines()
+
+
+def _default_jobs() -> int:
+    """Number of worker processes to use when --jobs is not given."""
+    return os.cpu_count() or 1
+
+
+def add_model_arguments(ap: argparse.ArgumentParser) -> None:
+    """Add the scoring options, shared by the CLI and ccqe serve."""
+    ap.add_argument(
+        "--synonyms",
+        metavar="FILE",
+        type=str,
+        default=None,
+        help="JSON file with extra synonym groups to merge into the model",
+    )
+    ap.add_argument(
+        "--scorer",
+        metavar="NAME",
+        type=str,
+        default=None,
+        help="Scoring backend: heuristic (default), linear, or one installed "
+        "through the ccqe.scorers entry point group",
+    )
+    ap.add_argument(
+        "--scorer-config",
+        metavar="FILE",
+        type=str,
+        default=None,
+        help="Configuration of the scoring backend, such as the weights file of linear",
+    )
+    ap.add_argument(
+        "--idf-index",
+        metavar="FILE",
+        nargs="?",
+        const=str(DEFAULT_INDEX_PATH),
+        default=None,
+        help="Weigh redundancy by how rare each code token is in the project, "
+        f"using the index built by ccqe index (default FILE: {DEFAULT_INDEX_PATH})",
+    )
+    ap.add_argument(
+        "--context",
+        choices=CONTEXT_MODES,
+        default=None,
+        help="Code compared with each comment: nearby lines (window, default) "
+        "or the statement or body it describes (ast)",
+    )
+    ap.add_argument(
+        "--context-budget",
+        metavar="TOKENS",
+        type=int,
+        default=None,
+        help="With --context ast, maximum code tokens per context (default: 64)",
+    )
 
-    return lines + summary_lines
 
+def apply_model_arguments(ap: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """Apply the options of add_model_arguments; errors are reported by ap."""
+    if args.synonyms is not None:
+        try:
+            compile_model(load_synonym_groups(Path(args.synonyms)))
+        except (OSError, ValueError) as exc:
+            ap.error(f"cannot load synonyms: {exc}")
 
-def main() -> None:
+    if args.scorer is not None or args.scorer_config is not None:
+        config = Path(args.scorer_config) if args.scorer_config is not None else None
+        try:
+            set_scorer(args.scorer or "heuristic", config)
+        except (OSError, ValueError) as exc:
+            ap.error(f"cannot load scorer: {exc}")
+
+    if args.idf_index is not None:
+        from .tokenindex import load_weights
+
+        try:
+            set_token_weights(load_weights(Path(args.idf_index)))
+        except (OSError, ValueError) as exc:
+            ap.error(f"cannot load token index: {exc}")
+
+    try:
+        set_context_options(args.context, args.context_budget)
+    except ValueError as exc:
+        ap.error(str(exc))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     """
     Parse command line arguments, run the analyzer, and print a report.
 
     This function is the user facing entry point when the module is invoked
-    as a script. It accepts a single --path argument and prints either a
-    detailed report or a short message if no comments are found.
+    as a script. It accepts a --path argument plus options for parallelism,
+    caching, file selection, and git diff scoping, and streams the report
+    as files finish.
+
+    "serve" as the first argument starts the scoring daemon instead (see
+    ccqe.server), "merge" combines the partial results of --shard runs
+    (see ccqe.shard), and "index" builds the token index used by
+    --idf-index (see ccqe.tokenindex).
     """
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ["serve"]:
+        from .server import main as serve_main
+
+        serve_main(argv[1:])
+        return
+    if argv[:1] == ["merge"]:
+        from .shard import main as merge_main
+
+        merge_main(argv[1:])
+        return
+    if argv[:1] == ["index"]:
+        from .tokenindex import main as index_main
+
+        index_main(argv[1:])
+        return
+
     ap = argparse.ArgumentParser(
         description="Code Comment Quality Evaluator (prototype)"
     )
@@ -103,17 +584,239 @@ def main() -> None:
         required=True,
         help="Path to a Python file or directory",
     )
-    args = ap.parse_args()
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: all cores)",
+    )
+    ap.add_argument(
+        "--io-threads",
+        metavar="N",
+        type=int,
+        default=0,
+        help="Read files ahead in N threads in a serial run (default: 0, off); "
+        "implies --jobs 1 and cannot be combined with a larger --jobs",
+    )
+    ap.add_argument(
+        "--cache-dir",
+        type=str,
+        default=None,
+        help=f"Directory of the result cache (default: {DEFAULT_CACHE_DIR}; "
+        "not used for a single file unless given)",
+    )
+    ap.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the result cache",
+    )
+    add_model_arguments(ap)
+    ap.add_argument(
+        "--stream-threshold",
+        metavar="BYTES",
+        type=int,
+        default=DEFAULT_STREAM_THRESHOLD,
+        help="Stream files larger than BYTES in bounded memory, without AST "
+        f"or cache (default: {DEFAULT_STREAM_THRESHOLD}; 0: never)",
+    )
+    ap.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print per-stage timings and counters as JSON after the summary",
+    )
+    ap.add_argument(
+        "--exclude",
+        metavar="GLOB",
+        action="append",
+        default=[],
+        help="Skip files and directories matching GLOB (.gitignore syntax; repeatable)",
+    )
+    ap.add_argument(
+        "--include",
+        metavar="GLOB",
+        action="append",
+        default=[],
+        help="Only analyze files matching GLOB (default: *.py; repeatable)",
+    )
+    ap.add_argument(
+        "--no-gitignore",
+        action="store_true",
+        help="Do not skip files listed in .gitignore",
+    )
+    ap.add_argument(
+        "--format",
+        choices=sorted(WRITERS),
+        default="text",
+        help="Output format (default: text)",
+    )
+    ap.add_argument(
+        "--output",
+        metavar="FILE",
+        type=str,
+        default=None,
+        help="Write the report to FILE instead of stdout",
+    )
+    ap.add_argument(
+        "--shard",
+        metavar="I/N",
+        type=str,
+        default=None,
+        help="Analyze only shard I of N and write a partial result file (see ccqe merge)",
+    )
+    ap.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and re-score files as they change",
+    )
+    ap.add_argument(
+        "--watch-interval",
+        metavar="SECONDS",
+        type=float,
+        default=None,
+        help="With --watch, seconds between polls of the tree (default: 0.1)",
+    )
+    scope = ap.add_mutually_exclusive_group()
+    scope.add_argument(
+        "--diff",
+        metavar="REV_RANGE",
+        type=str,
+        default=None,
+        help="Only score comments on lines changed in git diff REV_RANGE",
+    )
+    scope.add_argument(
+        "--staged",
+        action="store_true",
+        help="Only score comments on lines changed in the git index",
+    )
+    args = ap.parse_args(argv)
     path = Path(args.path)
+    jobs = args.jobs if args.jobs is not None else _default_jobs()
+    if args.io_threads > 0:
+        # Read-ahead only runs in this process; with a pool each worker
+        # reads its own files.
+        if jobs > 1 and args.jobs is not None:
+            ap.error("--io-threads needs a serial run; drop --jobs or use --jobs 1")
+        jobs = 1
+    cache_dir = None if args.no_cache else Path(args.cache_dir or DEFAULT_CACHE_DIR)
+    # Opening the cache (and importing sqlite3) costs more than scoring one
+    # file, so a single file is only cached in an explicit --cache-dir.
+    if args.cache_dir is None and path.is_file():
+        cache_dir = None
+
+    apply_model_arguments(ap, args)
+
+    try:
+        discovery = load_config(path)
+    except (OSError, ValueError) as exc:
+        ap.error(f"cannot load [tool.ccqe] settings: {exc}")
+    discovery.include += args.include
+    discovery.exclude += args.exclude
+    if args.no_gitignore:
+        discovery.use_gitignore = False
+
+    if args.shard is not None:
+        if args.watch or args.diff is not None or args.staged or args.format != "text":
+            ap.error("--shard cannot be combined with --watch, --diff, --staged or --format")
+        from .shard import parse_shard, write_partial
+
+        try:
+            shard = parse_shard(args.shard)
+            out = open_output(args.output)
+        except (OSError, ValueError) as exc:
+            ap.error(f"--shard: {exc}")
+        try:
+            write_partial(
+                out, path, shard, jobs, cache_dir, discovery, args.io_threads, args.stream_threshold
+            )
+        finally:
+            if out is sys.stdout:
+                out.flush()
+            else:
+                out.close()
+        return
+
+    if args.watch:
+        if args.diff is not None or args.staged:
+            ap.error("--watch cannot be combined with --diff or --staged")
+        if args.format != "text" or args.output is not None:
+            ap.error("--watch only prints the text dashboard")
+        from .watch import DEFAULT_INTERVAL, watch
 
-    lines = analyze_path(path)
-    if not lines:
-        print("No comments or docstrings found.")
+        interval = args.watch_interval if args.watch_interval is not None else DEFAULT_INTERVAL
+        try:
+            watch(
+                path,
+                discovery,
+                cache_dir,
+                jobs,
+                interval=interval,
+                stream_threshold=args.stream_threshold,
+            )
+        except KeyboardInterrupt:
+            pass
         return
 
-    print("Report:")
-    for line in lines:
-        print(line)
+    changed = None
+    sources = None
+    if args.diff is not None or args.staged:
+        import subprocess
+
+        from .gitdiff import changed_lines, diff_sources
+
+        cwd = path if path.is_dir() else path.parent
+        try:
+            changed = changed_lines(cwd, rev_range=args.diff, staged=args.staged)
+            # Score the version the changed line numbers refer to.
+            sources = diff_sources(cwd, changed, rev_range=args.diff, staged=args.staged)
+        except (OSError, subprocess.CalledProcessError) as exc:
+            detail = getattr(exc, "stderr", None) or str(exc)
+            ap.error(f"git diff failed: {detail.strip()}")
+
+    # Write each result as soon as its file is done instead of waiting for
+    # the whole tree; the summary follows once every file has been seen.
+    summary = Summary()
+    profile = None
+    if args.profile:
+        from .profile import Profile
+
+        profile = Profile()
+    start = time.perf_counter()
+    try:
+        out = open_output(args.output)
+    except OSError as exc:
+        ap.error(f"cannot open output: {exc}")
+    writer = make_writer(args.format, out)
+    try:
+        writer.begin()
+        for result in iter_results(
+            path,
+            jobs=jobs,
+            cache_dir=cache_dir,
+            changed=changed,
+            summary=summary,
+            profile=profile,
+            io_threads=args.io_threads,
+            discovery=discovery,
+            stream_threshold=args.stream_threshold,
+            sources=sources,
+        ):
+            writer.write(result)
+        writer.end(summary)
+    finally:
+        if out is sys.stdout:
+            out.flush()
+        else:
+            out.close()
+
+    if profile is not None:
+        profile.record("total", time.perf_counter() - start)
+        # Keep structured output on stdout parseable.
+        dest = sys.stdout if args.format == "text" and args.output is None else sys.stderr
+        print("", file=dest)
+        import json
+
+        print("Profile:", file=dest)
+        print(json.dumps(profile.to_dict(), indent=2), file=dest)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import ast
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from .parser import CommentSpan
+
+# Statements with a body; a comment inside one is described by the nested
+# statement it sits next to, not by the whole compound statement.
+_COMPOUND = (
+    ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef,
+    ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try,
+    *((ast.TryStar,) if hasattr(ast, "TryStar") else ()),
+    *((ast.Match,) if hasattr(ast, "Match") else ()),
+)
+
+LineRange = Tuple[int, int]
+
+
+class ContextIndex:
+    """
+    Line ranges of the code each comment or docstring describes.
+
+    Built from one ast.parse of a file:
+
+    - an inline comment on a line of a simple statement (a trailing comment,
+      or one inside a multi-line call or literal) maps to that statement;
+    - a comment on a line of its own maps to the next statement, which is
+      usually the code it introduces;
+    - a docstring maps to the rest of the body it documents, from the
+      statement after the docstring to the end of the def, class, or
+      module; a def or class whose body is only the docstring maps to
+      its header.
+
+    Lookups are dictionary hits or a bisection over statement starts, so
+    they cost nothing per comment beyond the single parse.
+    """
+
+    def __init__(self, tree: ast.Module) -> None:
+        self._simple: Dict[int, LineRange] = {}
+        self._docs: Dict[int, LineRange] = {}
+        starts: Dict[int, int] = {}
+
+        def visit_body(owner: Optional[ast.AST], body: List[ast.stmt], header: int) -> None:
+            if not body or not _is_docstring(body[0]):
+                return
+            if len(body) > 1:
+                end = getattr(owner, "end_lineno", None) or body[-1].end_lineno
+                self._docs[header] = (body[1].lineno, end)
+            elif owner is not tree:
+                # Nothing but the docstring: the signature is all the code.
+                self._docs[header] = (header, max(header, body[0].lineno - 1))
+
+        visit_body(tree, tree.body, tree.body[0].lineno if tree.body else 1)
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.stmt):
+                continue
+            end = node.end_lineno or node.lineno
+            # Keep the widest statement per start line (e.g. "x = 1; y = 2"
+            # gives two statements on one line).
+            starts[node.lineno] = max(end, starts.get(node.lineno, end))
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                visit_body(node, node.body, node.lineno)
+            if not isinstance(node, _COMPOUND):
+                for line in range(node.lineno, end + 1):
+                    self._simple.setdefault(line, (node.lineno, end))
+
+        self._starts = sorted(starts)
+        self._ends = [starts[s] for s in self._starts]
+
+    @classmethod
+    def from_source(cls, text: str) -> Optional[ContextIndex]:
+        """Index text, or return None if it does not parse."""
+        try:
+            return cls(ast.parse(text))
+        except (SyntaxError, ValueError):
+            return None
+
+    def range_for(self, span: CommentSpan) -> Optional[LineRange]:
+        """Return the 1-based inclusive line range span describes, if known."""
+        if span.context == "docstring":
+            return self._docs.get(span.lineno)
+        found = self._simple.get(span.lineno)
+        if found is not None:
+            return found
+        k = bisect_right(self._starts, span.lineno)
+        if k < len(self._starts):
+            return self._starts[k], self._ends[k]
+        return None
+
+
+def _is_docstring(node: ast.stmt) -> bool:
+    return (
+        isinstance(node, ast.Expr)
+        and isinstance(node.value, ast.Constant)
+        and isinstance(node.value.value, str)
+    )
@@ -0,0 +1,385 @@
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+# Directories that never hold project sources worth scoring. They are
+# pruned before anything below them is listed; a "!name/" exclude pattern
+# brings one back.
+DEFAULT_EXCLUDES: Tuple[str, ...] = (
+    ".git/",
+    ".hg/",
+    ".svn/",
+    ".venv/",
+    "venv/",
+    "site-packages/",
+    "node_modules/",
+    "__pycache__/",
+    "build/",
+    "dist/",
+    ".tox/",
+    ".nox/",
+    ".mypy_cache/",
+    ".pytest_cache/",
+    ".ruff_cache/",
+    ".ccqe_cache/",
+    "*.egg-info/",
+)
+
+# Files analyzed when no include patterns are given.
+DEFAULT_INCLUDES: Tuple[str, ...] = ("*.py",)
+
+
+def _translate(pattern: str) -> str:
+    """
+    Turn a gitignore-style glob (without "!" or trailing "/") into a regex.
+
+    Patterns without a "/" match a single path component (see
+    IgnoreRule.name_only); the others match the whole relative path.
+    """
+    pattern = pattern.lstrip("/")
+    out: List[str] = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            j = pattern.find("]", i + 2)
+            if j < 0:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = j + 1
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+@dataclass(frozen=True)
+class IgnoreRule:
+    """
+    One gitignore-style pattern.
+
+    name_only rules (patterns without a "/") are matched against the last
+    path component, which is how git applies them at any depth.
+
+    base is the directory the pattern is relative to, as a "/"-terminated
+    path relative to the walk root ("" for the root itself, None for
+    patterns that apply anywhere below the root).
+    """
+
+    regex: re.Pattern
+    negate: bool = False
+    dir_only: bool = False
+    base: Optional[str] = None
+    name_only: bool = False
+
+    @classmethod
+    def parse(cls, line: str, base: Optional[str] = None) -> Optional[IgnoreRule]:
+        """Parse a .gitignore line; blank lines and comments give None."""
+        line = line.rstrip("\n").rstrip()
+        if not line or line.startswith("#"):
+            return None
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+        regex = re.compile(_translate(line) + r"\Z", re.DOTALL)
+        name_only = "/" not in line
+        return cls(regex, negate, dir_only, base, name_only)
+
+    def match(self, rel: str, is_dir: bool) -> bool:
+        """Whether rel (relative to the walk root) matches this rule."""
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not rel.startswith(self.base):
+                return False
+            rel = rel[len(self.base):]
+        if self.name_only:
+            rel = rel[rel.rfind("/") + 1:]
+        return self.regex.match(rel) is not None
+
+
+def _parse_all(patterns: Sequence[str]) -> List[IgnoreRule]:
+    """Parse patterns that apply anywhere below the walk root."""
+    rules = (IgnoreRule.parse(p) for p in patterns)
+    return [rule for rule in rules if rule is not None]
+
+
+def _is_ignored(rules: Sequence[IgnoreRule], rel: str, is_dir: bool) -> bool:
+    """Apply rules in order; as in git, the last matching rule decides."""
+    ignored = False
+    for rule in rules:
+        if ignored == rule.negate and rule.match(rel, is_dir):
+            ignored = not rule.negate
+    return ignored
+
+
+def _read_gitignore(directory: Path, base: str) -> List[IgnoreRule]:
+    """Rules from directory/.gitignore, relative to base ("" if absent)."""
+    try:
+        text = (directory / ".gitignore").read_text(encoding="utf-8", errors="ignore")
+    except OSError:
+        return []
+    rules = (IgnoreRule.parse(line, base) for line in text.splitlines())
+    return [rule for rule in rules if rule is not None]
+
+
+@dataclass(frozen=True)
+class _PrefixedRule(IgnoreRule):
+    """Rule from a .gitignore above the walk root, which is at prefix below it."""
+
+    prefix: str = ""
+
+    def match(self, rel: str, is_dir: bool) -> bool:
+        return super().match(self.prefix + rel, is_dir)
+
+
+def _parent_gitignores(root: Path) -> List[IgnoreRule]:
+    """
+    Rules from .gitignore files above root, up to the enclosing repository.
+
+    Patterns in those files are relative to their own directory, so they
+    are matched against root's path below that directory. Outside a git
+    repository there are none.
+    """
+    here = root.resolve()
+    parents: List[Path] = []
+    for parent in here.parents:
+        parents.append(parent)
+        if (parent / ".git").exists():
+            break
+    else:
+        return []
+
+    rules: List[IgnoreRule] = []
+    for parent in reversed(parents):
+        prefix = here.relative_to(parent).as_posix() + "/"
+        for rule in _read_gitignore(parent, ""):
+            rules.append(
+                _PrefixedRule(rule.regex, rule.negate, rule.dir_only, None, rule.name_only, prefix)
+            )
+    return rules
+
+
+@dataclass
+class DiscoveryConfig:
+    """
+    What to look at below a root directory.
+
+    include globs select files (empty means DEFAULT_INCLUDES); exclude
+    globs prune files and whole directories. Both use .gitignore syntax.
+    Excludes are applied after DEFAULT_EXCLUDES and, when use_gitignore is
+    true, the .gitignore files of the tree, so "!pattern" can undo those.
+
+    Patterns containing a "/" in include and exclude are relative to the
+    walk root; those in project_include and project_exclude (the
+    [tool.ccqe] settings, see load_config) are relative to project_dir,
+    the directory holding pyproject.toml.
+    """
+
+    include: List[str] = field(default_factory=list)
+    exclude: List[str] = field(default_factory=list)
+    use_gitignore: bool = True
+    project_include: List[str] = field(default_factory=list)
+    project_exclude: List[str] = field(default_factory=list)
+    project_dir: Optional[Path] = None
+
+
+def _project_rules(
+    root: Path, project_dir: Optional[Path], patterns: Sequence[str]
+) -> List[IgnoreRule]:
+    """
+    Parse [tool.ccqe] patterns for a walk of root.
+
+    Like the rules of a .gitignore above root, patterns with a "/" are
+    matched against root's path below project_dir. A root outside
+    project_dir (or no project_dir) leaves them relative to root.
+    """
+    rules = _parse_all(patterns)
+    if project_dir is None:
+        return rules
+    here = root.resolve()
+    project_dir = project_dir.resolve()
+    if here == project_dir or project_dir not in here.parents:
+        return rules
+    prefix = here.relative_to(project_dir).as_posix() + "/"
+    return [
+        rule if rule.name_only
+        else _PrefixedRule(rule.regex, rule.negate, rule.dir_only, None, rule.name_only, prefix)
+        for rule in rules
+    ]
+
+
+def find_pyproject(start: Path) -> Optional[Path]:
+    """Return the nearest pyproject.toml at or above start, if any."""
+    here = start.resolve()
+    if not here.is_dir():
+        here = here.parent
+    for directory in (here, *here.parents):
+        candidate = directory / "pyproject.toml"
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def load_config(start: Path) -> DiscoveryConfig:
+    """
+    Read include/exclude settings from the [tool.ccqe] table.
+
+    The nearest pyproject.toml at or above start is used. Recognized keys
+    are include and exclude (lists of globs, relative to the directory of
+    pyproject.toml like the patterns of a .gitignore there) and
+    use-gitignore (bool). A missing file or table, or a Python without a
+    TOML parser, gives the defaults. Raises ValueError if the table is
+    malformed.
+    """
+    config = DiscoveryConfig()
+    pyproject = find_pyproject(start)
+    if pyproject is None:
+        return config
+    try:
+        import tomllib
+    except ImportError:  # Python 3.10
+        try:
+            import tomli as tomllib  # type: ignore[no-redef]
+        except ImportError:
+            return config
+    try:
+        with open(pyproject, "rb") as fh:
+            data = tomllib.load(fh)
+    except tomllib.TOMLDecodeError as exc:
+        raise ValueError(f"{pyproject}: {exc}") from exc
+    table = data.get("tool", {}).get("ccqe", {})
+
+    def globs(key: str) -> List[str]:
+        value = table.get(key, [])
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            raise ValueError(f"{pyproject}: [tool.ccqe] {key} must be a list of strings")
+        return value
+
+    config.project_include = globs("include")
+    config.project_exclude = globs("exclude")
+    config.project_dir = pyproject.parent
+    use_gitignore = table.get("use-gitignore", True)
+    if not isinstance(use_gitignore, bool):
+        raise ValueError(f"{pyproject}: [tool.ccqe] use-gitignore must be a boolean")
+    config.use_gitignore = use_gitignore
+    return config
+
+
+def iter_python_files(root: Path, config: Optional[DiscoveryConfig] = None) -> Iterator[Path]:
+    """
+    Yield the files to analyze below root, lazily and in a stable order.
+
+    The tree is walked depth first with os.scandir, entries of each
+    directory in name order. Excluded directories are pruned before they
+    are listed, so nothing under .git, .venv, node_modules and the like is
+    ever read. Symlinked directories are not followed.
+
+    Paths are spelled as root / relative path, matching a directory walk
+    of root. A root that is a file is yielded as is.
+    """
+    if root.is_file():
+        yield root
+        return
+    for entry in iter_file_entries(root, config):
+        yield Path(entry.path)
+
+
+def iter_file_entries(root: Path, config: Optional[DiscoveryConfig] = None) -> Iterator[os.DirEntry]:
+    """
+    Walk a directory like iter_python_files, yielding os.DirEntry objects.
+
+    This is for callers that rescan large trees often (see ccqe.watch):
+    entries carry their path as a string and cache their stat result, so
+    no Path objects are built for files that turn out to be unchanged.
+    """
+    if config is None:
+        config = DiscoveryConfig()
+
+    rules = _parse_all(DEFAULT_EXCLUDES)
+    if config.use_gitignore:
+        rules.extend(_parent_gitignores(root))
+    project_dir = config.project_dir
+    include_rules = _parse_all(config.include)
+    include_rules += _project_rules(root, project_dir, config.project_include)
+    if not include_rules:
+        include_rules = _parse_all(DEFAULT_INCLUDES)
+    exclude_rules = _parse_all(config.exclude)
+    exclude_rules += _project_rules(root, project_dir, config.project_exclude)
+    # Plain name globs such as the default *.py become one regex applied to
+    # the file name.
+    include_name = None
+    if all(rule.name_only and rule.base is None for rule in include_rules):
+        names = "|".join(f"(?:{r.regex.pattern})" for r in include_rules)
+        include_name = re.compile(names, re.DOTALL).match
+
+    def included(name: str, path: str) -> bool:
+        if include_name is not None:
+            return include_name(name) is not None
+        return any(r.match(path, False) for r in include_rules)
+
+    def walk(directory: str, rel: str, inherited: List[IgnoreRule]) -> Iterator[os.DirEntry]:
+        dir_rules = inherited
+        if config.use_gitignore:
+            local = _read_gitignore(Path(directory), rel)
+            if local:
+                dir_rules = inherited + local
+        active = dir_rules + exclude_rules
+        # Most rules (all the defaults) only name directories; leave them
+        # out of the per-file checks.
+        file_rules = [rule for rule in active if not rule.dir_only]
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return
+
+        for entry in entries:
+            path = rel + entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if not _is_ignored(active, path, True):
+                    yield from walk(entry.path, path + "/", dir_rules)
+            elif (
+                included(entry.name, path)
+                and not _is_ignored(file_rules, path, False)
+                and entry.is_file()
+            ):
+                yield entry
+
+    yield from walk(str(root), "", rules)
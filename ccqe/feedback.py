@@ -1,62 +1,131 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional
+
 from .model import QualityScore
 
 
-def suggestion_from(score: QualityScore) -> str:
+@dataclass(frozen=True)
+class Suggestion:
     """
-    Derive a short, human-readable suggestion from a QualityScore.
+    One entry of the suggestion catalogue.
 
-    The goal is to explain how the comment could be improved (or why it is
-    already good) based on the label and the underlying signals. This keeps
-    the feedback aligned with the model's reasoning rather than returning a
-    bare High/Medium/Low classification.
+    id              : stable identifier, used in summaries and structured output
+    text            : the English suggestion shown in reports
+    category        : what the comment lacks ("keep", "intent", "detail", ...)
+    asks_for_intent : whether the suggestion asks for the intent or reason
+                      behind the code
+    translations    : localized variants of text, by locale
+
+    Entries are created once, in SUGGESTIONS, and shared by every result,
+    so comparing or counting them never touches the text.
     """
-    s = score.signals
+    id: str
+    text: str
+    category: str
+    asks_for_intent: bool
+    translations: Mapping[str, str] = field(default_factory=dict, compare=False, hash=False)
+
+    def render(self, locale: Optional[str] = None) -> str:
+        """Return the text in locale, falling back to English."""
+        if locale is None:
+            return self.text
+        return self.translations.get(locale, self.text)
+
+    def __str__(self) -> str:
+        return self.text
+
+
+# High-quality comments already explain purpose, reasoning, or assumptions.
+# Encourage the developer to keep them as they are.
+KEEP = Suggestion(
+    "keep",
+    "Keep this comment. It explains purpose or reasoning and adds context "
+    "beyond the code.",
+    "keep",
+    False,
+)
+
+# Medium-quality comments are on the right track but often lack either a
+# clear reason/intent or one extra detail about constraints/tradeoffs.
+ADD_INTENT = Suggestion(
+    "add-intent",
+    "Add the reason or intent. Explain why the code exists and note key "
+    "assumptions.",
+    "intent",
+    True,
+)
+ADD_DETAIL = Suggestion(
+    "add-detail",
+    "Add one clarifying detail such as a constraint or tradeoff to "
+    "strengthen the comment.",
+    "detail",
+    False,
+)
+
+# Highly redundant comments just restate the code. Ask for intent,
+# assumptions, or side effects instead of paraphrasing the implementation.
+AVOID_REPEATING = Suggestion(
+    "avoid-repeating",
+    "Avoid repeating the code in words. Focus on intent, assumptions, or "
+    "side effects.",
+    "redundant",
+    True,
+)
+
+# Very short comments lack enough information to be helpful. Ask the
+# developer to expand them to cover purpose and impact of changes.
+EXPAND = Suggestion(
+    "expand",
+    "Expand the comment to explain purpose and what would break if changed.",
+    "too-short",
+    False,
+)
+
+# Generic fallback for remaining low-quality cases: ask for clearer intent
+# and non-obvious constraints.
+CLARIFY = Suggestion(
+    "clarify",
+    "Clarify intent and assumptions. Add what, why, and any non-obvious "
+    "constraints.",
+    "unclear",
+    True,
+)
+
+# The catalogue, by id, in the order categories are listed in summaries.
+SUGGESTIONS: Dict[str, Suggestion] = {
+    s.id: s for s in (KEEP, ADD_INTENT, ADD_DETAIL, AVOID_REPEATING, EXPAND, CLARIFY)
+}
 
-    # High-quality comments already explain purpose, reasoning, or assumptions.
-    # Encourage the developer to keep them as they are.
+
+def suggestion_for(score: QualityScore) -> Suggestion:
+    """
+    Pick the catalogue entry that explains how to improve a comment.
+
+    The choice follows the label and the underlying signals, so the
+    feedback stays aligned with the model's reasoning rather than being a
+    bare High/Medium/Low classification.
+    """
     if score.label == "High":
-        return (
-            "Keep this comment. It explains purpose or reasoning and adds "
-            "context beyond the code."
-        )
+        return KEEP
 
-    # Medium-quality comments are on the right track but often lack either
-    # a clear reason/intent or one extra detail about constraints/tradeoffs.
+    s = score.signals
     if score.label == "Medium":
-        if s["intent_hits"] == 0:
-            return (
-                "Add the reason or intent. Explain why the code exists and "
-                "note key assumptions."
-            )
-        return (
-            "Add one clarifying detail such as a constraint or tradeoff to "
-            "strengthen the comment."
-        )
-
-    # Low-quality comments fall through to here. Use signals to decide
-    # why they are weak and tailor the suggestion accordingly.
-
-    # Highly redundant comments just restate the code. Ask for intent,
-    # assumptions, or side effects instead of paraphrasing the implementation.
-    if s["redundancy"] >= 0.5:
-        return (
-            "Avoid repeating the code in words. Focus on intent, assumptions, "
-            "or side effects."
-        )
+        return ADD_INTENT if s["intent_hits"] == 0 else ADD_DETAIL
 
-    # Very short comments lack enough information to be helpful. Ask the
-    # developer to expand them to cover purpose and impact of changes.
+    # Low-quality comments: use signals to decide why they are weak.
+    if s["redundancy"] >= 0.5:
+        return AVOID_REPEATING
     if s["length"] < 3:
-        return (
-            "Expand the comment to explain purpose and what would break if "
-            "changed."
-        )
-
-    # Generic fallback for remaining low-quality cases: ask for clearer intent
-    # and non-obvious constraints.
-    return (
-        "Clarify intent and assumptions. Add what, why, and any non-obvious "
-        "constraints."
-    )
+        return EXPAND
+    return CLARIFY
+
+
+def suggestion_from(score: QualityScore) -> str:
+    """
+    Derive a short, human-readable suggestion from a QualityScore.
+
+    This is the text of suggestion_for(score).
+    """
+    return suggestion_for(score).text
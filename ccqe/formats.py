@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, IO, Optional, Type
+
+from . import __version__
+from .results import CommentResult, format_report_line
+from .summary import Summary
+
+# Buffer size of output files opened by open_output.
+OUTPUT_BUFFER = 1 << 16
+
+# Shared encoder; compact separators keep JSON Lines output small.
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+SIGNAL_FIELDS = ("length", "intent_hits", "redundancy")
+
+# Scores are written with the decimals of the text report (see
+# ccqe.results.format_line), so every format shows the same value.
+SCORE_DIGITS = 2
+
+CSV_FIELDS = (
+    "file", "lineno", "context", "func", "cls", "label", "score",
+    *SIGNAL_FIELDS, "suggestion", "suggestion_id",
+)
+
+
+def comment_record(result: CommentResult) -> Dict[str, Any]:
+    """Structured form of one scored comment, shared by every output format."""
+    span, quality = result.span, result.quality
+    return {
+        "file": str(span.file),
+        "lineno": span.lineno,
+        "context": span.context,
+        "func": span.func,
+        "cls": span.cls,
+        "label": quality.label,
+        "score": round(quality.score, SCORE_DIGITS),
+        "signals": {name: quality.signals.get(name) for name in SIGNAL_FIELDS},
+        "suggestion": result.suggestion.text,
+        "suggestion_id": result.suggestion.id,
+    }
+
+
+class ReportWriter:
+    """
+    Streams results to a text stream in one output format.
+
+    begin() is called once before the first result, write() for each
+    result as it is produced, and end() with the run's Summary. Nothing is
+    kept per result, so output of any size is written in constant memory.
+    """
+
+    def __init__(self, out: IO[str]) -> None:
+        self.out = out
+
+    def begin(self) -> None:
+        pass
+
+    def write(self, result: CommentResult) -> None:
+        raise NotImplementedError
+
+    def end(self, summary: Summary) -> None:
+        pass
+
+
+class TextWriter(ReportWriter):
+    """The human-readable report printed by default."""
+
+    def begin(self) -> None:
+        self.out.write("Report:\n")
+
+    def write(self, result: CommentResult) -> None:
+        self.out.write(format_report_line(result))
+        self.out.write("\n")
+
+    def end(self, summary: Summary) -> None:
+        self.out.write("\n".join(summary.lines()))
+        self.out.write("\n")
+
+
+class JsonlWriter(ReportWriter):
+    """One JSON object per comment and line; no summary."""
+
+    def write(self, result: CommentResult) -> None:
+        self.out.write(_ENCODER.encode(comment_record(result)))
+        self.out.write("\n")
+
+
+class JsonWriter(ReportWriter):
+    """A single object {"results": [...], "summary": {...}}, streamed."""
+
+    def begin(self) -> None:
+        self.out.write('{"results":[')
+        self._first = True
+
+    def write(self, result: CommentResult) -> None:
+        if not self._first:
+            self.out.write(",")
+        self._first = False
+        self.out.write("\n")
+        self.out.write(_ENCODER.encode(comment_record(result)))
+
+    def end(self, summary: Summary) -> None:
+        self.out.write('\n],"summary":')
+        self.out.write(_ENCODER.encode(summary.to_dict()))
+        self.out.write("}\n")
+
+
+class CsvWriter(ReportWriter):
+    """CSV with a header row; signals are flattened into their own columns."""
+
+    def begin(self) -> None:
+        import csv
+
+        self._writer = csv.writer(self.out, lineterminator="\n")
+        self._writer.writerow(CSV_FIELDS)
+
+    def write(self, result: CommentResult) -> None:
+        span, quality = result.span, result.quality
+        signals = quality.signals
+        self._writer.writerow((
+            span.file, span.lineno, span.context, span.func or "", span.cls or "",
+            quality.label, round(quality.score, SCORE_DIGITS),
+            *(signals.get(name) for name in SIGNAL_FIELDS),
+            result.suggestion.text, result.suggestion.id,
+        ))
+
+
+# SARIF rule per reported label, and the result level it is shown with.
+SARIF_RULES = {
+    "Low": ("ccqe/low-quality-comment", "warning", "Comment adds little beyond the code"),
+    "Medium": ("ccqe/medium-quality-comment", "note", "Comment could explain more"),
+}
+
+
+class SarifWriter(ReportWriter):
+    """
+    SARIF 2.1.0 log for code scanning uploads.
+
+    Low and Medium comments become results (warning and note); High ones
+    need no action and are left out. File URIs are relative to the current
+    directory when possible. The run summary is stored in the run's
+    properties.
+    """
+
+    def begin(self) -> None:
+        rules = [
+            {
+                "id": rule_id,
+                "shortDescription": {"text": text},
+                "defaultConfiguration": {"level": level},
+            }
+            for rule_id, level, text in SARIF_RULES.values()
+        ]
+        driver = {"name": "ccqe", "version": __version__, "rules": rules}
+        head = {
+            "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+            "version": "2.1.0",
+        }
+        # Write everything up to the results array, then stream results.
+        text = _ENCODER.encode(head)[:-1]
+        self.out.write(text)
+        self.out.write(',"runs":[{"tool":{"driver":')
+        self.out.write(_ENCODER.encode(driver))
+        self.out.write('},"results":[')
+        self._first = True
+        self._cwd = Path(os.getcwd()).resolve()
+        self._uris: Dict[Path, str] = {}
+
+    def _uri(self, file: Path) -> str:
+        uri = self._uris.get(file)
+        if uri is None:
+            resolved = file.resolve()
+            try:
+                uri = resolved.relative_to(self._cwd).as_posix()
+            except ValueError:
+                uri = resolved.as_uri()
+            self._uris[file] = uri
+        return uri
+
+    def write(self, result: CommentResult) -> None:
+        quality = result.quality
+        rule = SARIF_RULES.get(quality.label)
+        if rule is None:
+            return
+        rule_id, level, _ = rule
+        span = result.span
+        record = {
+            "ruleId": rule_id,
+            "level": level,
+            "message": {"text": result.suggestion.text},
+            "locations": [{
+                "physicalLocation": {
+                    "artifactLocation": {"uri": self._uri(span.file)},
+                    "region": {"startLine": span.lineno},
+                },
+            }],
+            "properties": {
+                "score": round(quality.score, SCORE_DIGITS),
+                "context": span.context,
+                "suggestion_id": result.suggestion.id,
+                "signals": {name: quality.signals.get(name) for name in SIGNAL_FIELDS},
+            },
+        }
+        if not self._first:
+            self.out.write(",")
+        self._first = False
+        self.out.write("\n")
+        self.out.write(_ENCODER.encode(record))
+
+    def end(self, summary: Summary) -> None:
+        self.out.write('\n],"properties":{"summary":')
+        self.out.write(_ENCODER.encode(summary.to_dict()))
+        self.out.write("}}]}\n")
+
+
+WRITERS: Dict[str, Type[ReportWriter]] = {
+    "text": TextWriter,
+    "jsonl": JsonlWriter,
+    "json": JsonWriter,
+    "csv": CsvWriter,
+    "sarif": SarifWriter,
+}
+
+
+def make_writer(fmt: str, out: IO[str]) -> ReportWriter:
+    """Return the writer for an output format name (a key of WRITERS)."""
+    try:
+        return WRITERS[fmt](out)
+    except KeyError:
+        raise ValueError(f"unknown output format: {fmt}") from None
+
+
+def open_output(path: Optional[str]) -> IO[str]:
+    """Open path for writing with a large buffer; None or "-" means stdout."""
+    if path is None or path == "-":
+        return sys.stdout
+    return open(path, "w", encoding="utf-8", newline="", buffering=OUTPUT_BUFFER)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import re
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+# Hunk header of a unified diff; only the new-file side is needed.
+HUNK_RE = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+def parse_unified_diff(diff: str) -> Dict[str, Set[int]]:
+    """
+    Collect the added or modified line numbers per file from a unified diff.
+
+    Keys are paths relative to the repository root as printed by git.
+    Files that were deleted, and hunks that only remove lines, contribute
+    no line numbers.
+    """
+    changed: Dict[str, Set[int]] = {}
+    current: Optional[Set[int]] = None
+
+    for line in diff.splitlines():
+        if line.startswith("+++ "):
+            target = line[4:].strip()
+            if target.startswith('"') and target.endswith('"'):
+                target = target[1:-1]
+            if target == "/dev/null":
+                current = None
+            else:
+                if target.startswith("b/"):
+                    target = target[2:]
+                current = changed.setdefault(target, set())
+            continue
+
+        m = HUNK_RE.match(line)
+        if m and current is not None:
+            start = int(m.group(1))
+            count = int(m.group(2)) if m.group(2) is not None else 1
+            current.update(range(start, start + count))
+
+    return changed
+
+
+def changed_lines(
+    cwd: Path, rev_range: Optional[str] = None, staged: bool = False
+) -> Dict[Path, Set[int]]:
+    """
+    Run git diff in cwd and return changed line numbers per absolute path.
+
+    With staged=True the index is compared to HEAD; otherwise rev_range is
+    passed to git diff as is (no range means the working tree against the
+    index). Only Python files are considered, and files without added or
+    modified lines are left out.
+
+    Raises subprocess.CalledProcessError if git fails, for example when
+    cwd is not inside a repository.
+    """
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args],
+            cwd=str(cwd),
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+
+    toplevel = Path(git("rev-parse", "--show-toplevel").strip())
+
+    # quotePath=false keeps non-ASCII paths unescaped in the diff headers.
+    cmd: List[str] = [
+        "-c", "core.quotePath=false",
+        "diff", "--unified=0", "--no-color", "--no-ext-diff",
+    ]
+    if staged:
+        cmd.append("--cached")
+    elif rev_range:
+        cmd.append(rev_range)
+    cmd += ["--", "*.py"]
+
+    changed = parse_unified_diff(git(*cmd))
+    return {
+        (toplevel / rel).resolve(): lines
+        for rel, lines in changed.items()
+        if lines
+    }
+
+
+def _new_revision(rev_range: Optional[str], staged: bool) -> Optional[str]:
+    """
+    Where the new side of git diff lives, as a git show prefix.
+
+    ":" is the index, "REV:" a revision, and None the working tree.
+    """
+    if staged:
+        return ":"
+    if not rev_range:
+        return None
+    for sep in ("...", ".."):
+        if sep in rev_range:
+            return (rev_range.split(sep, 1)[1] or "HEAD") + ":"
+    # A single revision is compared with the working tree.
+    return None
+
+
+def diff_sources(
+    cwd: Path,
+    files: Iterable[Path],
+    rev_range: Optional[str] = None,
+    staged: bool = False,
+) -> Dict[Path, bytes]:
+    """
+    Contents the line numbers of changed_lines refer to, where they differ
+    from the working tree.
+
+    With staged=True that is the index, and with a range A..B (or A...B)
+    revision B; keys are the absolute paths of files (as returned by
+    changed_lines) whose working tree copy differs from it, such as a
+    partially staged file. Without either, the new side of the diff is the
+    working tree and the result is empty.
+
+    Raises subprocess.CalledProcessError if git fails.
+    """
+    prefix = _new_revision(rev_range, staged)
+    if prefix is None:
+        return {}
+
+    def git(*args: str) -> bytes:
+        return subprocess.run(
+            ["git", *args], cwd=str(cwd), check=True, capture_output=True
+        ).stdout
+
+    toplevel = Path(git("rev-parse", "--show-toplevel").decode().strip()).resolve()
+    sources: Dict[Path, bytes] = {}
+    for file in files:
+        blob = git("show", prefix + file.relative_to(toplevel).as_posix())
+        try:
+            current = file.read_bytes()
+        except OSError:
+            current = None
+        if blob != current:
+            sources[file] = blob
+    return sources
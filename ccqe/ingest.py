@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Callable, Deque, Iterator, Optional, Sequence, Tuple
+
+# Default number of reader threads.
+DEFAULT_CONCURRENCY = 8
+
+
+async def aiter_sources(
+    files: Sequence[Path],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    prefetch: Optional[int] = None,
+    executor: Optional[ThreadPoolExecutor] = None,
+    read: Callable[[Path], Optional[bytes]] = Path.read_bytes,
+) -> AsyncIterator[Tuple[Path, Optional[bytes]]]:
+    """
+    Read files concurrently and yield (path, bytes) in the order given.
+
+    Reads run in a thread pool with at most concurrency threads. At most
+    prefetch reads (default: twice the concurrency) are in flight or
+    waiting to be consumed, which bounds memory use; a new read is started
+    each time the consumer takes a file. Read errors are raised when the
+    failing file's turn comes.
+
+    read is called in a reader thread to load each file; it may return
+    None for files the consumer will read itself (such as files too large
+    to hold in memory).
+    """
+    loop = asyncio.get_running_loop()
+    window = max(prefetch or 2 * concurrency, 1)
+    own_executor = executor is None
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=max(concurrency, 1), thread_name_prefix="ccqe-read")
+
+    pending: Deque[Tuple[Path, asyncio.Future]] = deque()
+    it = iter(files)
+    try:
+        for path in it:
+            pending.append((path, loop.run_in_executor(executor, read, path)))
+            if len(pending) >= window:
+                break
+        while pending:
+            path, fut = pending.popleft()
+            data = await fut
+            # Refill the window before handing the file to the consumer so
+            # the next reads overlap with its CPU work.
+            for nxt in it:
+                pending.append((nxt, loop.run_in_executor(executor, read, nxt)))
+                break
+            yield path, data
+    finally:
+        for _, fut in pending:
+            fut.cancel()
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def prefetch_sources(
+    files: Sequence[Path],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    prefetch: Optional[int] = None,
+    read: Callable[[Path], Optional[bytes]] = Path.read_bytes,
+) -> Iterator[Tuple[Path, Optional[bytes]]]:
+    """
+    Synchronous front end of aiter_sources for ordinary loops.
+
+    The event loop is only driven while the caller waits for the next
+    file; reads that were already started keep running in their threads
+    while the caller processes the previous one.
+    """
+    loop = asyncio.new_event_loop()
+    agen = aiter_sources(files, concurrency, prefetch, read=read)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
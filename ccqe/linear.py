@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .model import LABEL_THRESHOLDS, QualityBatch, signal_columns
+from .preprocess import PreparedComment
+from .results import LABELS
+from .scorers import Scorer
+
+FEATURES = ("length", "intent_hits", "redundancy")
+LINKS = ("identity", "logistic")
+
+# Used when no weights file is given: a rough linear version of the
+# built-in rules, with features clipped where the rules stop rewarding them.
+DEFAULT_MODEL: Dict[str, Any] = {
+    "intercept": 0.05,
+    "weights": {"length": 0.05, "intent_hits": 0.175, "redundancy": -0.6},
+    "limits": {"length": 6, "intent_hits": 2},
+    "link": "identity",
+    "thresholds": [list(t) for t in LABEL_THRESHOLDS],
+}
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class LinearScorer(Scorer):
+    """
+    Linear model over the same signals as the built-in rules.
+
+    score = link(intercept + sum(weights[f] * min(signal f, limits[f])))
+
+    with link "identity" (clamped to [0, 1]) or "logistic". Labels follow
+    thresholds, a list of [minimum score, label] checked in order, with
+    labels among High, Medium, and Low; lower scores are "Low". Weights
+    usually come from a JSON file with these keys (see from_file);
+    features without a weight count zero.
+    """
+
+    name = "linear"
+
+    def __init__(
+        self,
+        intercept: float,
+        weights: Mapping[str, float],
+        limits: Optional[Mapping[str, float]] = None,
+        link: str = "identity",
+        thresholds: Sequence[Tuple[float, str]] = LABEL_THRESHOLDS,
+    ) -> None:
+        unknown = set(weights) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"unknown features: {', '.join(sorted(unknown))}")
+        if link not in LINKS:
+            raise ValueError(f"unknown link: {link}")
+        self.intercept = float(intercept)
+        self.coef = [float(weights.get(f, 0.0)) for f in FEATURES]
+        limits = limits or {}
+        self.limits = [float(limits.get(f, math.inf)) for f in FEATURES]
+        self.link = link
+        self.thresholds = [(float(m), str(label)) for m, label in thresholds]
+        # Reports, summaries, and feedback only know the built-in labels.
+        unknown = {label for _, label in self.thresholds} - set(LABELS)
+        if unknown:
+            raise ValueError(
+                f"unknown labels: {', '.join(sorted(unknown))} (expected {', '.join(LABELS)})"
+            )
+
+    @classmethod
+    def from_file(cls, path: Optional[Path] = None) -> LinearScorer:
+        """
+        Load a model from a JSON weights file, or DEFAULT_MODEL without one.
+
+        Raises ValueError if the file is not a model as described above,
+        and OSError if it cannot be read.
+        """
+        data = DEFAULT_MODEL if path is None else json.loads(Path(path).read_text(encoding="utf-8"))
+        if not isinstance(data, dict) or not isinstance(data.get("weights"), dict):
+            raise ValueError(f"{path}: expected an object with intercept and weights")
+        limits = data.get("limits")
+        if limits is not None and not isinstance(limits, dict):
+            raise ValueError(f"{path}: limits must be an object")
+        for key, values in (("weights", data["weights"]), ("limits", limits or {})):
+            for name, value in values.items():
+                if not _is_number(value):
+                    raise ValueError(f"{path}: {key}.{name} must be a number")
+        if not _is_number(data.get("intercept", 0.0)):
+            raise ValueError(f"{path}: intercept must be a number")
+        thresholds = data.get("thresholds", LABEL_THRESHOLDS)
+        if not isinstance(thresholds, (list, tuple)) or not all(
+            isinstance(t, (list, tuple)) and len(t) == 2 and _is_number(t[0]) and isinstance(t[1], str)
+            for t in thresholds
+        ):
+            raise ValueError(f"{path}: thresholds must be a list of [minimum score, label] pairs")
+        return cls(
+            data.get("intercept", 0.0),
+            data["weights"],
+            limits,
+            data.get("link", "identity"),
+            thresholds,
+        )
+
+    def _score(self, features: Tuple[float, ...]) -> float:
+        z = self.intercept
+        for x, w, cap in zip(features, self.coef, self.limits):
+            z += w * min(x, cap)
+        if self.link == "logistic":
+            return 1.0 / (1.0 + math.exp(-z)) if z > -700 else 0.0
+        return max(0.0, min(1.0, z))
+
+    def _label(self, score: float) -> str:
+        for min_score, name in self.thresholds:
+            if score >= min_score:
+                return name
+        return "Low"
+
+    def score_batch(self, prepared: Sequence[PreparedComment]) -> QualityBatch:
+        length, intent_hits, redundancy = signal_columns(prepared)
+        scores = [self._score(row) for row in zip(length, intent_hits, redundancy)]
+        labels: List[str] = [self._label(s) for s in scores]
+        return QualityBatch(
+            labels=labels,
+            scores=scores,
+            length=length,
+            intent_hits=intent_hits,
+            redundancy=[round(r, 2) for r in redundancy],
+        )
+
+    def fingerprint(self) -> Any:
+        return [self.name, self.intercept, self.coef, self.limits, self.link, self.thresholds]
@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import json
+import math
 from dataclasses import dataclass
-from typing import Dict, List, Any, Set
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Any, Mapping, Optional, Sequence, Set, Tuple
 
 from .preprocess import PreparedComment, tokenize_text
 
+if TYPE_CHECKING:
+    from .tokenindex import TokenWeights
+
 
 # Groups of words that represent the same conceptual signal.
 # Mapping these to canonical tokens lets the model detect redundancy
@@ -63,6 +69,57 @@ SYNONYM_GROUPS: Dict[str, set[str]] = {
 }
 
 
+# Flat token -> canonical concept table derived from SYNONYM_GROUPS, so
+# each lookup is a single dict access instead of a scan over all groups.
+_CANONICAL: Dict[str, str] = {}
+
+
+def compile_model(groups: Optional[Mapping[str, Iterable[str]]] = None) -> None:
+    """
+    Build the synonym lookup table used by canonical_token.
+
+    If groups is given, it is merged into SYNONYM_GROUPS first: tokens are
+    added to existing groups with the same canonical name, and new names
+    become new groups. When a token appears in several groups, the first
+    group in SYNONYM_GROUPS order wins, as it did with the linear scan.
+    Merging the same groups twice has no further effect.
+    """
+    if groups:
+        for canon, tokens in groups.items():
+            SYNONYM_GROUPS.setdefault(canon, set()).update(t.lower() for t in tokens)
+    _build_canonical()
+
+    from .cache import invalidate_fingerprint
+
+    invalidate_fingerprint()
+
+
+def _build_canonical() -> None:
+    table: Dict[str, str] = {}
+    for canon, group in SYNONYM_GROUPS.items():
+        for tok in group:
+            table.setdefault(tok, canon)
+    _CANONICAL.clear()
+    _CANONICAL.update(table)
+
+
+def load_synonym_groups(path: Path) -> Dict[str, Set[str]]:
+    """
+    Read extra synonym groups from a JSON file.
+
+    The file maps a canonical token to a list of surface forms, for example
+    {"fetch": ["fetch", "download", "retrieve"]}. Raises ValueError if it
+    is not such an object.
+    """
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object of synonym groups")
+    for canon, tokens in data.items():
+        if not isinstance(tokens, list) or not all(isinstance(t, str) for t in tokens):
+            raise ValueError(f"{path}: synonyms of {canon!r} must be a list of strings")
+    return {canon: set(tokens) for canon, tokens in data.items()}
+
+
 def canonical_token(tok: str) -> str:
     """
     Map a token to a canonical concept if it appears in a synonym group.
@@ -71,15 +128,16 @@ def canonical_token(tok: str) -> str:
     to be treated as the same concept when computing redundancy.
     """
     t = tok.lower()
-    for canon, group in SYNONYM_GROUPS.items():
-        if t in group:
-            return canon
-    return t
+    return _CANONICAL.get(t, t)
 
 
 def canonicalize_tokens(tokens: List[str]) -> List[str]:
     """Apply canonical_token to a sequence of tokens."""
-    return [canonical_token(t) for t in tokens]
+    lookup = _CANONICAL.get
+    return [lookup(t, t) for t in map(str.lower, tokens)]
+
+
+_build_canonical()
 
 
 # Tokens that suggest the comment is explaining intent, rationale, or
@@ -91,6 +149,44 @@ INTENT_TOKENS: Set[str] = {
 }
 
 
+# How the redundancy signal is computed (see set_token_weights):
+#   weights : IDF weights of code tokens from a project index (see
+#             ccqe.tokenindex); None compares plain token sets (jaccard)
+REDUNDANCY_OPTIONS: Dict[str, Any] = {"weights": None}
+
+
+def set_token_weights(weights: Optional[TokenWeights]) -> None:
+    """
+    Use weighted overlap for the redundancy of every comment scored afterwards.
+
+    With weights, tokens that occur in most files of the project (such as
+    self or value) count for less than rare ones; None restores jaccard.
+    """
+    REDUNDANCY_OPTIONS["weights"] = weights
+
+    from .cache import invalidate_fingerprint
+
+    invalidate_fingerprint()
+
+
+# Scoring rules used by predict_quality. Each table is checked top to
+# bottom and the first matching row applies. Keeping them as data makes
+# it possible to fingerprint the ruleset (see ccqe.cache).
+
+# (minimum comment length, score bonus); shorter comments get the default.
+LENGTH_BONUSES = ((6, 0.35), (3, 0.20))
+DEFAULT_LENGTH_BONUS = 0.05
+
+# (minimum intent hits, score bonus)
+INTENT_BONUSES = ((2, 0.35), (1, 0.20))
+
+# (redundancy strictly above, score penalty)
+REDUNDANCY_PENALTIES = ((0.5, 0.30), (0.3, 0.15))
+
+# (minimum score, label); lower scores are labeled "Low".
+LABEL_THRESHOLDS = ((0.7, "High"), (0.4, "Medium"))
+
+
 @dataclass
 class QualityScore:
     """
@@ -119,17 +215,21 @@ def jaccard(a: Set[str], b: Set[str]) -> float:
     return inter / union
 
 
-def predict_quality(pc: PreparedComment) -> QualityScore:
+def weighted_overlap(a: Set[str], b: Set[str], weight: Callable[[str], float]) -> float:
     """
-    Score a PreparedComment and assign a High/Medium/Low quality label.
+    Jaccard similarity with every token counted by its weight.
 
-    The model combines three signals:
-      - length: longer comments are more likely to carry useful context
-      - intent_hits: presence of rationale-oriented words
-      - redundancy: lexical/semantic overlap with the nearby code
-
-    High redundancy lowers the score, while length and intent raise it.
+    Sums are exact (math.fsum), so the result does not depend on the
+    iteration order of the sets.
     """
+    union = math.fsum(map(weight, a | b))
+    if not union:
+        return 0.0
+    return math.fsum(map(weight, a & b)) / union
+
+
+def _signals(pc: PreparedComment) -> Tuple[int, int, float]:
+    """Compute the (length, intent_hits, redundancy) signals of a comment."""
     # Comment tokens are already normalized by the preprocessing step.
     comment_tokens = pc.tokens
 
@@ -146,39 +246,74 @@ def predict_quality(pc: PreparedComment) -> QualityScore:
     intent_hits = len(text_token_set & INTENT_TOKENS)
 
     length = len(comment_tokens)
-    redundancy = jaccard(comment_tokens_canon, code_tokens_canon)
+    weights = REDUNDANCY_OPTIONS["weights"]
+    if weights is None:
+        redundancy = jaccard(comment_tokens_canon, code_tokens_canon)
+    else:
+        redundancy = weighted_overlap(comment_tokens_canon, code_tokens_canon, weights.weight)
+    return length, intent_hits, redundancy
+
 
+def signal_columns(prepared: Sequence[PreparedComment]) -> Tuple[List[int], List[int], List[float]]:
+    """
+    Compute the length, intent_hits and redundancy signals of many comments.
+
+    Returns one list per signal, in the order of prepared; redundancy is
+    not rounded. Scoring backends other than the built-in rules start
+    from these (see ccqe.scorers).
+    """
+    rows = [_signals(pc) for pc in prepared]
+    return [r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows]
+
+
+def _score_and_label(length: int, intent_hits: int, redundancy: float) -> Tuple[float, str]:
+    """Apply the scoring rules to one comment's signals."""
     score = 0.0
 
     # Reward comments that are long enough to say something meaningful.
-    if length >= 6:
-        score += 0.35
-    elif length >= 3:
-        score += 0.20
+    for min_length, bonus in LENGTH_BONUSES:
+        if length >= min_length:
+            score += bonus
+            break
     else:
-        score += 0.05
+        score += DEFAULT_LENGTH_BONUS
 
     # Reward comments that mention intent, rationale, or constraints.
-    if intent_hits >= 2:
-        score += 0.35
-    elif intent_hits == 1:
-        score += 0.20
+    for min_hits, bonus in INTENT_BONUSES:
+        if intent_hits >= min_hits:
+            score += bonus
+            break
 
     # Penalize comments that closely mirror the code they sit next to.
-    if redundancy > 0.5:
-        score -= 0.30
-    elif redundancy > 0.3:
-        score -= 0.15
+    for limit, penalty in REDUNDANCY_PENALTIES:
+        if redundancy > limit:
+            score -= penalty
+            break
 
     # Clamp score into [0.0, 1.0] so labels have a stable scale.
     score = max(0.0, min(1.0, score))
 
-    if score >= 0.7:
-        label = "High"
-    elif score >= 0.4:
-        label = "Medium"
-    else:
-        label = "Low"
+    label = "Low"
+    for min_score, name in LABEL_THRESHOLDS:
+        if score >= min_score:
+            label = name
+            break
+    return score, label
+
+
+def predict_quality(pc: PreparedComment) -> QualityScore:
+    """
+    Score a PreparedComment and assign a High/Medium/Low quality label.
+
+    The model combines three signals:
+      - length: longer comments are more likely to carry useful context
+      - intent_hits: presence of rationale-oriented words
+      - redundancy: lexical/semantic overlap with the nearby code
+
+    High redundancy lowers the score, while length and intent raise it.
+    """
+    length, intent_hits, redundancy = _signals(pc)
+    score, label = _score_and_label(length, intent_hits, redundancy)
 
     return QualityScore(
         label=label,
@@ -189,3 +324,186 @@ def predict_quality(pc: PreparedComment) -> QualityScore:
             "redundancy": round(redundancy, 2),
         },
     )
+
+
+@dataclass
+class QualityBatch:
+    """
+    Columnar result of scoring a batch of comments.
+
+    Column i of every list belongs to the i-th comment of the batch.
+    redundancy is rounded to two decimals, like QualityScore.signals.
+    Indexing or iterating yields QualityScore objects built on demand.
+    """
+    labels: List[str]
+    scores: List[float]
+    length: List[int]
+    intent_hits: List[int]
+    redundancy: List[float]
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __getitem__(self, i: int) -> QualityScore:
+        return QualityScore(
+            label=self.labels[i],
+            score=self.scores[i],
+            signals={
+                "length": self.length[i],
+                "intent_hits": self.intent_hits[i],
+                "redundancy": self.redundancy[i],
+            },
+        )
+
+    def __iter__(self) -> Iterator[QualityScore]:
+        return (self[i] for i in range(len(self)))
+
+
+# Batches smaller than this are scored in pure Python even when NumPy is
+# available: tokenizing the code context dominates either way, and array
+# setup only pays for itself on batches of several thousand comments.
+NUMPY_MIN_BATCH = 4096
+
+_np: Any = None
+
+
+def _numpy() -> Any:
+    """Import NumPy on first use; returns None if it is not installed."""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _np = numpy
+    return _np or None
+
+
+def predict_quality_batch(
+    prepared: Sequence[PreparedComment], use_numpy: Optional[bool] = None
+) -> QualityBatch:
+    """
+    Score many PreparedComments at once and return a columnar result.
+
+    With NumPy, tokens are interned into an integer vocabulary and the
+    set overlaps, intent hits, and score/label thresholds are computed
+    for the whole batch with array operations. Without it (or for small
+    batches when use_numpy is None) the scalar rules are applied row by
+    row. Both paths agree exactly with predict_quality. Token weights (see
+    set_token_weights) are only applied by the scalar rules, so the
+    batch is scored row by row while they are set.
+    """
+    # Importing NumPy costs more than scoring a small file, so it is only
+    # done once the array path is known to run.
+    np = None
+    if use_numpy or (use_numpy is None and len(prepared) >= NUMPY_MIN_BATCH):
+        np = _numpy()
+    if use_numpy and np is None:
+        raise RuntimeError("NumPy is not installed")
+    if REDUNDANCY_OPTIONS["weights"] is not None:
+        np = None
+
+    if np is None:
+        length, intent_hits, redundancy = signal_columns(prepared)
+        scored = [_score_and_label(*r) for r in zip(length, intent_hits, redundancy)]
+        scores = [sc for sc, _ in scored]
+        labels = [lb for _, lb in scored]
+    else:
+        length, intent_hits, redundancy, scores, labels = _score_batch_numpy(np, prepared)
+
+    return QualityBatch(
+        labels=labels,
+        scores=scores,
+        length=length,
+        intent_hits=intent_hits,
+        redundancy=[round(r, 2) for r in redundancy],
+    )
+
+
+def _score_batch_numpy(np: Any, prepared: Sequence[PreparedComment]) -> Tuple[list, list, list, list, list]:
+    n = len(prepared)
+
+    # Gather all tokens into flat lists; the only per-comment Python work
+    # is tokenizing the code context and canonicalizing.
+    raw_tokens: List[str] = []
+    com_tokens: List[str] = []
+    code_tokens: List[str] = []
+    length: List[int] = []
+    code_counts: List[int] = []
+    for pc in prepared:
+        raw_tokens.extend(pc.tokens)
+        com_tokens.extend(canonicalize_tokens(pc.tokens))
+        code = canonicalize_tokens(tokenize_text(pc.code_context))
+        code_tokens.extend(code)
+        length.append(len(pc.tokens))
+        code_counts.append(len(code))
+
+    # Intern every token into an integer vocabulary.
+    all_tokens = raw_tokens + com_tokens + code_tokens
+    vocab = {tok: i for i, tok in enumerate(dict.fromkeys(all_tokens))}
+    ids = np.fromiter(map(vocab.__getitem__, all_tokens), dtype=np.int64, count=len(all_tokens))
+    width = max(len(vocab), 1)
+    is_intent = np.zeros(width, dtype=bool)
+    is_intent[[vocab[t] for t in INTENT_TOKENS if t in vocab]] = True
+
+    rows = np.arange(n, dtype=np.int64)
+    comment_rows = np.repeat(rows, length)
+    code_rows = np.repeat(rows, code_counts)
+    n_raw = len(raw_tokens)
+    raw_ids = ids[:n_raw]
+    com_ids = ids[n_raw:2 * n_raw]
+    code_ids = ids[2 * n_raw:]
+
+    def key_set(row_ids: Any, token_ids: Any) -> Any:
+        # One key per (row, token) pair, sorted and deduplicated, so each
+        # row's token list becomes a set.
+        keys = np.sort(row_ids * width + token_ids)
+        if keys.size:
+            keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        return keys
+
+    raw = key_set(comment_rows, raw_ids)
+    com = key_set(comment_rows, com_ids)
+    code = key_set(code_rows, code_ids)
+
+    hits = np.bincount(raw[is_intent[raw % width]] // width, minlength=n)
+    # Keys present in both sorted sets are the per-row intersections.
+    pos = np.minimum(np.searchsorted(code, com), max(code.size - 1, 0))
+    shared = code[pos] == com if code.size else np.zeros(com.size, dtype=bool)
+    inter = np.bincount(com[shared] // width, minlength=n)
+    union = (
+        np.bincount(com // width, minlength=n)
+        + np.bincount(code // width, minlength=n)
+        - inter
+    )
+    # Jaccard is 0.0 for two empty sets; otherwise union is at least one.
+    redundancy = np.where(union > 0, inter / np.maximum(union, 1), 0.0)
+
+    length_arr = np.asarray(length, dtype=np.int64)
+    score = np.select(
+        [length_arr >= m for m, _ in LENGTH_BONUSES],
+        [b for _, b in LENGTH_BONUSES],
+        DEFAULT_LENGTH_BONUS,
+    )
+    score = score + np.select(
+        [hits >= m for m, _ in INTENT_BONUSES], [b for _, b in INTENT_BONUSES], 0.0
+    )
+    score = score - np.select(
+        [redundancy > lim for lim, _ in REDUNDANCY_PENALTIES],
+        [p for _, p in REDUNDANCY_PENALTIES],
+        0.0,
+    )
+    score = np.clip(score, 0.0, 1.0)
+    labels = np.select(
+        [score >= m for m, _ in LABEL_THRESHOLDS],
+        [name for _, name in LABEL_THRESHOLDS],
+        "Low",
+    )
+
+    return (
+        length,
+        hits.tolist(),
+        redundancy.tolist(),
+        score.tolist(),
+        labels.tolist(),
+    )
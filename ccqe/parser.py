@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-import ast
 import tokenize
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Callable, Iterator, List, Optional, Set, Tuple, Union
+
+from .source import SourceFile
 
 
 @dataclass
@@ -18,6 +19,8 @@ class CommentSpan:
     context : "inline" for line comments, "docstring" for docstrings
     func    : name of the enclosing function, if any
     cls     : name of the enclosing class, if any
+    end_lineno : last line covered by a docstring, including the def/class
+                 header it documents; None for inline comments
     """
     file: Path
     lineno: int
@@ -25,104 +28,341 @@ class CommentSpan:
     context: str  # "inline" or "docstring"
     func: Optional[str] = None
     cls: Optional[str] = None
+    end_lineno: Optional[int] = None
+
+    def covers(self, lines: Set[int]) -> bool:
+        """Return True if any of the given line numbers falls in this span."""
+        last = self.end_lineno if self.end_lineno is not None else self.lineno
+        return any(n in lines for n in range(self.lineno, last + 1))
+
+
+# Tokens that never start a statement; skipped while looking for the
+# first statement of a module or of a def/class body.
+_NON_STATEMENT = {
+    tokenize.NL,
+    tokenize.NEWLINE,
+    tokenize.COMMENT,
+    tokenize.INDENT,
+    tokenize.DEDENT,
+    tokenize.ENCODING,
+}
+
+
+def _string_prefix(token: str) -> str:
+    """Return the lowercase prefix (r, u, b, f, ...) of a string literal token."""
+    i = 0
+    while i < len(token) and token[i] not in "'\"":
+        i += 1
+    return token[:i].lower()
+
+
+# (kind, name, lineno) of a def/class header; kind is "def", "class" or
+# "module", with the module acting as the header of the whole file.
+_Header = Tuple[str, Optional[str], int]
+
+
+@dataclass
+class _Candidate:
+    """A statement that may turn out to be a docstring."""
+    header: _Header
+    first_line: int
+    strings: List[tokenize.TokenInfo] = field(default_factory=list)
+    parens: int = 0
+    last_line: int = 0
+
+
+class _TokenScanner:
+    """
+    Collect inline comments and docstrings from a single token stream.
+
+    Comments are plain COMMENT tokens. A docstring is a statement made of
+    string literals only (optionally parenthesized) that comes first in
+    the module or directly after a def/class header, which is what
+    ast.get_docstring recognizes.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.inline: List[CommentSpan] = []
+        self.docstrings: List[CommentSpan] = []
+
+        # Header whose body has not started yet.
+        self._expect_body: Optional[_Header] = ("module", None, 0)
+        # def/class header being read, waiting for its ":" at bracket depth 0.
+        self._header: Optional[_Header] = None
+        self._depth = 0
+        self._prev: Optional[tokenize.TokenInfo] = None
+        self._candidate: Optional[_Candidate] = None
+
+    def feed(self, tok: tokenize.TokenInfo) -> None:
+        """Process the next token of the stream."""
+        if tok.type == tokenize.COMMENT:
+            text = tok.string.lstrip("#").strip()
+            if text:
+                self.inline.append(
+                    CommentSpan(
+                        file=self.path,
+                        lineno=tok.start[0],
+                        text=text,
+                        context="inline",
+                    )
+                )
+
+        if self._candidate is not None:
+            self._feed_candidate(tok)
+        elif self._expect_body is not None and tok.type not in _NON_STATEMENT:
+            header = self._expect_body
+            self._expect_body = None
+            if tok.type == tokenize.STRING or (tok.type == tokenize.OP and tok.string == "("):
+                self._candidate = _Candidate(header=header, first_line=tok.start[0])
+                self._feed_candidate(tok)
+
+        self._track_headers(tok)
+        if tok.type not in _NON_STATEMENT:
+            self._prev = tok
+
+    def _feed_candidate(self, tok: tokenize.TokenInfo) -> None:
+        cand = self._candidate
+        if tok.type in (tokenize.NL, tokenize.COMMENT):
+            return
+        if tok.type == tokenize.OP and tok.string == "(" and not cand.strings:
+            cand.parens += 1
+            return
+        if tok.type == tokenize.STRING:
+            cand.strings.append(tok)
+            cand.last_line = tok.end[0]
+            return
+        if tok.type == tokenize.OP and tok.string == ")" and cand.parens and cand.strings:
+            cand.parens -= 1
+            cand.last_line = tok.end[0]
+            return
+
+        # Any other token ends the statement or shows it is not a plain
+        # string literal.
+        self._candidate = None
+        ends_statement = (
+            tok.type in (tokenize.NEWLINE, tokenize.ENDMARKER)
+            or (tok.type == tokenize.OP and tok.string == ";")
+        )
+        if ends_statement and cand.strings and cand.parens == 0:
+            self._add_docstring(cand)
+
+    def _add_docstring(self, cand: _Candidate) -> None:
+        strings = cand.strings
+        # Bytes and f-strings are not docstrings.
+        if any(set(_string_prefix(t.string)) & {"b", "f"} for t in strings):
+            return
+        import ast
+
+        try:
+            value = ast.literal_eval(" ".join(t.string for t in strings))
+        except (ValueError, SyntaxError):
+            return
+        if not isinstance(value, str):
+            return
+
+        import inspect
+
+        text = inspect.cleandoc(value)
+        if not text:
+            return
+
+        kind, name, lineno = cand.header
+        self.docstrings.append(
+            CommentSpan(
+                file=self.path,
+                lineno=cand.first_line if kind == "module" else lineno,
+                text=text,
+                context="docstring",
+                func=name if kind == "def" else None,
+                cls=name if kind == "class" else None,
+                end_lineno=cand.last_line,
+            )
+        )
+
+    def _track_headers(self, tok: tokenize.TokenInfo) -> None:
+        if tok.type == tokenize.NAME and tok.string in ("def", "class") and self._header is None:
+            # A FunctionDef's lineno is that of "async" for async functions.
+            lineno = tok.start[0]
+            prev = self._prev
+            if tok.string == "def" and prev is not None and prev.string == "async":
+                lineno = prev.start[0]
+            self._header = (tok.string, None, lineno)
+            self._depth = 0
+            return
+
+        if self._header is None:
+            return
+        kind, name, lineno = self._header
+        if tok.type == tokenize.NAME and name is None:
+            self._header = (kind, tok.string, lineno)
+        elif tok.type == tokenize.OP:
+            if tok.string in ("(", "[", "{"):
+                self._depth += 1
+            elif tok.string in (")", "]", "}"):
+                self._depth -= 1
+            elif tok.string == ":" and self._depth == 0:
+                self._header = None
+                self._expect_body = (kind, name, lineno)
+
+
+def _docstrings_from_ast(
+    path: Path, src: str, on_fallback: Optional[Callable[[str], None]] = None
+) -> List[CommentSpan]:
+    """
+    Extract docstrings with ast.parse, used when tokenization fails.
 
+    Returns an empty list if the source cannot be parsed either.
+    """
+    import ast
+
+    doc_spans: List[CommentSpan] = []
+    try:
+        tree = ast.parse(src)
+    except Exception:
+        # If parsing fails (for example due to syntax errors), fall back
+        # to inline comments only.
+        if on_fallback is not None:
+            on_fallback("ast_parse")
+        return doc_spans
+
+    # Module docstring, if present.
+    mdoc = ast.get_docstring(tree, clean=True)
+    if mdoc:
+        first = tree.body[0].lineno if tree.body else 1
+        doc_spans.append(
+            CommentSpan(
+                file=path,
+                lineno=first,
+                text=mdoc,
+                context="docstring",
+                end_lineno=tree.body[0].end_lineno,
+            )
+        )
 
-def extract_python_entities(path: Path) -> Tuple[List[CommentSpan], str]:
+    # Function, async function, and class docstrings discovered by walking the AST.
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            d = ast.get_docstring(node, clean=True)
+            if d:
+                doc_spans.append(
+                    CommentSpan(
+                        file=path,
+                        lineno=node.lineno,
+                        text=d,
+                        context="docstring",
+                        func=node.name,
+                        end_lineno=node.body[0].end_lineno,
+                    )
+                )
+        elif isinstance(node, ast.ClassDef):
+            d = ast.get_docstring(node, clean=True)
+            if d:
+                doc_spans.append(
+                    CommentSpan(
+                        file=path,
+                        lineno=node.lineno,
+                        text=d,
+                        context="docstring",
+                        cls=node.name,
+                        end_lineno=node.body[0].end_lineno,
+                    )
+                )
+
+    # Report docstrings in source order, like the token scanner does.
+    doc_spans.sort(key=lambda span: span.lineno)
+    return doc_spans
+
+
+def extract_python_entities(
+    path: Path,
+    on_fallback: Optional[Callable[[str], None]] = None,
+    source: Optional[Union[str, SourceFile]] = None,
+) -> Tuple[List[CommentSpan], Union[str, SourceFile]]:
     """
     Extract inline comments and docstrings from a Python file.
 
     Returns:
         (spans, source) where spans is a list of CommentSpan objects
-        and source is the full file content as a string.
+        and source is the file content: the text read from path, or the
+        source argument (a string or a SourceFile) when one was given.
+
+    Comments and docstrings are found in a single pass over the token
+    stream; inline comments come first, then docstrings in source order.
+    The function is resilient to syntax or tokenization errors: if the
+    token stream breaks off, the comments seen so far are kept and
+    docstrings are recovered with ast.parse instead.
 
-    The function is resilient to syntax or tokenization errors: failures
-    in one extraction step are swallowed so the caller still receives
-    whatever information could be recovered.
+    on_fallback, if given, is called with "tokenize" or "ast_parse" when
+    that step fails, so callers can report files that were only partially
+    analyzed.
+
+    If source is given, it is used instead of reading path. Passing a
+    SourceFile tokenizes the file line by line from its memory map, in the
+    encoding it declares, so large files are never held in memory as a
+    whole string.
     """
-    src = path.read_text(encoding="utf-8", errors="ignore")
+    if source is None:
+        src: Union[str, SourceFile] = path.read_text(encoding="utf-8", errors="ignore")
+    else:
+        src = source
 
-    inline: List[CommentSpan] = []
+    scanner = _TokenScanner(path)
     try:
         # Use the tokenize module so we only treat true Python comments as inline
         # comments and ignore comment-like substrings in strings.
-        from io import BytesIO
-
-        for tok in tokenize.tokenize(BytesIO(src.encode("utf-8")).readline):
-            if tok.type == tokenize.COMMENT:
-                text = tok.string.lstrip("#").strip()
-                if text:
-                    inline.append(
-                        CommentSpan(
-                            file=path,
-                            lineno=tok.start[0],
-                            text=text,
-                            context="inline",
-                        )
-                    )
+        from io import StringIO
+
+        readline = src.reader() if isinstance(src, SourceFile) else StringIO(src).readline
+        for tok in tokenize.generate_tokens(readline):
+            scanner.feed(tok)
     except Exception:
         # If tokenization fails (for example due to incomplete input),
         # continue and still attempt to extract docstrings via ast.parse.
-        pass
+        if on_fallback is not None:
+            on_fallback("tokenize")
+        text = src.text() if isinstance(src, SourceFile) else src
+        return scanner.inline + _docstrings_from_ast(path, text, on_fallback), src
 
-    doc_spans: List[CommentSpan] = []
-    try:
-        tree = ast.parse(src)
+    return scanner.inline + scanner.docstrings, src
 
-        # Module docstring, if present.
-        mdoc = ast.get_docstring(tree, clean=True)
-        if mdoc:
-            first = tree.body[0].lineno if tree.body else 1
-            doc_spans.append(
-                CommentSpan(
-                    file=path,
-                    lineno=first,
-                    text=mdoc,
-                    context="docstring",
-                )
-            )
 
-        # Function, async function, and class docstrings discovered by walking the AST.
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                d = ast.get_docstring(node, clean=True)
-                if d:
-                    doc_spans.append(
-                        CommentSpan(
-                            file=path,
-                            lineno=node.lineno,
-                            text=d,
-                            context="docstring",
-                            func=node.name,
-                        )
-                    )
-            elif isinstance(node, ast.ClassDef):
-                d = ast.get_docstring(node, clean=True)
-                if d:
-                    doc_spans.append(
-                        CommentSpan(
-                            file=path,
-                            lineno=node.lineno,
-                            text=d,
-                            context="docstring",
-                            cls=node.name,
-                        )
-                    )
-    except Exception:
-        # If parsing fails (for example due to syntax errors), fall back
-        # to inline comments only.
-        pass
+def iter_python_entities(
+    path: Path,
+    readline: Callable[[], str],
+    on_fallback: Optional[Callable[[str], None]] = None,
+) -> Iterator[CommentSpan]:
+    """
+    Yield inline comments and docstrings as the token stream reaches them.
 
-    return inline + doc_spans, src
+    This is the incremental form of extract_python_entities for files too
+    large to hold their spans (see ccqe.stream). Spans come in the order
+    they are completed: a comment as soon as its token is read, a
+    docstring once the statement holding it ends. No AST is built; if
+    tokenization fails, on_fallback is called with "tokenize" and the
+    spans found so far are all there is.
+    """
+    scanner = _TokenScanner(path)
+    try:
+        for tok in tokenize.generate_tokens(readline):
+            scanner.feed(tok)
+            for found in (scanner.inline, scanner.docstrings):
+                if found:
+                    yield from found
+                    found.clear()
+    except Exception:
+        if on_fallback is not None:
+            on_fallback("tokenize")
 
 
 def find_python_files(root: Path) -> List[Path]:
     """
     Recursively collect all Python source files under the given root directory.
 
-    Only regular files with a .py extension are returned.
+    Kept for compatibility; this is ccqe.discover.iter_python_files with
+    the default rules, so virtualenvs, build directories and files listed
+    in .gitignore are skipped.
     """
-    files: List[Path] = []
-    for p in root.rglob("*.py"):
-        if p.is_file():
-            files.append(p)
-    return files
+    from .discover import iter_python_files
+
+    return list(iter_python_files(root))
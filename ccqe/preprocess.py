@@ -2,9 +2,13 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from typing import List
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 from .parser import CommentSpan
+from .source import SourceFile
+
+if TYPE_CHECKING:
+    from .context import ContextIndex
 
 # Match simple word-like tokens in both comments and code.
 WORD_RE = re.compile(r"[a-zA-Z_]+")
@@ -69,16 +73,137 @@ def normalize_operations(text: str) -> str:
     return text
 
 
+# A replacement is either literal text or a function of the matched text.
+Replacement = Union[str, Callable[[str], str]]
+
+# Extra (pattern, replacement) rules registered through register_rewrite_rule.
+# They are tried after the built-in rules in the same pass.
+EXTRA_REWRITE_RULES: List[Tuple[str, str]] = []
+
+
+class Normalizer:
+    """
+    Single-pass rewriter over a list of (pattern, replacement) rules.
+
+    All rules are compiled into one alternation, each wrapped in its own
+    group, and a dispatch table maps the matching group to its replacement.
+    At every position the rules are tried in list order, so earlier rules
+    take priority when several could match at the same place.
+    """
+
+    def __init__(self, rules: Sequence[Tuple[str, Replacement]]) -> None:
+        parts: List[str] = []
+        self._dispatch: Dict[int, Replacement] = {}
+        group = 1
+        for pattern, replacement in rules:
+            parts.append(f"({pattern})")
+            self._dispatch[group] = replacement
+            group += 1 + re.compile(pattern).groups
+        self._regex = re.compile("|".join(parts)) if parts else None
+
+    def _replace(self, m: re.Match) -> str:
+        # lastindex is the outermost group that closed last, i.e. the
+        # rule's own group even if the rule pattern has inner groups.
+        replacement = self._dispatch[m.lastindex]
+        if isinstance(replacement, str):
+            return replacement
+        return replacement(m.group(m.lastindex))
+
+    def __call__(self, text: str) -> str:
+        if self._regex is None:
+            return text
+        return self._regex.sub(self._replace, text)
+
+
+def default_rules() -> List[Tuple[str, Replacement]]:
+    """
+    Build the rule list equivalent to normalize_numbers + normalize_operations.
+
+    normalize_numbers runs first and rewrites every standalone digit, so an
+    operator pattern can only ever see a digit that is glued to a following
+    word character (as in `+= 10`). In a single pass over the raw text that
+    has to be spelled out: a digit ending an operator pattern only matches
+    when followed by a word character.
+    """
+    digits = "|".join(re.escape(num) for num in NUMBER_MAP)
+    rules: List[Tuple[str, Replacement]] = [
+        (rf"\b(?:{digits})\b", lambda num: f" {NUMBER_MAP[num]} "),
+    ]
+    for pattern, replacement in OPERATOR_PATTERNS:
+        if pattern.endswith(tuple(NUMBER_MAP)):
+            pattern = pattern + r"(?=\w)"
+        rules.append((pattern, replacement))
+    rules.extend(EXTRA_REWRITE_RULES)
+    return rules
+
+
+# Compiled on first use (see normalize_code_text), so importing this
+# module costs no regex compilation.
+_normalizer: Optional[Normalizer] = None
+
+
+def register_rewrite_rule(pattern: str, replacement: str) -> None:
+    """
+    Add a code rewrite rule applied by normalize_code_text.
+
+    The rule joins the single compiled pass, after the built-in rules, so
+    registering rules does not add passes over the text.
+    """
+    global _normalizer
+    re.compile(pattern)  # fail early on invalid patterns
+    EXTRA_REWRITE_RULES.append((pattern, replacement))
+    _normalizer = None
+
+    from .cache import invalidate_fingerprint
+
+    invalidate_fingerprint()
+
+
+# How code contexts are chosen (see set_context_options):
+#   mode   : "window" takes the line before, the line itself and the line
+#            after; "ast" takes the code the comment describes (see
+#            ccqe.context.ContextIndex), falling back to the window
+#   budget : with mode "ast", the context stops after the line where it
+#            reaches this many word tokens
+CONTEXT_MODES = ("window", "ast")
+DEFAULT_CONTEXT_BUDGET = 64
+CONTEXT_OPTIONS: Dict[str, Any] = {"mode": "window", "budget": DEFAULT_CONTEXT_BUDGET}
+
+
+def set_context_options(mode: Optional[str] = None, budget: Optional[int] = None) -> None:
+    """
+    Change how code contexts are built for every file analyzed afterwards.
+
+    Raises ValueError for an unknown mode or a budget below one.
+    """
+    if mode is not None:
+        if mode not in CONTEXT_MODES:
+            raise ValueError(f"unknown context mode: {mode}")
+        CONTEXT_OPTIONS["mode"] = mode
+    if budget is not None:
+        if budget < 1:
+            raise ValueError("context budget must be at least 1")
+        CONTEXT_OPTIONS["budget"] = budget
+
+    from .cache import invalidate_fingerprint
+
+    invalidate_fingerprint()
+
+
 def normalize_code_text(text: str) -> str:
     """
     Apply lightweight normalization to code before tokenization.
 
     The goal is to bridge the gap between code syntax and natural language
     comments so that semantically equivalent phrases share more tokens.
+    Number and operator rewrites are applied in one compiled pass; the
+    result matches normalize_numbers followed by normalize_operations.
     """
-    text = normalize_numbers(text)
-    text = normalize_operations(text)
-    return text
+    global _normalizer
+    normalizer = _normalizer
+    if normalizer is None:
+        normalizer = _normalizer = Normalizer(default_rules())
+    return normalizer(text)
 
 
 @dataclass
@@ -105,20 +230,135 @@ def tokenize_text(text: str) -> List[str]:
     return [m.group(0).lower() for m in WORD_RE.finditer(text)]
 
 
-def build_prepared(span: CommentSpan, source: str) -> PreparedComment:
+# Characters that can start an operator pattern spanning a line break
+# (for example "x +" followed by "1" on the next line). Windows containing
+# such a line are normalized as a whole instead of line by line.
+_CONTINUATION_CHARS = ("+", "-", "=")
+
+
+class PreparedSource:
+    """
+    Per-file view of the source used to build code contexts.
+
+    The source is split into lines once, and each line is normalized at
+    most once, so building the context for a comment only touches the
+    lines in its window instead of the whole file.
+
+    source is the file's text or a SourceFile; with a SourceFile, lines
+    are decoded from its memory map only when a window needs them.
+
+    In "ast" context mode (see CONTEXT_OPTIONS) the file is parsed once,
+    on the first call to span_context, into a ContextIndex.
+    """
+
+    def __init__(self, source: Union[str, SourceFile]) -> None:
+        self.source = source
+        self.lines: Sequence[str] = (
+            source.splitlines() if isinstance(source, str) else source.lines
+        )
+        self._normalized: Dict[int, str] = {}
+        self._windows: Dict[Tuple[int, int], str] = {}
+        self._index: Optional[ContextIndex] = None
+        self._indexed = False
+
+    def normalized_line(self, index: int) -> str:
+        """Return the normalized text of the line at a 0-based index."""
+        cached = self._normalized.get(index)
+        if cached is None:
+            cached = normalize_code_text(self.lines[index])
+            self._normalized[index] = cached
+        return cached
+
+    def context(self, lineno: int) -> str:
+        """
+        Return the normalized code context around a 1-based line number.
+
+        The window covers the line before, the line itself, and the line
+        after. Comments on the same or adjacent lines share windows, so
+        joined windows are cached as well.
+        """
+        return self._join(max(0, lineno - 2), min(len(self.lines), lineno + 1))
+
+    def span_context(self, span: CommentSpan) -> str:
+        """
+        Return the normalized code context for a comment or docstring.
+
+        This is context(span.lineno) unless the context mode is "ast" and
+        the file parses, in which case the lines of the code the span
+        describes are used, cut off once the token budget is reached.
+        """
+        if CONTEXT_OPTIONS["mode"] != "ast":
+            return self.context(span.lineno)
+        if not self._indexed:
+            from .context import ContextIndex
+
+            text = self.source if isinstance(self.source, str) else self.source.text()
+            self._index = ContextIndex.from_source(text)
+            self._indexed = True
+        found = self._index.range_for(span) if self._index is not None else None
+        if found is None:
+            return self.context(span.lineno)
+
+        first, last = found
+        i = max(0, first - 1)
+        end = min(len(self.lines), last)
+        budget = CONTEXT_OPTIONS["budget"]
+        j = i
+        tokens = 0
+        while j < end and tokens < budget:
+            tokens += len(WORD_RE.findall(self.normalized_line(j)))
+            j += 1
+        return self._join(i, j)
+
+    def _join(self, i: int, j: int) -> str:
+        """Normalized text of lines i to j (0-based, exclusive), cached."""
+        key = (i, j)
+        cached = self._windows.get(key)
+        if cached is None:
+            cached = self._windows[key] = normalize_window(
+                self.lines[i:j], lambda k: self.normalized_line(i + k)
+            )
+        return cached
+
+
+def normalize_window(
+    window: Sequence[str], normalized_line: Optional[Callable[[int], str]] = None
+) -> str:
+    """
+    Normalize a run of consecutive source lines as one code context.
+
+    Lines are normalized one by one (through normalized_line, given the
+    index into window, when the caller caches them) and joined, unless an
+    operator pattern could span a line break.
     """
-    Build a PreparedComment from a raw CommentSpan and full source text.
+    if any(line.rstrip().endswith(_CONTINUATION_CHARS) for line in window[:-1]):
+        # An operator pattern could match across the line break, so
+        # normalize the joined text to keep results identical.
+        return normalize_code_text("\n".join(window))
+    if normalized_line is None:
+        return "\n".join(normalize_code_text(line) for line in window)
+    return "\n".join(normalized_line(k) for k in range(len(window)))
+
+
+def build_prepared(
+    span: CommentSpan, source: Union[str, PreparedSource]
+) -> PreparedComment:
+    """
+    Build a PreparedComment from a raw CommentSpan and its source.
+
+    The code around the comment (see PreparedSource.span_context) is
+    extracted as the code context and normalized so that the model can
+    reason about semantic redundancy between the comment and the
+    surrounding code.
 
-    A small window of lines around the comment is extracted as the code
-    context and normalized so that the model can reason about semantic
-    redundancy between the comment and the surrounding code.
+    source may be the full source text or a PreparedSource. Callers that
+    prepare many comments from one file should pass a PreparedSource so the
+    file is split and normalized only once.
     """
-    lines = source.splitlines()
-    i = max(0, span.lineno - 2)
-    j = min(len(lines), span.lineno + 1)
-    context = "\n".join(lines[i:j])
+    if isinstance(source, str):
+        source = PreparedSource(source)
 
-    context = normalize_code_text(context)
+    context = source.span_context(span)
     tokens = tokenize_text(span.text)
 
     return PreparedComment(span=span, tokens=tokens, code_context=context)
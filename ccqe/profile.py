@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+# Number of slowest files kept by default.
+DEFAULT_TOP_N = 10
+
+
+@dataclass
+class StageTiming:
+    """Accumulated wall time and call count of one pipeline stage."""
+    calls: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class Profile:
+    """
+    Opt-in instrumentation collected while analyzing a tree.
+
+    stages     : wall time and call count per pipeline stage
+    slowest    : (seconds, path) of the slowest files, slowest first
+    fallbacks  : paths where a parsing step failed, per step
+                 ("tokenize" or "ast_parse")
+    bytes_read : total size of the analyzed files
+    top_n      : number of slowest files to keep
+
+    Workers fill a fresh Profile per file, which is merged into the run's
+    Profile in file order. Callables in hooks are invoked in the calling
+    process after each merge with the file path and its own Profile.
+    """
+    stages: Dict[str, StageTiming] = field(default_factory=dict)
+    slowest: List[Tuple[float, str]] = field(default_factory=list)
+    fallbacks: Dict[str, List[str]] = field(default_factory=dict)
+    bytes_read: int = 0
+    top_n: int = DEFAULT_TOP_N
+    hooks: List[Callable[[Path, "Profile"], None]] = field(default_factory=list, repr=False)
+
+    def record(self, stage: str, seconds: float, calls: int = 1) -> None:
+        """Add wall time and calls to a stage."""
+        timing = self.stages.get(stage)
+        if timing is None:
+            timing = self.stages[stage] = StageTiming()
+        timing.calls += calls
+        timing.seconds += seconds
+
+    def record_file(self, path: Path, seconds: float, size: int) -> None:
+        """Record the total time spent on one file and its size."""
+        self.bytes_read += size
+        self._keep_slowest([(seconds, str(path))])
+
+    def record_fallback(self, step: str, path: Path) -> None:
+        """Record that a parsing step failed and was silently skipped."""
+        self.fallbacks.setdefault(step, []).append(str(path))
+
+    def _keep_slowest(self, entries: List[Tuple[float, str]]) -> None:
+        self.slowest = heapq.nlargest(self.top_n, self.slowest + entries)
+
+    def merge(self, other: Profile) -> None:
+        """Fold another profile (usually a single file's) into this one."""
+        for stage, timing in other.stages.items():
+            self.record(stage, timing.seconds, timing.calls)
+        self._keep_slowest(other.slowest)
+        for step, paths in other.fallbacks.items():
+            self.fallbacks.setdefault(step, []).extend(paths)
+        self.bytes_read += other.bytes_read
+
+    def notify(self, path: Path, file_profile: Profile) -> None:
+        """Call the registered hooks for a file that has just been merged."""
+        for hook in self.hooks:
+            hook(path, file_profile)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the profile as JSON-serializable data."""
+        return {
+            "stages": {
+                stage: {"calls": t.calls, "seconds": round(t.seconds, 6)}
+                for stage, t in self.stages.items()
+            },
+            "slowest_files": [
+                {"path": path, "seconds": round(seconds, 6)}
+                for seconds, path in self.slowest
+            ],
+            "fallbacks": self.fallbacks,
+            "bytes_read": self.bytes_read,
+        }
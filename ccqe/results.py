@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .feedback import Suggestion
+from .model import QualityScore
+from .parser import CommentSpan
+from .summary import Summary
+
+
+@dataclass
+class CommentResult:
+    """
+    Outcome of analyzing a single comment.
+
+    span       : the comment or docstring that was scored
+    quality    : score, label, and signals from the model
+    suggestion : catalogue entry derived from the score; its text is only
+                 rendered when the result is written out
+    """
+    span: CommentSpan
+    quality: QualityScore
+    suggestion: Suggestion
+
+
+def format_line(
+    file: Path, lineno: int, ctx: str, label: str, score: float, suggestion: str
+) -> str:
+    """Format one report line from its fields."""
+    return (
+        f"{file}: {lineno:3d} | {ctx:<15} | "
+        f"{label:<6} | score={score:.2f} | {suggestion}"
+    )
+
+
+def format_report_line(result: CommentResult) -> str:
+    """Format the report line for a single scored comment."""
+    span, quality = result.span, result.quality
+    ctx = span.func or span.cls or span.file.name
+    return format_line(span.file, span.lineno, ctx, quality.label, quality.score, result.suggestion.text)
+
+
+# Enumerations stored as small integers in ResultStore columns.
+CONTEXTS = ("inline", "docstring")
+LABELS = ("High", "Medium", "Low")
+
+
+class _Table:
+    """Interning table mapping values to small integer ids."""
+
+    __slots__ = ("values", "_ids")
+
+    def __init__(self) -> None:
+        self.values: List = []
+        self._ids: Dict = {}
+
+    def id(self, value) -> int:
+        i = self._ids.get(value)
+        if i is None:
+            i = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+
+class StoredResult:
+    """
+    Lightweight view of one row of a ResultStore.
+
+    Views are created on demand while iterating and only hold the store
+    and a row index; the values live in the store's columns.
+    """
+
+    __slots__ = ("_store", "index")
+
+    def __init__(self, store: ResultStore, index: int) -> None:
+        self._store = store
+        self.index = index
+
+    @property
+    def file(self) -> Path:
+        return self._store._paths.values[self._store.file_ids[self.index]]
+
+    @property
+    def lineno(self) -> int:
+        return self._store.linenos[self.index]
+
+    @property
+    def context(self) -> str:
+        return CONTEXTS[self._store.contexts[self.index]]
+
+    @property
+    def ctx(self) -> str:
+        """Enclosing function or class name, or the file name at module level."""
+        name = self._store._names.values[self._store.name_ids[self.index]]
+        return name if name is not None else self.file.name
+
+    @property
+    def label(self) -> str:
+        return LABELS[self._store.labels[self.index]]
+
+    @property
+    def score(self) -> float:
+        return self._store.scores[self.index]
+
+    @property
+    def signals(self) -> Dict[str, float]:
+        store, i = self._store, self.index
+        return {
+            "length": store.lengths[i],
+            "intent_hits": store.intent_hits[i],
+            "redundancy": store.redundancy[i] / 100,
+        }
+
+    @property
+    def suggestion(self) -> Suggestion:
+        return self._store._suggestions.values[self._store.suggestion_ids[self.index]]
+
+
+class ResultStore:
+    """
+    Compact, column-oriented container of analysis results.
+
+    Each comment takes one slot in a handful of typed arrays: file id (into
+    a path table), line number, context and label enums, the score as a
+    double (scoring backends need not keep to the rules' 0.05 steps, so a
+    float32 could round differently in the report), the integer signals,
+    and ids into interned tables of enclosing names and suggestions.
+    Redundancy is stored in hundredths, which is exact because the model
+    rounds it to two decimals. Comment text and code context are not kept.
+
+    Results must be appended file by file, as iter_results yields them.
+    """
+
+    def __init__(self) -> None:
+        self._paths = _Table()
+        self._names = _Table()
+        self._suggestions = _Table()
+        self.file_ids = array("I")
+        self.linenos = array("I")
+        self.contexts = array("B")
+        self.name_ids = array("I")
+        self.labels = array("B")
+        self.scores = array("d")
+        self.lengths = array("I")
+        self.intent_hits = array("H")
+        self.redundancy = array("B")
+        self.suggestion_ids = array("H")
+
+    def append(self, result: CommentResult) -> None:
+        """Add one result; the CommentResult itself is not kept."""
+        span, quality = result.span, result.quality
+        signals = quality.signals
+        self.file_ids.append(self._paths.id(span.file))
+        self.linenos.append(span.lineno)
+        self.contexts.append(CONTEXTS.index(span.context))
+        self.name_ids.append(self._names.id(span.func or span.cls or None))
+        self.labels.append(LABELS.index(quality.label))
+        self.scores.append(quality.score)
+        self.lengths.append(signals["length"])
+        self.intent_hits.append(signals["intent_hits"])
+        self.redundancy.append(round(float(signals["redundancy"] or 0.0) * 100))
+        self.suggestion_ids.append(self._suggestions.id(result.suggestion))
+
+    def extend(self, results: Iterable[CommentResult]) -> None:
+        for result in results:
+            self.append(result)
+
+    def __len__(self) -> int:
+        return len(self.linenos)
+
+    def __iter__(self) -> Iterator[StoredResult]:
+        return (StoredResult(self, i) for i in range(len(self)))
+
+    def where(
+        self,
+        label: Optional[str] = None,
+        context: Optional[str] = None,
+        file: Optional[Path] = None,
+    ) -> array:
+        """Return the row indices matching all given criteria."""
+        checks = []
+        if label is not None:
+            checks.append((self.labels, LABELS.index(label)))
+        if context is not None:
+            checks.append((self.contexts, CONTEXTS.index(context)))
+        if file is not None:
+            checks.append((self.file_ids, self._paths._ids.get(Path(file), -1)))
+        return array(
+            "I",
+            (i for i in range(len(self)) if all(col[i] == v for col, v in checks)),
+        )
+
+    def rows(self, indices: Iterable[int]) -> Iterator[StoredResult]:
+        """Views of the given rows, e.g. the output of where()."""
+        return (StoredResult(self, i) for i in indices)
+
+    def label_counts(self) -> Dict[str, int]:
+        counts = [0] * len(LABELS)
+        for label in self.labels:
+            counts[label] += 1
+        return {name: n for name, n in zip(LABELS, counts) if n}
+
+    def summary(self) -> Summary:
+        """
+        Aggregate the stored rows into a Summary.
+
+        Redundancy is summed per file and the file sums are then added in
+        order, the same way per-file summaries are merged during a run, so
+        the result matches the Summary built while analyzing.
+        """
+        total = Summary()
+        current = -1
+        file_sum = 0.0
+        suggestions = self._suggestions.values
+        intent_flags = [s.asks_for_intent for s in suggestions]
+        suggestion_counts = [0] * len(suggestions)
+
+        for i in range(len(self)):
+            fid = self.file_ids[i]
+            if fid != current:
+                if current != -1:
+                    total.redundancy_sum += file_sum
+                current, file_sum = fid, 0.0
+                total.files += 1
+            file_sum += self.redundancy[i] / 100
+            sid = self.suggestion_ids[i]
+            suggestion_counts[sid] += 1
+            if intent_flags[sid]:
+                total.needs_intent += 1
+        if current != -1:
+            total.redundancy_sum += file_sum
+
+        total.comments = total.redundancy_count = len(self)
+        total.label_counts = self.label_counts()
+        total.suggestion_counts = {
+            s.id: n for s, n in zip(suggestions, suggestion_counts) if n
+        }
+        return total
+
+    def report_lines(self) -> Iterator[str]:
+        """Format every stored row as a report line."""
+        for row in self:
+            yield format_line(row.file, row.lineno, row.ctx, row.label, row.score, row.suggestion.text)
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from .feedback import Suggestion, suggestion_for
+from .model import QualityScore, predict_quality_batch
+from .preprocess import PreparedComment
+
+# Group of installed package entry points that provide scorers; each
+# entry point loads a factory as registered with register_scorer.
+ENTRY_POINT_GROUP = "ccqe.scorers"
+
+DEFAULT_SCORER = "heuristic"
+
+
+class Scorer:
+    """
+    A scoring backend: turns prepared comments into quality scores.
+
+    score_batch() receives every comment of a file (or of a streamed
+    chunk) at once, so backends can vectorize; it returns one
+    QualityScore per comment, in order, as any indexable sequence.
+    suggest() picks the feedback for a score; the default follows the
+    score's label and signals (see ccqe.feedback). fingerprint() names
+    everything that changes the backend's output and keys the result
+    cache (see ccqe.cache).
+
+    Backends are built by a factory called with the value of
+    --scorer-config (a Path, or None).
+    """
+
+    name = "scorer"
+
+    def score_batch(self, prepared: Sequence[PreparedComment]) -> Sequence[QualityScore]:
+        raise NotImplementedError
+
+    def suggest(self, quality: QualityScore) -> Suggestion:
+        return suggestion_for(quality)
+
+    def fingerprint(self) -> Any:
+        return self.name
+
+
+class HeuristicScorer(Scorer):
+    """The built-in rules of ccqe.model (predict_quality_batch)."""
+
+    name = "heuristic"
+
+    def score_batch(self, prepared: Sequence[PreparedComment]) -> Sequence[QualityScore]:
+        return predict_quality_batch(prepared)
+
+
+def _heuristic(config: Optional[Path] = None) -> Scorer:
+    if config is not None:
+        raise ValueError("the heuristic scorer takes no configuration")
+    return HeuristicScorer()
+
+
+ScorerFactory = Callable[[Optional[Path]], Scorer]
+
+# Known backends, by name: a factory, or "module:attribute" naming one
+# that is imported only when the backend is selected, so heavy backends
+# cost nothing at startup.
+SCORERS: Dict[str, Union[ScorerFactory, str]] = {
+    "heuristic": _heuristic,
+    "linear": "ccqe.linear:LinearScorer.from_file",
+}
+
+
+def register_scorer(name: str, factory: Union[ScorerFactory, str]) -> None:
+    """Add or replace a backend; factory may be a "module:attribute" string."""
+    SCORERS[name] = factory
+
+
+def _entry_points() -> Dict[str, Any]:
+    from importlib.metadata import entry_points
+
+    return {ep.name: ep for ep in entry_points(group=ENTRY_POINT_GROUP)}
+
+
+def available_scorers() -> List[str]:
+    """Names of the registered and installed backends."""
+    return sorted(set(SCORERS) | set(_entry_points()))
+
+
+def _resolve(target: str) -> ScorerFactory:
+    from importlib import import_module
+
+    module, _, attr = target.partition(":")
+    obj: Any = import_module(module)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def load_scorer(name: str, config: Optional[Path] = None) -> Scorer:
+    """
+    Build the backend registered as name, importing it if needed.
+
+    Entry points are only looked at for names that are not registered.
+    Raises ValueError for an unknown name or a bad configuration, and
+    OSError if the configuration file cannot be read.
+    """
+    factory = SCORERS.get(name)
+    if factory is None:
+        ep = _entry_points().get(name)
+        if ep is None:
+            raise ValueError(
+                f"unknown scorer {name!r} (available: {', '.join(available_scorers())})"
+            )
+        factory = ep.load()
+    elif isinstance(factory, str):
+        factory = _resolve(factory)
+    return factory(config)
+
+
+# The backend used by analyze_file and ccqe.stream (see set_scorer), and
+# how it was selected, so pool workers can build the same one.
+SCORER_OPTIONS: Dict[str, Any] = {"name": DEFAULT_SCORER, "config": None}
+_active: Optional[Scorer] = None
+
+
+def set_scorer(name: str = DEFAULT_SCORER, config: Optional[Path] = None) -> Scorer:
+    """Select the backend for every file analyzed afterwards; see load_scorer."""
+    global _active
+    scorer = load_scorer(name, config)
+    _active = scorer
+    SCORER_OPTIONS.update(name=name, config=config)
+    from .cache import invalidate_fingerprint
+
+    invalidate_fingerprint()
+    return scorer
+
+
+def active_scorer() -> Scorer:
+    """The backend selected with set_scorer (the heuristic one by default)."""
+    global _active
+    if _active is None:
+        _active = HeuristicScorer()
+    return _active
@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, List, Optional, Tuple
+
+from .cli import add_model_arguments, analyze_file, apply_model_arguments
+from .formats import comment_record as base_record
+from .results import CommentResult, format_report_line
+from .summary import Summary
+
+# Buffers (unsaved editor contents) whose results are kept, by content.
+DEFAULT_MAX_BUFFERS = 256
+
+# Files on disk whose results are kept.
+DEFAULT_MAX_FILES = 4096
+
+# JSON-RPC 2.0 error codes.
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+FILE_ERROR = -32000
+
+
+class RPCError(Exception):
+    """Error reported to the client as a JSON-RPC error object."""
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+@dataclass
+class _Entry:
+    """Results of one file, valid while its mtime, size, or digest match."""
+
+    mtime_ns: int
+    size: int
+    digest: str
+    results: List[CommentResult]
+    summary: Summary
+
+
+def comment_record(result: CommentResult) -> Dict[str, Any]:
+    """
+    Plain-data form of one scored comment, as sent to clients.
+
+    This is the record of ccqe.formats plus the span's last line and the
+    formatted report line.
+    """
+    record = base_record(result)
+    record["end_lineno"] = result.span.end_lineno
+    record["line"] = format_report_line(result)
+    return record
+
+
+class ScoringService:
+    """
+    Scores files and buffers, keeping results for unchanged inputs.
+
+    The model tables are compiled once when the process starts and stay
+    warm for every request. Results of a file are reused while its mtime
+    and size are unchanged; when they change, the content is hashed and the
+    file is only scored again if the hash differs as well; the most
+    recently used max_files files are kept. Buffers sent by editors are
+    keyed by path and content hash, and the most recent max_buffers of
+    them are kept.
+
+    Methods may be called from several threads at once.
+    """
+
+    def __init__(
+        self, max_buffers: int = DEFAULT_MAX_BUFFERS, max_files: int = DEFAULT_MAX_FILES
+    ) -> None:
+        self.max_buffers = max_buffers
+        self.max_files = max_files
+        self._files: OrderedDict[Path, _Entry] = OrderedDict()
+        self._buffers: OrderedDict[Tuple[Path, str], Tuple[List[CommentResult], Summary]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def score_path(self, path: Path) -> Tuple[List[CommentResult], Summary, bool]:
+        """
+        Score a file on disk.
+
+        Returns its results, its summary, and whether they came from the
+        in-memory cache. Raises OSError if the file cannot be read.
+        """
+        path = path.resolve()
+        try:
+            st = path.stat()
+        except OSError:
+            with self._lock:
+                self._files.pop(path, None)
+            raise
+        with self._lock:
+            entry = self._files.get(path)
+            if entry is not None:
+                self._files.move_to_end(path)
+            if entry is not None and (entry.mtime_ns, entry.size) == (st.st_mtime_ns, st.st_size):
+                self.hits += 1
+                return entry.results, entry.summary, True
+
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        if entry is not None and entry.digest == digest:
+            # Touched but not changed.
+            with self._lock:
+                entry.mtime_ns, entry.size = st.st_mtime_ns, st.st_size
+                self.hits += 1
+            return entry.results, entry.summary, True
+
+        results, summary, _ = analyze_file(path, data=data)
+        with self._lock:
+            self._files[path] = _Entry(st.st_mtime_ns, st.st_size, digest, results, summary)
+            self._files.move_to_end(path)
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+            self.misses += 1
+        return results, summary, False
+
+    def score_buffer(self, path: Path, source: str) -> Tuple[List[CommentResult], Summary, bool]:
+        """Score unsaved source text as if it were the content of path."""
+        data = source.encode("utf-8")
+        key = (path, hashlib.sha256(data).hexdigest())
+        with self._lock:
+            cached = self._buffers.get(key)
+            if cached is not None:
+                self._buffers.move_to_end(key)
+                self.hits += 1
+                return cached[0], cached[1], True
+
+        results, summary, _ = analyze_file(path, data=data)
+        with self._lock:
+            self._buffers[key] = (results, summary)
+            while len(self._buffers) > self.max_buffers:
+                self._buffers.popitem(last=False)
+            self.misses += 1
+        return results, summary, False
+
+    def invalidate(self, path: Optional[Path] = None) -> None:
+        """Forget the results of one file, or of everything when path is None."""
+        with self._lock:
+            if path is None:
+                self._files.clear()
+                self._buffers.clear()
+            else:
+                self._files.pop(path.resolve(), None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "buffers": len(self._buffers),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class Dispatcher:
+    """
+    Maps JSON-RPC requests onto a ScoringService.
+
+    Methods:
+      score      {path, source?}  -> {path, cached, comments, summary}
+      invalidate {path?}          -> null
+      stats      {}               -> cache counters
+      ping       {}               -> "pong"
+      shutdown   {}               -> null, then the server stops
+    """
+
+    def __init__(self, service: ScoringService, on_shutdown: Callable[[], None]) -> None:
+        self.service = service
+        self.on_shutdown = on_shutdown
+
+    def handle_line(self, line: str) -> Optional[str]:
+        """Answer one request line; notifications (no id) give None."""
+        try:
+            request = json.loads(line)
+        except ValueError as exc:
+            return self._error(None, RPCError(PARSE_ERROR, f"invalid JSON: {exc}"))
+        if not isinstance(request, dict):
+            return self._error(None, RPCError(INVALID_REQUEST, "expected a request object"))
+        req_id = request.get("id")
+        if not isinstance(request.get("method"), str):
+            return self._error(req_id, RPCError(INVALID_REQUEST, "missing method"))
+
+        try:
+            result = self.call(request["method"], request.get("params") or {})
+        except RPCError as exc:
+            return self._error(req_id, exc)
+        except OSError as exc:
+            return self._error(req_id, RPCError(FILE_ERROR, str(exc)))
+        except Exception as exc:
+            # Every request with an id gets an answer, or the client waits
+            # forever; the server itself keeps going.
+            return self._error(req_id, RPCError(INTERNAL_ERROR, f"{type(exc).__name__}: {exc}"))
+        if "id" not in request:
+            return None
+        return json.dumps({"jsonrpc": "2.0", "id": req_id, "result": result})
+
+    def call(self, method: str, params: Any) -> Any:
+        if not isinstance(params, dict):
+            raise RPCError(INVALID_PARAMS, "params must be an object")
+        if method == "score":
+            path = params.get("path")
+            source = params.get("source")
+            if not isinstance(path, str) or (source is not None and not isinstance(source, str)):
+                raise RPCError(INVALID_PARAMS, "score needs a path and an optional source string")
+            if source is None:
+                results, summary, cached = self.service.score_path(Path(path))
+            else:
+                results, summary, cached = self.service.score_buffer(Path(path), source)
+            return {
+                "path": path,
+                "cached": cached,
+                "comments": [comment_record(r) for r in results],
+                "summary": summary.to_dict(),
+            }
+        if method == "invalidate":
+            path = params.get("path")
+            self.service.invalidate(Path(path) if isinstance(path, str) else None)
+            return None
+        if method == "stats":
+            return self.service.stats()
+        if method == "ping":
+            return "pong"
+        if method == "shutdown":
+            self.on_shutdown()
+            return None
+        raise RPCError(METHOD_NOT_FOUND, f"unknown method: {method}")
+
+    @staticmethod
+    def _error(req_id: Any, exc: RPCError) -> str:
+        error = {"code": exc.code, "message": exc.message}
+        return json.dumps({"jsonrpc": "2.0", "id": req_id, "error": error})
+
+
+def serve_stdio(dispatcher: Dispatcher, stdin: IO[str], stdout: IO[str], workers: int = 4) -> None:
+    """
+    Answer newline-delimited requests from stdin on stdout.
+
+    Requests are handled concurrently in a thread pool, so responses may
+    arrive out of order; clients match them by id. Returns at end of input,
+    once pending requests are answered; after a shutdown request no
+    further lines are read.
+    """
+    write_lock = threading.Lock()
+    stop = threading.Event()
+    dispatcher.on_shutdown = stop.set
+
+    def answer(line: str) -> None:
+        response = dispatcher.handle_line(line)
+        if response is not None:
+            with write_lock:
+                stdout.write(response + "\n")
+                stdout.flush()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ccqe-serve") as pool:
+        for line in stdin:
+            if line.strip():
+                pool.submit(answer, line)
+            if stop.is_set():
+                break
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One client connection; its requests are answered in order."""
+
+    def handle(self) -> None:
+        dispatcher: Dispatcher = self.server.dispatcher  # type: ignore[attr-defined]
+        for raw in self.rfile:
+            line = raw.decode("utf-8", errors="replace")
+            if not line.strip():
+                continue
+            response = dispatcher.handle_line(line)
+            if response is not None:
+                self.wfile.write(response.encode("utf-8") + b"\n")
+                self.wfile.flush()
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+
+    class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        """Threaded Unix socket server; each connection gets its own thread."""
+
+        daemon_threads = True
+
+        def __init__(self, path: str, dispatcher: Dispatcher) -> None:
+            self.dispatcher = dispatcher
+            # shutdown() waits for serve_forever, so it cannot run on the
+            # handler thread that received the request.
+            dispatcher.on_shutdown = lambda: threading.Thread(target=self.shutdown).start()
+            super().__init__(path, _Handler)
+
+
+def _remove_stale_socket(path: str) -> None:
+    """
+    Remove a socket left behind by a daemon that is gone.
+
+    Raises OSError if path is not a socket or a server still answers on it.
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise OSError(f"{path}: exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"{path}: another server is listening")
+
+
+def serve_socket(dispatcher: Dispatcher, path: str) -> None:
+    """
+    Listen on a Unix socket at path until a shutdown request or SIGTERM.
+
+    Raises OSError if path is taken (see _remove_stale_socket). The socket
+    file is removed when the server stops.
+    """
+    _remove_stale_socket(path)
+    handles_sigterm = threading.current_thread() is threading.main_thread()
+    if handles_sigterm:
+        # Stop like a shutdown request, so the socket file is removed. This
+        # is in place before the socket file appears, so a client that sees
+        # the file can rely on it.
+        previous = signal.signal(signal.SIGTERM, lambda signum, frame: dispatcher.on_shutdown())
+    try:
+        with UnixServer(path, dispatcher) as server:
+            try:
+                server.serve_forever()
+            finally:
+                os.unlink(path)
+    finally:
+        if handles_sigterm:
+            signal.signal(signal.SIGTERM, previous)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Run the scoring daemon (ccqe serve).
+
+    Requests and responses are JSON-RPC 2.0 objects, one per line, read
+    from a Unix socket (--socket) or from stdin and written to stdout.
+    The scoring options (--synonyms, --scorer, --idf-index, --context,
+    ...) are those of the CLI, so served scores match a CLI run with the
+    same options.
+    """
+    ap = argparse.ArgumentParser(
+        prog="ccqe serve",
+        description="Keep the scorer warm and answer JSON-RPC scoring requests",
+    )
+    transport = ap.add_mutually_exclusive_group(required=True)
+    transport.add_argument("--socket", metavar="PATH", type=str, help="Listen on a Unix socket at PATH")
+    transport.add_argument("--stdio", action="store_true", help="Read requests from stdin, answer on stdout")
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="With --stdio, number of requests handled at once (default: 4)",
+    )
+    add_model_arguments(ap)
+    args = ap.parse_args(argv)
+    apply_model_arguments(ap, args)
+
+    dispatcher = Dispatcher(ScoringService(), on_shutdown=lambda: None)
+    if args.stdio:
+        serve_stdio(dispatcher, sys.stdin, sys.stdout, max(args.workers, 1))
+    else:
+        if not hasattr(socketserver, "UnixStreamServer"):
+            ap.error("Unix sockets are not available on this platform; use --stdio")
+        try:
+            serve_socket(dispatcher, args.socket)
+        except OSError as exc:
+            ap.error(str(exc))
+
+
+if __name__ == "__main__":
+    main()
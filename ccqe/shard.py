@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import heapq
+import json
+import sys
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import __version__
+from .cli import _map_files
+from .cache import open_cache
+from .discover import DiscoveryConfig, iter_python_files
+from .feedback import SUGGESTIONS, Suggestion
+from .formats import WRITERS, comment_record, make_writer, open_output
+from .model import QualityScore
+from .parser import CommentSpan
+from .results import CommentResult
+from .stream import DEFAULT_STREAM_THRESHOLD
+from .summary import Summary
+
+# Bump when the layout of partial result files changes.
+PARTIAL_FORMAT = 2
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parse "i/N" into (i, N), with shards numbered 1 to N.
+
+    Raises ValueError for anything else.
+    """
+    index, sep, count = spec.partition("/")
+    if not sep:
+        raise ValueError(f"expected i/N, got {spec!r}")
+    i, n = int(index), int(count)
+    if n < 1 or not 1 <= i <= n:
+        raise ValueError(f"shard {spec!r} is out of range")
+    return i, n
+
+
+def _path_hash(rel: str) -> int:
+    return int.from_bytes(hashlib.blake2b(rel.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _relative(file: Path, root: Path) -> str:
+    """file's path under root in POSIX form ("" for root itself)."""
+    if file == root:
+        return ""
+    try:
+        return file.relative_to(root).as_posix()
+    except ValueError:
+        return file.as_posix()
+
+
+def _files_digest(rels: Sequence[str]) -> str:
+    return hashlib.sha256("\n".join(rels).encode("utf-8")).hexdigest()
+
+
+def partition(files: Sequence[Path], root: Path, shards: int) -> List[List[int]]:
+    """
+    Split files into shards of roughly equal total size.
+
+    Returns, per shard, the indices of its files in ascending order.
+    Files are placed largest first, each on the shard with the least total
+    size so far; equal sizes are ordered by a hash of the path relative to
+    root, and ties between shards go to the lowest one. Every machine that
+    sees the same tree therefore computes the same partition, wherever the
+    tree is checked out.
+    """
+    keyed = []
+    for index, file in enumerate(files):
+        try:
+            size = file.stat().st_size
+        except OSError:
+            size = 0
+        rel = _relative(file, root)
+        # Empty files still cost a parse; count them as one byte.
+        keyed.append((-max(size, 1), _path_hash(rel), rel, index))
+    keyed.sort()
+
+    load = [(0, shard) for shard in range(shards)]
+    assigned: List[List[int]] = [[] for _ in range(shards)]
+    for neg_size, _, _, index in keyed:
+        total, shard = heapq.heappop(load)
+        assigned[shard].append(index)
+        heapq.heappush(load, (total - neg_size, shard))
+    for indices in assigned:
+        indices.sort()
+    return assigned
+
+
+def discover_files(root: Path, discovery: Optional[DiscoveryConfig] = None) -> List[Path]:
+    """The files iter_results would analyze under root, in report order."""
+    if root.is_file():
+        return [root] if root.suffix == ".py" else []
+    return list(iter_python_files(root, discovery))
+
+
+def write_partial(
+    out: IO[str],
+    root: Path,
+    shard: Tuple[int, int],
+    jobs: int = 1,
+    cache_dir: Optional[Path] = None,
+    discovery: Optional[DiscoveryConfig] = None,
+    io_threads: int = 0,
+    stream_threshold: Optional[int] = DEFAULT_STREAM_THRESHOLD,
+) -> Summary:
+    """
+    Analyze one shard of root and write its partial result file to out.
+
+    The file is JSON Lines: a header naming the shard, then one line per
+    file with comments, holding the file's position in the full report,
+    its path relative to root, its Summary, and its comment records (see
+    ccqe.formats, without the file). The header identifies the tree by
+    the number and relative paths of its files, so shards written from
+    checkouts in different places can be merged. Files larger
+    than stream_threshold bytes are streamed as in iter_results. Returns
+    the shard's Summary.
+    """
+    i, n = shard
+    files = discover_files(root, discovery)
+    rels = [_relative(file, root) for file in files]
+    selected = partition(files, root, n)[i - 1]
+    header = {
+        "ccqe_partial": PARTIAL_FORMAT,
+        "version": __version__,
+        "shard": i,
+        "shards": n,
+        "root": str(root),
+        "files_total": len(files),
+        "files_digest": _files_digest(rels),
+    }
+    out.write(json.dumps(header) + "\n")
+
+    total = Summary()
+    work = _map_files(
+        [files[k] for k in selected],
+        jobs,
+        cache_dir,
+        io_threads=io_threads,
+        stream_threshold=stream_threshold,
+    )
+    for index, (_, (file_results, file_summary, _)) in zip(selected, work):
+        # Streamed files fill their Summary as the results are consumed.
+        comments = [comment_record(r) for r in file_results]
+        total.merge(file_summary)
+        if not comments:
+            continue
+        for comment in comments:
+            del comment["file"]
+        record = {
+            "index": index,
+            "file": rels[index],
+            "summary": file_summary.to_dict(),
+            "comments": comments,
+        }
+        out.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    if cache_dir is not None:
+        open_cache(cache_dir).prune()
+    return total
+
+
+def _result_from_record(record: Dict[str, Any], file: Path) -> CommentResult:
+    """Rebuild a result from its comment record; raises KeyError or TypeError if malformed."""
+    if (
+        type(record["lineno"]) is not int
+        or type(record["score"]) not in (int, float)
+        or not isinstance(record["signals"], dict)
+    ):
+        raise TypeError("lineno, score or signals of the wrong type")
+    span = CommentSpan(
+        file=file,
+        lineno=record["lineno"],
+        text="",
+        context=record["context"],
+        func=record["func"],
+        cls=record["cls"],
+    )
+    quality = QualityScore(label=record["label"], score=record["score"], signals=record["signals"])
+    suggestion = SUGGESTIONS.get(record["suggestion_id"])
+    if suggestion is None:
+        # A plugin scorer's own suggestion; the record has all a report
+        # shows of it, and the per-file summaries already count it.
+        sid = str(record["suggestion_id"])
+        suggestion = Suggestion(sid, str(record["suggestion"]), sid, False)
+    return CommentResult(span=span, quality=quality, suggestion=suggestion)
+
+
+def _read_header(path: Path) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as fh:
+        try:
+            header = json.loads(fh.readline() or "null")
+        except ValueError:
+            header = None
+    if not isinstance(header, dict) or header.get("ccqe_partial") != PARTIAL_FORMAT:
+        raise ValueError(f"{path}: not a ccqe partial result file")
+    return header
+
+
+def _read_records(path: Path) -> Iterator[Tuple[int, Dict[str, Any], str]]:
+    """
+    (index, record, where) for each file line of a partial file, in file
+    order; where is "path:line" for error messages.
+
+    Raises ValueError for a line that is not a record.
+    """
+    with open(path, encoding="utf-8") as fh:
+        fh.readline()
+        for lineno, line in enumerate(fh, 2):
+            if not line.strip():
+                continue
+            where = f"{path}:{lineno}"
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict) or type(record.get("index")) is not int:
+                raise ValueError(f"{where}: malformed record")
+            yield record["index"], record, where
+
+
+def merge_partials(
+    paths: Sequence[Path], root: Optional[Path] = None
+) -> Tuple[Iterator[CommentResult], Summary]:
+    """
+    Combine partial result files into one stream of results.
+
+    Results come out in the order of the unsharded report, with file paths
+    under root (default: the root shard 1 was run with). The returned
+    Summary is filled as the iterator is consumed, merging per-file
+    summaries in file order exactly as analyze_path does, so the summary
+    block is the same as that of a single run. Raises ValueError if the
+    files do not form one complete set of shards of the same tree; the
+    iterator raises ValueError when it reaches a malformed record.
+    """
+    headers = [_read_header(path) for path in paths]
+
+    shards = {h["shards"] for h in headers}
+    totals = {(h["files_total"], h["files_digest"]) for h in headers}
+    indices = sorted(h["shard"] for h in headers)
+    if len(shards) != 1 or len(totals) != 1:
+        raise ValueError("partial files come from different runs")
+    if indices != list(range(1, shards.pop() + 1)):
+        raise ValueError(f"expected each shard exactly once, got shards {indices}")
+    base = Path(next(h["root"] for h in headers if h["shard"] == 1) if root is None else root)
+
+    summary = Summary()
+
+    def results() -> Iterator[CommentResult]:
+        streams = [_read_records(path) for path in paths]
+        for _, record, where in heapq.merge(*streams, key=lambda item: item[0]):
+            try:
+                file_summary = Summary.from_dict(record["summary"])
+                file = base / record["file"] if record["file"] else base
+                file_results = [_result_from_record(c, file) for c in record["comments"]]
+            except (KeyError, TypeError, AttributeError, ValueError) as exc:
+                raise ValueError(f"{where}: malformed record: {exc}") from None
+            summary.merge(file_summary)
+            yield from file_results
+
+    return results(), summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Merge partial result files into one report (ccqe merge)."""
+    ap = argparse.ArgumentParser(
+        prog="ccqe merge",
+        description="Combine the partial results of ccqe --shard runs into one report",
+    )
+    ap.add_argument("partials", metavar="PARTIAL", nargs="+", help="Partial result files, one per shard")
+    ap.add_argument(
+        "--format",
+        choices=sorted(WRITERS),
+        default="text",
+        help="Output format (default: text)",
+    )
+    ap.add_argument(
+        "--output",
+        metavar="FILE",
+        type=str,
+        default=None,
+        help="Write the report to FILE instead of stdout",
+    )
+    ap.add_argument(
+        "--root",
+        metavar="DIR",
+        type=str,
+        default=None,
+        help="Report file paths under DIR (default: the --path of shard 1's run)",
+    )
+    args = ap.parse_args(argv)
+
+    try:
+        root = Path(args.root) if args.root is not None else None
+        results, summary = merge_partials([Path(p) for p in args.partials], root)
+        out = open_output(args.output)
+    except (OSError, ValueError) as exc:
+        ap.error(str(exc))
+
+    writer = make_writer(args.format, out)
+    try:
+        writer.begin()
+        for result in results:
+            writer.write(result)
+        writer.end(summary)
+    except ValueError as exc:
+        ap.error(str(exc))
+    finally:
+        if out is sys.stdout:
+            out.flush()
+        else:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
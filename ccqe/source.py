@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import io
+import mmap
+import re
+import tokenize
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, Union, overload
+
+# Line ends as seen by universal newline reading; tokenize gets one line
+# per match.
+_NEWLINE_RE = re.compile(rb"\r\n|\r|\n")
+
+# Line boundaries of str.splitlines() in UTF-8, which PreparedSource uses
+# to number lines (it also splits on form feeds and the Unicode line and
+# paragraph separators).
+_SPLITLINES_RE = re.compile(rb"\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e]|\xc2\x85|\xe2\x80[\xa8\xa9]")
+
+_UTF8 = ("utf-8", "utf-8-sig")
+
+
+def _detect_encoding(buf: Any) -> str:
+    """
+    Return the encoding declared by a BOM or PEP 263 cookie.
+
+    Invalid or unknown declarations fall back to UTF-8, which is how the
+    file would have been read before encodings were honored.
+    """
+    lines = iter(_NEWLINE_RE.split(bytes(buf[:1024]), maxsplit=2)[:2])
+    try:
+        encoding, _ = tokenize.detect_encoding(lambda: next(lines, b"") + b"\n")
+    except SyntaxError:
+        return "utf-8"
+    return encoding
+
+
+class SourceLines:
+    """
+    Lazy, read-only sequence of a SourceFile's lines.
+
+    Indexing and len() match str.splitlines() of the decoded text. Only
+    the byte offsets of the lines are kept; each line is decoded when it is
+    requested.
+    """
+
+    def __init__(self, owner: SourceFile) -> None:
+        self._owner = owner
+        buf = owner.buffer
+        starts = array("q", [owner.start])
+        ends = array("q")
+        for m in _SPLITLINES_RE.finditer(buf, owner.start):
+            ends.append(m.start())
+            starts.append(m.end())
+        ends.append(len(buf))
+        # A trailing segment that decodes to nothing is not a line.
+        if not owner.decode(buf[starts[-1]:ends[-1]]):
+            starts.pop()
+            ends.pop()
+        self._starts = starts
+        self._ends = ends
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+    @overload
+    def __getitem__(self, index: slice) -> List[str]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        buf = self._owner.buffer
+        return self._owner.decode(buf[self._starts[index]:self._ends[index]])
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(len(self)))
+
+
+class SourceFile:
+    """
+    Memory-mapped view of a Python source file.
+
+    The file is mapped instead of read, its encoding is taken from the BOM
+    or PEP 263 cookie, and text is decoded a line at a time: readline feeds
+    tokenize (see reader), lines gives random access for building code
+    contexts. Besides the mapping, only line offsets and the lines in use
+    are held in memory.
+
+    data, if given, is the file's content as already read (see
+    ccqe.ingest) and is used instead of mapping the file. Use as a context
+    manager, or call close(), to release the mapping.
+    """
+
+    def __init__(self, path: Path, data: Optional[bytes] = None) -> None:
+        self.path = path
+        self._map: Optional[mmap.mmap] = None
+        if data is None:
+            with open(path, "rb") as fh:
+                try:
+                    self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # Empty files cannot be mapped.
+                    data = b""
+        self.buffer: Any = self._map if self._map is not None else data
+
+        self.encoding = _detect_encoding(self.buffer)
+        self.start = 0
+        self._codec = self.encoding
+        if self.encoding in _UTF8:
+            # The BOM is skipped once here; decoding slices with utf-8-sig
+            # would also drop U+FEFF at the start of later lines.
+            if self.encoding == "utf-8-sig":
+                self.start = len(b"\xef\xbb\xbf")
+            self._codec = "utf-8"
+        self._lines: Optional[Union[SourceLines, List[str]]] = None
+
+    @property
+    def lazy(self) -> bool:
+        """
+        True if lines can be decoded one by one.
+
+        That holds for UTF-8 files; other declared encodings use the
+        whole decoded text instead (see text()).
+        """
+        return self.encoding in _UTF8
+
+    def decode(self, raw: bytes) -> str:
+        """Decode a slice of the buffer, dropping undecodable bytes."""
+        return raw.decode(self._codec, errors="ignore")
+
+    def reader(self) -> Callable[[], str]:
+        """
+        Return a readline callable for tokenize.generate_tokens.
+
+        Each call returns the next line with its end translated to "\\n",
+        and "" at the end of the file. Lines are decoded one at a time when
+        lazy is true; otherwise they come from the decoded text.
+        """
+        if not self.lazy:
+            return io.StringIO(self.text()).readline
+
+        buf = self.buffer
+        pos = self.start
+
+        def readline() -> str:
+            nonlocal pos
+            if pos >= len(buf):
+                return ""
+            m = _NEWLINE_RE.search(buf, pos)
+            if m is None:
+                line = self.decode(buf[pos:])
+                pos = len(buf)
+                return line
+            line = self.decode(buf[pos:m.start()]) + "\n"
+            pos = m.end()
+            return line
+
+        return readline
+
+    @property
+    def lines(self) -> Union[SourceLines, List[str]]:
+        """Lines of the file, numbered like str.splitlines() of text()."""
+        if self._lines is None:
+            self._lines = SourceLines(self) if self.lazy else self.text().splitlines()
+        return self._lines
+
+    def text(self) -> str:
+        """Decode the whole file, with universal newlines."""
+        text = self.decode(self.buffer[self.start:])
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+
+    def close(self) -> None:
+        """Release the memory mapping; lines can no longer be read afterwards."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def __enter__(self) -> SourceFile:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Deque, Iterator, List, Optional, Set, Tuple
+
+from .parser import CommentSpan, iter_python_entities
+from .preprocess import PreparedComment, normalize_window, tokenize_text
+from .results import CommentResult
+from .scorers import active_scorer
+from .source import _detect_encoding
+from .summary import Summary
+
+if TYPE_CHECKING:
+    from .profile import Profile
+
+# Files larger than this many bytes are streamed instead of parsed whole.
+DEFAULT_STREAM_THRESHOLD = 32 << 20
+
+# Source lines kept for building code contexts.
+RING_LINES = 4096
+
+# Comments per call to the scoring backend (see ccqe.scorers).
+BATCH_SIZE = 256
+
+
+class _LineRing:
+    """
+    readline wrapper that keeps the last lines read for code contexts.
+
+    Lines are counted the way PreparedSource numbers them (str.splitlines
+    of the text), so contexts match those of a whole-file run. Spans
+    handed to add() wait until the line after them has been read, then
+    their code context is built and they move to ready. Only the ring,
+    the waiting spans and the ready comments are held, however long the
+    file is.
+    """
+
+    def __init__(self, readline: Callable[[], str], keep: int = RING_LINES) -> None:
+        self._readline = readline
+        self.lines: Deque[str] = deque(maxlen=keep)
+        self.count = 0
+        self.eof = False
+        self.pending: Deque[CommentSpan] = deque()
+        self.ready: List[PreparedComment] = []
+
+    def readline(self) -> str:
+        chunk = self._readline()
+        if chunk:
+            lines = chunk.splitlines()
+            self.lines.extend(lines)
+            self.count += len(lines)
+        else:
+            self.eof = True
+        self._release()
+        return chunk
+
+    def add(self, span: CommentSpan) -> None:
+        self.pending.append(span)
+        self._release()
+
+    def finish(self) -> None:
+        """Build the contexts of every waiting span; the file has ended."""
+        self.eof = True
+        self._release()
+
+    def _release(self) -> None:
+        pending = self.pending
+        while pending and (self.eof or self.count > pending[0].lineno):
+            span = pending.popleft()
+            self.ready.append(
+                PreparedComment(span=span, tokens=tokenize_text(span.text), code_context=self.context(span.lineno))
+            )
+
+    def context(self, lineno: int) -> str:
+        """
+        Normalized code around a 1-based line number, as PreparedSource.context.
+
+        Lines that already left the ring are left out of the window.
+        """
+        first = max(lineno - 1, self.count - len(self.lines) + 1, 1)
+        last = min(lineno + 1, self.count)
+        offset = self.count - len(self.lines) + 1
+        window = [self.lines[n - offset] for n in range(first, last + 1)]
+        return normalize_window(window)
+
+
+def _record_fallback(profile: Profile, file: Path, step: str) -> None:
+    profile.record_fallback(step, file)
+
+
+def stream_file(
+    file: Path,
+    lines: Optional[Set[int]] = None,
+    profile: bool = False,
+) -> Tuple[Iterator[CommentResult], Summary, Optional[Profile]]:
+    """
+    Score the comments of a very large file in bounded memory.
+
+    The file is read through a text stream and tokenized incrementally
+    (see iter_python_entities); each comment is scored in small batches as
+    soon as the line after it has been read, and only the last RING_LINES
+    lines are kept for code contexts. No AST is built, nothing is cached,
+    and the window context mode is always used.
+
+    Returns the results as an iterator, with the file's Summary and, if
+    profile is true, its Profile; both are complete once the iterator is
+    exhausted. Results come in the order the token stream completes them:
+    inline comments where they occur, docstrings once their statement
+    ends. lines restricts the results as in analyze_file.
+    """
+    summary = Summary()
+    file_profile = None
+    if profile:
+        from .profile import Profile
+
+        file_profile = Profile()
+
+    def results() -> Iterator[CommentResult]:
+        clock = time.perf_counter
+        start = clock()
+        on_fallback = None
+        if file_profile is not None:
+            on_fallback = partial(_record_fallback, file_profile, file)
+
+        with open(file, "rb") as fh:
+            encoding = _detect_encoding(fh.read(1024))
+        scored = 0
+        with open(file, encoding=encoding, errors="ignore") as fh:
+            ring = _LineRing(fh.readline)
+            for span in iter_python_entities(file, ring.readline, on_fallback):
+                if lines is None or span.covers(lines):
+                    ring.add(span)
+                if len(ring.ready) >= BATCH_SIZE:
+                    scored += len(ring.ready)
+                    yield from _score(ring.ready, summary)
+                    ring.ready = []
+            ring.finish()
+            scored += len(ring.ready)
+            yield from _score(ring.ready, summary)
+
+        if file_profile is not None:
+            end = clock()
+            file_profile.record("stream_file", end - start, scored)
+            file_profile.record_file(file, end - start, file.stat().st_size)
+
+    return results(), summary, file_profile
+
+
+def _score(prepared: List[PreparedComment], summary: Summary) -> Iterator[CommentResult]:
+    scorer = active_scorer()
+    for pc, quality in zip(prepared, scorer.score_batch(prepared)):
+        suggestion = scorer.suggest(quality)
+        summary.files = 1
+        summary.add(quality, suggestion)
+        yield CommentResult(span=pc.span, quality=quality, suggestion=suggestion)
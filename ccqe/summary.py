@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from .feedback import SUGGESTIONS, Suggestion
+from .model import QualityScore
+
+
+@dataclass
+class Summary:
+    """
+    Aggregate statistics for a run, used to build the report summary block.
+
+    files            : number of files that contained at least one comment
+    comments         : number of comments and docstrings analyzed
+    label_counts     : number of comments per quality label
+    redundancy_sum   : sum of the redundancy signal across all comments
+    redundancy_count : number of comments contributing to redundancy_sum
+    needs_intent     : number of suggestions asking for intent or reason
+    suggestion_counts: number of comments per suggestion id (see
+                       ccqe.feedback.SUGGESTIONS)
+
+    Summaries are built per file and merged in file order, so the totals do
+    not depend on how the files were distributed across workers.
+    """
+    files: int = 0
+    comments: int = 0
+    label_counts: Dict[str, int] = field(default_factory=dict)
+    redundancy_sum: float = 0.0
+    redundancy_count: int = 0
+    needs_intent: int = 0
+    suggestion_counts: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, quality: QualityScore, suggestion: Suggestion) -> None:
+        """Record a single scored comment and the suggestion shown for it."""
+        self.comments += 1
+        self.label_counts[quality.label] = self.label_counts.get(quality.label, 0) + 1
+
+        # Redundancy is tracked so we can report an average across all comments
+        red = float(quality.signals.get("redundancy", 0.0) or 0.0)
+        self.redundancy_sum += red
+        self.redundancy_count += 1
+
+        # Suggestions are counted by id; their flags say which ones ask for
+        # intent (places where comments explain what, but not why).
+        self.suggestion_counts[suggestion.id] = self.suggestion_counts.get(suggestion.id, 0) + 1
+        if suggestion.asks_for_intent:
+            self.needs_intent += 1
+
+    def merge(self, other: Summary) -> None:
+        """Fold the counters of another summary into this one."""
+        self.files += other.files
+        self.comments += other.comments
+        for label, count in other.label_counts.items():
+            self.label_counts[label] = self.label_counts.get(label, 0) + count
+        self.redundancy_sum += other.redundancy_sum
+        self.redundancy_count += other.redundancy_count
+        self.needs_intent += other.needs_intent
+        for sid, count in other.suggestion_counts.items():
+            self.suggestion_counts[sid] = self.suggestion_counts.get(sid, 0) + count
+
+    def subtract(self, other: Summary) -> None:
+        """
+        Remove the counters of a summary that was merged in earlier.
+
+        Used to replace one file's contribution when it is analyzed again;
+        labels whose count drops to zero are dropped.
+        """
+        self.files -= other.files
+        self.comments -= other.comments
+        for label, count in other.label_counts.items():
+            remaining = self.label_counts.get(label, 0) - count
+            if remaining:
+                self.label_counts[label] = remaining
+            else:
+                self.label_counts.pop(label, None)
+        self.redundancy_sum -= other.redundancy_sum
+        self.redundancy_count -= other.redundancy_count
+        self.needs_intent -= other.needs_intent
+        for sid, count in other.suggestion_counts.items():
+            remaining = self.suggestion_counts.get(sid, 0) - count
+            if remaining:
+                self.suggestion_counts[sid] = remaining
+            else:
+                self.suggestion_counts.pop(sid, None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the counters as JSON-serializable data (see from_dict)."""
+        return {
+            "files": self.files,
+            "comments": self.comments,
+            "label_counts": dict(self.label_counts),
+            "redundancy_sum": self.redundancy_sum,
+            "redundancy_count": self.redundancy_count,
+            "needs_intent": self.needs_intent,
+            "suggestion_counts": dict(self.suggestion_counts),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Summary:
+        """Rebuild a summary written by to_dict; raises ValueError if malformed."""
+        try:
+            return cls(
+                files=int(data["files"]),
+                comments=int(data["comments"]),
+                label_counts={str(k): int(v) for k, v in data["label_counts"].items()},
+                redundancy_sum=float(data["redundancy_sum"]),
+                redundancy_count=int(data["redundancy_count"]),
+                needs_intent=int(data["needs_intent"]),
+                suggestion_counts={
+                    str(k): int(v) for k, v in data.get("suggestion_counts", {}).items()
+                },
+            )
+        except (KeyError, TypeError, AttributeError) as exc:
+            raise ValueError(f"invalid summary: {exc!r}") from None
+
+    def lines(self) -> List[str]:
+        """Render the summary block that follows the detailed report."""
+        out: List[str] = []
+        out.append("")  # separate the detailed report from the summary
+        out.append("Summary:")
+        out.append(f"  Files processed: {self.files}")
+        out.append(f"  Comments analyzed: {self.comments}")
+        for label in ("High", "Medium", "Low"):
+            out.append(f"  {label}: {self.label_counts.get(label, 0)}")
+
+        if self.redundancy_count:
+            avg_red = self.redundancy_sum / self.redundancy_count
+            out.append(f"  Avg redundancy: {avg_red:.2f}")
+
+        if self.comments:
+            pct_intent = 100.0 * self.needs_intent / self.comments
+            out.append(
+                "  Suggestions asking for intent: "
+                f"{self.needs_intent} ({pct_intent:.1f}% of comments)"
+            )
+            out.append("  Suggestions by category:")
+            for sid, suggestion in SUGGESTIONS.items():
+                count = self.suggestion_counts.get(sid, 0)
+                if count:
+                    out.append(f"    {suggestion.category}: {count}")
+        return out
@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import tokenize
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from . import model, preprocess
+from .cache import DEFAULT_INDEX_PATH
+from .discover import DiscoveryConfig, iter_python_files, load_config
+from .model import canonicalize_tokens
+from .preprocess import normalize_code_text, tokenize_text
+from .source import SourceFile
+
+# Bump when the way document tokens are extracted changes.
+INDEX_SCHEMA = 1
+
+
+def fingerprint() -> str:
+    """
+    Hash everything that decides which tokens a file contributes.
+
+    That is the index schema, the synonym groups, and the code
+    normalization tables; scoring rules and context options do not
+    matter here. An index built with a different fingerprint is rebuilt.
+    """
+    rules = {
+        "schema": INDEX_SCHEMA,
+        "synonyms": {k: sorted(v) for k, v in sorted(model.SYNONYM_GROUPS.items())},
+        "numbers": preprocess.NUMBER_MAP,
+        "operators": preprocess.OPERATOR_PATTERNS,
+        "rewrites": preprocess.EXTRA_REWRITE_RULES,
+    }
+    blob = json.dumps(rules, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+class _CodeReader:
+    """
+    readline wrapper that collects the code tokens of the lines read.
+
+    Each line is normalized and tokenized like a code context once
+    tokenize has moved past it, without the comment it ends with, so
+    words from comments do not count as code.
+    """
+
+    def __init__(self, readline: Callable[[], str]) -> None:
+        self._readline = readline
+        self._line = ""
+        self.comment_col: Optional[int] = None
+        self.tokens: Set[str] = set()
+
+    def readline(self) -> str:
+        self.flush()
+        self._line = self._readline()
+        return self._line
+
+    def flush(self) -> None:
+        line = self._line
+        if self.comment_col is not None:
+            line = line[:self.comment_col]
+            self.comment_col = None
+        if line:
+            self.tokens.update(canonicalize_tokens(tokenize_text(normalize_code_text(line))))
+        self._line = ""
+
+
+def document_tokens(path: Path) -> Set[str]:
+    """
+    The set of canonical code tokens in a file, as one index document.
+
+    The file is read a line at a time (see ccqe.source). If it does not
+    tokenize, the remaining lines are taken as they are.
+    """
+    with SourceFile(path) as source:
+        reader = _CodeReader(source.reader())
+        try:
+            for tok in tokenize.generate_tokens(reader.readline):
+                if tok.type == tokenize.COMMENT:
+                    reader.comment_col = tok.start[1]
+        except (tokenize.TokenError, SyntaxError):
+            while reader.readline():
+                pass
+        reader.flush()
+        return reader.tokens
+
+
+class TokenWeights:
+    """
+    IDF weights of code tokens, as used by the weighted redundancy signal.
+
+    ids maps each token to its slot in idf, a flat array of doubles, so a
+    lookup is one dict access and one array read. The weight of a token
+    is log((1 + docs) / (1 + df)) + 1 for a token found in df of docs
+    files; tokens the index has never seen get the weight of df = 0.
+    digest identifies the weights for the result cache (see
+    ccqe.cache.fingerprint).
+    """
+
+    __slots__ = ("ids", "idf", "default", "digest")
+
+    def __init__(self, tokens: Sequence[str], df: Sequence[int], docs: int) -> None:
+        self.ids: Dict[str, int] = {tok: i for i, tok in enumerate(tokens)}
+        self.idf = array("d", (math.log((1 + docs) / (1 + n)) + 1 for n in df))
+        self.default = math.log(1 + docs) + 1
+        h = hashlib.sha256(str(docs).encode("ascii"))
+        h.update("\n".join(tokens).encode("utf-8"))
+        h.update(array("q", df).tobytes())
+        self.digest = h.hexdigest()
+
+    def weight(self, token: str) -> float:
+        i = self.ids.get(token)
+        return self.default if i is None else self.idf[i]
+
+
+class TokenIndex:
+    """
+    Document frequencies of code tokens over one project tree.
+
+    Each file is a document (see document_tokens). The index lives in a
+    SQLite database: the vocabulary with each token's document frequency,
+    and per file its (mtime, size) stamp and the ids of its tokens as a
+    packed array. update() only reads files whose stamp changed and
+    adjusts the frequencies by what they removed and added, so keeping
+    the index current costs a directory scan plus the changed files.
+    The index is rebuilt from scratch when the tokenization rules change
+    (see fingerprint).
+    """
+
+    def __init__(self, path: Path, readonly: bool = False) -> None:
+        self.path = Path(path)
+        if readonly:
+            # Loading weights must never change the index: an index built
+            # with other rules is reported, not reset (see load_weights).
+            self._db = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True)
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), isolation_level=None)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vocab ("
+            " id INTEGER PRIMARY KEY, token TEXT UNIQUE NOT NULL, df INTEGER NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL,"
+            " size INTEGER NOT NULL, tokens BLOB NOT NULL)"
+        )
+        self._check_fingerprint()
+
+    def stored_fingerprint(self) -> Optional[str]:
+        """The fingerprint the index was built with, or None for a new one."""
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        return None if row is None else row[0]
+
+    def _check_fingerprint(self) -> None:
+        current = fingerprint()
+        if self.stored_fingerprint() == current:
+            return
+        self._db.execute("DELETE FROM vocab")
+        self._db.execute("DELETE FROM files")
+        self._db.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)", (current,)
+        )
+
+    def _vocab(self) -> Tuple[List[str], array]:
+        tokens: List[str] = []
+        df = array("q")
+        # Ids are assigned densely from zero, so the row order is the slot.
+        for token, count in self._db.execute("SELECT token, df FROM vocab ORDER BY id"):
+            tokens.append(token)
+            df.append(count)
+        return tokens, df
+
+    @property
+    def docs(self) -> int:
+        """Number of files in the index."""
+        return self._db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    @property
+    def vocab_size(self) -> int:
+        """Number of distinct tokens seen so far."""
+        return self._db.execute("SELECT COUNT(*) FROM vocab").fetchone()[0]
+
+    def update(
+        self, root: Path, discovery: Optional[DiscoveryConfig] = None
+    ) -> Tuple[int, int, int]:
+        """
+        Bring the index in line with the Python files under root.
+
+        Files are found as in a normal run (see ccqe.discover) and stored
+        by their path relative to root. Returns the number of files in the
+        index, of files (re)read, and of files dropped.
+        """
+        root = Path(root)
+        files = [root] if root.is_file() else iter_python_files(root, discovery)
+        stamps = {
+            path: (mtime, size)
+            for path, mtime, size in self._db.execute("SELECT path, mtime_ns, size FROM files")
+        }
+        tokens, df = self._vocab()
+        stored = array("q", df)
+        ids = {tok: i for i, tok in enumerate(tokens)}
+
+        def forget(key: str) -> None:
+            row = self._db.execute("SELECT tokens FROM files WHERE path = ?", (key,)).fetchone()
+            old = array("I")
+            old.frombytes(row[0])
+            for i in old:
+                df[i] -= 1
+
+        seen: Set[str] = set()
+        changed = 0
+        self._db.execute("BEGIN")
+        try:
+            for file in files:
+                try:
+                    st = os.stat(file)
+                except OSError:
+                    continue
+                key = file.name if file == root else file.relative_to(root).as_posix()
+                seen.add(key)
+                stamp = (st.st_mtime_ns, st.st_size)
+                if stamps.get(key) == stamp:
+                    continue
+                try:
+                    doc = document_tokens(file)
+                except OSError:
+                    continue
+                if key in stamps:
+                    forget(key)
+                packed = array("I")
+                for tok in sorted(doc):
+                    i = ids.get(tok)
+                    if i is None:
+                        i = ids[tok] = len(tokens)
+                        tokens.append(tok)
+                        df.append(0)
+                    df[i] += 1
+                    packed.append(i)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO files (path, mtime_ns, size, tokens) VALUES (?, ?, ?, ?)",
+                    (key, stamp[0], stamp[1], packed.tobytes()),
+                )
+                changed += 1
+
+            removed = [key for key in stamps if key not in seen]
+            for key in removed:
+                forget(key)
+                self._db.execute("DELETE FROM files WHERE path = ?", (key,))
+
+            self._db.executemany(
+                "INSERT OR REPLACE INTO vocab (id, token, df) VALUES (?, ?, ?)",
+                (
+                    (i, tokens[i], df[i])
+                    for i in range(len(tokens))
+                    if i >= len(stored) or df[i] != stored[i]
+                ),
+            )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return len(seen), changed, len(removed)
+
+    def weights(self) -> TokenWeights:
+        """Load the IDF weights of the current index."""
+        tokens, df = self._vocab()
+        return TokenWeights(tokens, df, self.docs)
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def load_weights(path: Path) -> TokenWeights:
+    """
+    Read the token weights from an index built by ccqe index.
+
+    The index is opened read-only. Raises OSError if there is no index at
+    path, and ValueError if it is empty or was built with other
+    tokenization rules (other synonyms, say); only ccqe index rebuilds it.
+    """
+    path = Path(path)
+    if not path.is_file():
+        raise OSError(f"{path}: no token index (build it with ccqe index)")
+    try:
+        index = TokenIndex(path, readonly=True)
+    except sqlite3.Error as exc:
+        raise OSError(f"{path}: cannot open the token index: {exc}") from exc
+    try:
+        try:
+            built = index.stored_fingerprint()
+            docs = index.docs
+        except sqlite3.Error as exc:
+            raise ValueError(f"{path}: not a token index: {exc}") from exc
+        if built != fingerprint():
+            raise ValueError(
+                f"{path}: the token index was built with other tokenization rules"
+                " (run ccqe index with the same --synonyms)"
+            )
+        if not docs:
+            raise ValueError(f"{path}: the token index is empty (run ccqe index)")
+        return index.weights()
+    finally:
+        index.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Build or update the token index of a tree (ccqe index)."""
+    ap = argparse.ArgumentParser(
+        prog="ccqe index",
+        description="Build or update the document frequencies used by --idf-index",
+    )
+    ap.add_argument("--path", type=str, required=True, help="Path to a Python file or directory")
+    ap.add_argument(
+        "--index",
+        metavar="FILE",
+        type=str,
+        default=str(DEFAULT_INDEX_PATH),
+        help=f"Index database (default: {DEFAULT_INDEX_PATH})",
+    )
+    ap.add_argument(
+        "--synonyms",
+        metavar="FILE",
+        type=str,
+        default=None,
+        help="JSON file with extra synonym groups, as passed to the analysis runs",
+    )
+    args = ap.parse_args(argv)
+    path = Path(args.path)
+
+    if args.synonyms is not None:
+        try:
+            model.compile_model(model.load_synonym_groups(Path(args.synonyms)))
+        except (OSError, ValueError) as exc:
+            ap.error(f"cannot load synonyms: {exc}")
+    try:
+        discovery = load_config(path)
+    except (OSError, ValueError) as exc:
+        ap.error(f"cannot load [tool.ccqe] settings: {exc}")
+
+    index = TokenIndex(Path(args.index))
+    try:
+        total, changed, removed = index.update(path, discovery)
+        vocab = index.vocab_size
+    finally:
+        index.close()
+    print(f"Indexed {total} files ({changed} read, {removed} removed), {vocab} tokens")
+
+
+if __name__ == "__main__":
+    main()
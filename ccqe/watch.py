@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .cli import _map_files, format_report_line
+from .discover import DiscoveryConfig, iter_file_entries
+from .results import CommentResult
+from .stream import DEFAULT_STREAM_THRESHOLD
+from .summary import Summary
+
+# Seconds between polls of the tree.
+DEFAULT_INTERVAL = 0.1
+
+# Seconds without further changes before a burst of saves is processed.
+DEFAULT_DEBOUNCE = 0.05
+
+# Upper bound on how long a steady stream of changes can delay an update.
+MAX_DEBOUNCE_WAIT = 1.0
+
+# Change sets of up to this many files are scored in this process: a
+# file takes a few milliseconds, while starting a process pool costs tens
+# of milliseconds before the first result. Larger ones (a branch switch,
+# say) use --jobs workers.
+SERIAL_MAX_FILES = 8
+
+# Seconds between evictions from the result cache (see
+# ccqe.cache.ResultCache.prune), which otherwise only happen at the end
+# of a run.
+PRUNE_INTERVAL = 60.0
+
+# Clear the terminal and move the cursor home.
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+
+Stamp = Tuple[int, int]
+
+
+class WatchState:
+    """
+    Per-file results of a watched tree and the running totals.
+
+    Each file's results and Summary are kept. When files change, only
+    those are analyzed again, and the totals are updated by subtracting
+    the files' old summaries and merging the new ones, so the cost of an
+    update does not grow with the size of the tree.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        discovery: Optional[DiscoveryConfig] = None,
+        cache_dir: Optional[Path] = None,
+        jobs: int = 1,
+        stream_threshold: Optional[int] = DEFAULT_STREAM_THRESHOLD,
+    ) -> None:
+        self.root = root
+        self.discovery = discovery
+        self.cache_dir = cache_dir
+        self.jobs = jobs
+        self.stream_threshold = stream_threshold
+        # Keyed by path string so that rescans of unchanged files build
+        # no Path objects.
+        self.stamps: Dict[str, Stamp] = {}
+        self.results: Dict[Path, List[CommentResult]] = {}
+        self.summaries: Dict[Path, Summary] = {}
+        self.total = Summary()
+        self.pruned_at: Optional[float] = None
+
+    def scan(self) -> Tuple[Dict[Path, Stamp], List[Path]]:
+        """
+        Compare the tree with the last update.
+
+        Returns the files that are new or whose (mtime, size) changed,
+        with their current stamp, and the files that are gone, without
+        updating any state.
+        """
+        if self.root.is_file():
+            entries = [self.root]
+        else:
+            entries = iter_file_entries(self.root, self.discovery)
+        seen = set()
+        changed: Dict[Path, Stamp] = {}
+        stamps = self.stamps
+        for entry in entries:
+            try:
+                st = os.stat(entry)
+            except OSError:
+                continue
+            key = os.fspath(entry)
+            seen.add(key)
+            stamp = (st.st_mtime_ns, st.st_size)
+            if stamps.get(key) != stamp:
+                changed[Path(key)] = stamp
+        removed = [Path(key) for key in stamps if key not in seen]
+        return changed, removed
+
+    def recheck(
+        self, changed: Dict[Path, Stamp], removed: Sequence[Path]
+    ) -> Tuple[Dict[Path, Stamp], List[Path]]:
+        """
+        Like scan, but only stat the files of an earlier scan.
+
+        This is what a burst of saves is debounced with: the rest of the
+        tree is not walked again, and files created meanwhile are left
+        for the next scan. A removed file that is back (an editor's
+        delete and rename, say) counts as changed.
+        """
+        stamps = self.stamps
+        now_changed: Dict[Path, Stamp] = {}
+        now_removed: List[Path] = []
+        for file in (*changed, *removed):
+            try:
+                st = os.stat(file)
+            except OSError:
+                if str(file) in stamps:
+                    now_removed.append(file)
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+            if stamps.get(str(file)) != stamp:
+                now_changed[file] = stamp
+        return now_changed, now_removed
+
+    def update(self, changed: Dict[Path, Stamp], removed: Iterable[Path] = ()) -> None:
+        """
+        Re-analyze changed files (from scan), drop removed ones, and adjust totals.
+
+        Up to SERIAL_MAX_FILES changed files are analyzed without a process
+        pool. The result cache, if any, is pruned at most every
+        PRUNE_INTERVAL seconds.
+        """
+        for file in removed:
+            self._forget(file)
+        if not changed:
+            return
+        jobs = self.jobs if len(changed) > SERIAL_MAX_FILES else 1
+        work = _map_files(
+            list(changed), jobs, self.cache_dir, stream_threshold=self.stream_threshold
+        )
+        for file, (file_results, file_summary, _) in work:
+            # Streamed files fill their Summary as the results are consumed.
+            file_results = list(file_results)
+            self._forget(file)
+            self.stamps[str(file)] = changed[file]
+            self.results[file] = file_results
+            self.summaries[file] = file_summary
+            self.total.merge(file_summary)
+        self._prune_cache()
+
+    def _prune_cache(self) -> None:
+        if self.cache_dir is None:
+            return
+        now = time.monotonic()
+        if self.pruned_at is not None and now - self.pruned_at < PRUNE_INTERVAL:
+            return
+        from .cache import open_cache
+
+        open_cache(self.cache_dir).prune()
+        self.pruned_at = now
+
+    def _forget(self, file: Path) -> None:
+        self.stamps.pop(str(file), None)
+        self.results.pop(file, None)
+        old = self.summaries.pop(file, None)
+        if old is not None:
+            self.total.subtract(old)
+
+    def report_lines(self, files: Optional[Iterable[Path]] = None) -> List[str]:
+        """Report lines of the given files (default: all), in file order."""
+        selected = sorted(self.results) if files is None else sorted(files)
+        return [
+            format_report_line(result)
+            for file in selected
+            for result in self.results.get(file, ())
+        ]
+
+
+def render(
+    state: WatchState, changed: Iterable[Path], removed: Sequence[Path], seconds: float
+) -> List[str]:
+    """Dashboard text after an update: what changed, its report lines, and the totals."""
+    changed = list(changed)
+    out = [
+        f"Watching {state.root}: {len(state.results)} files",
+        f"Updated {len(changed)} changed and {len(removed)} removed files in {seconds * 1000:.0f} ms",
+        "",
+        "Report:",
+    ]
+    out.extend(state.report_lines(changed))
+    out.extend(state.total.lines())
+    return out
+
+
+def watch(
+    root: Path,
+    discovery: Optional[DiscoveryConfig] = None,
+    cache_dir: Optional[Path] = None,
+    jobs: int = 1,
+    interval: float = DEFAULT_INTERVAL,
+    debounce: float = DEFAULT_DEBOUNCE,
+    emit: Optional[Callable[[List[str]], None]] = None,
+    should_stop: Callable[[], bool] = lambda: False,
+    stream_threshold: Optional[int] = DEFAULT_STREAM_THRESHOLD,
+) -> WatchState:
+    """
+    Poll root for changes and re-score changed files until should_stop().
+
+    The whole tree is analyzed once; after that the tree is polled every
+    interval seconds. When changes are seen, polling continues until no
+    new changes appear for debounce seconds (at most MAX_DEBOUNCE_WAIT),
+    checking only the files already seen to change (see
+    WatchState.recheck), then only the changed files are analyzed and emit is called with the
+    updated dashboard (see render). By default the dashboard replaces the
+    terminal contents. Files larger than stream_threshold bytes are
+    streamed as in iter_results. Returns the final state.
+    """
+    if emit is None:
+        emit = _print_dashboard
+
+    state = WatchState(root, discovery, cache_dir, jobs, stream_threshold)
+    start = time.perf_counter()
+    changed, removed = state.scan()
+    state.update(changed, removed)
+    emit(render(state, changed, removed, time.perf_counter() - start))
+
+    while not should_stop():
+        time.sleep(interval)
+        changed, removed = state.scan()
+        if not changed and not removed:
+            continue
+
+        first_seen = time.perf_counter()
+        while time.perf_counter() - first_seen < MAX_DEBOUNCE_WAIT:
+            time.sleep(debounce)
+            more_changed, more_removed = state.recheck(changed, removed)
+            if (more_changed, more_removed) == (changed, removed):
+                break
+            changed, removed = more_changed, more_removed
+
+        start = time.perf_counter()
+        try:
+            state.update(changed, removed)
+        except OSError:
+            # A file vanished between the scan and its analysis; files not
+            # updated yet keep their old stamp and are picked up next poll.
+            continue
+        emit(render(state, changed, removed, time.perf_counter() - start))
+    return state
+
+
+def _print_dashboard(lines: List[str]) -> None:
+    out = sys.stdout
+    if out.isatty():
+        out.write(CLEAR_SCREEN)
+    out.write("\n".join(lines) + "\n")
+    out.flush()
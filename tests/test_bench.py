@@ -0,0 +1,27 @@
+from ccqe.bench import compare, run
+
+
+def test_small_benchmark_run_reports_every_stage():
+    report = run(["many_small", "docstring_heavy"], scale=0.01, repeat=1)
+
+    for corpus in report["corpora"].values():
+        assert corpus["files"] >= 1
+        assert set(corpus["stages"]) == {
+            "extract_python_entities",
+            "build_prepared",
+            "predict_quality",
+            "suggestion_from",
+            "score[heuristic]",
+            "score[linear]",
+            "analyze_path",
+        }
+        assert corpus["stages"]["analyze_path"]["comments_per_sec"] > 0
+
+
+def test_compare_flags_slow_stages_only():
+    def report(cps):
+        return {"corpora": {"c": {"stages": {"s": {"comments_per_sec": cps}}}}}
+
+    assert compare(report(90.0), report(100.0), max_regression=20) == []
+    problems = compare(report(50.0), report(100.0), max_regression=20)
+    assert len(problems) == 1 and problems[0].startswith("c/s:")
@@ -0,0 +1,123 @@
+import copy
+from pathlib import Path
+
+import ccqe.cache as cache
+import ccqe.cli as cli
+import ccqe.model as model
+import ccqe.preprocess as preprocess
+from ccqe.cache import ResultCache
+from ccqe.cli import analyze_path
+from ccqe.model import compile_model, set_token_weights
+from ccqe.preprocess import register_rewrite_rule, set_context_options
+from ccqe.scorers import set_scorer
+
+
+CODE = '''\
+def f(x):
+    """Clamp x because callers may pass negative values."""
+    # add one
+    return x + 1
+'''
+
+
+def test_cached_run_matches_and_skips_parsing(tmp_path: Path, monkeypatch):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.py").write_text(CODE, encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+
+    uncached = analyze_path(src)
+    first = analyze_path(src, cache_dir=cache_dir)
+
+    def fail(path):
+        raise AssertionError(f"{path} should have been served from the cache")
+
+    monkeypatch.setattr(cli, "extract_python_entities", fail)
+    second = analyze_path(src, cache_dir=cache_dir)
+
+    assert second == first == uncached
+
+
+def test_cache_invalidated_when_rules_change(tmp_path: Path, monkeypatch):
+    stored = ResultCache(tmp_path)
+    stored.put("abc", [], [])
+    assert stored.get("abc", tmp_path / "a.py") == ([], [])
+    stored.close()
+
+    monkeypatch.setattr(model, "INTENT_TOKENS", model.INTENT_TOKENS | {"since"})
+    cache.invalidate_fingerprint()
+    try:
+        changed = ResultCache(tmp_path)
+        assert changed.get("abc", tmp_path / "a.py") is None
+    finally:
+        monkeypatch.undo()
+        cache.invalidate_fingerprint()
+
+
+def test_prune_evicts_least_recently_used(tmp_path: Path):
+    cache = ResultCache(tmp_path, max_bytes=3)
+    cache.put("old", [], [])
+    cache.put("new", [], [])
+    assert cache.prune() == 1
+    assert cache.get("old", tmp_path / "a.py") is None
+    assert cache.get("new", tmp_path / "a.py") is not None
+
+
+def test_options_changed_in_process_do_not_reuse_results(tmp_path: Path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.py").write_text(CODE, encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+
+    window = analyze_path(src, cache_dir=cache_dir)
+    set_context_options("ast")
+    try:
+        assert analyze_path(src, cache_dir=cache_dir) == analyze_path(src)
+    finally:
+        set_context_options("window")
+    assert analyze_path(src, cache_dir=cache_dir) == window
+
+
+def test_fingerprint_is_hashed_once_per_option_change(tmp_path: Path, monkeypatch):
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(3):
+        (src / f"m{i}.py").write_text(CODE, encoding="utf-8")
+    hashed = []
+    compute = cache._compute_fingerprint
+
+    def spy():
+        hashed.append(1)
+        return compute()
+
+    monkeypatch.setattr(cache, "_compute_fingerprint", spy)
+    cache.invalidate_fingerprint()
+    analyze_path(src, cache_dir=tmp_path / "cache")
+    assert len(hashed) == 1
+
+    # Keep what the setters change local to this test.
+    monkeypatch.setattr(preprocess, "EXTRA_REWRITE_RULES", [])
+    monkeypatch.setattr(preprocess, "_normalizer", preprocess._normalizer)
+    monkeypatch.setitem(preprocess.CONTEXT_OPTIONS, "budget", preprocess.CONTEXT_OPTIONS["budget"])
+    monkeypatch.setattr(model, "SYNONYM_GROUPS", copy.deepcopy(model.SYNONYM_GROUPS))
+    monkeypatch.setattr(model, "_CANONICAL", dict(model._CANONICAL))
+    before = cache.fingerprint()
+    setters = [
+        lambda: set_context_options(budget=32),
+        lambda: register_rewrite_rule(r"\bnil\b", "none"),
+        lambda: compile_model({"fetch": ["grab"]}),
+        lambda: set_token_weights(None),
+        lambda: set_scorer(),
+    ]
+    try:
+        for setter in setters:
+            hashed.clear()
+            setter()
+            assert hashed == []
+            cache.fingerprint()
+            cache.fingerprint()
+            assert len(hashed) == 1
+        assert cache.fingerprint() != before
+    finally:
+        monkeypatch.undo()
+        cache.invalidate_fingerprint()
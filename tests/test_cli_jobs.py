@@ -0,0 +1,21 @@
+from pathlib import Path
+from ccqe.cli import analyze_path
+
+
+def test_parallel_run_matches_serial_run(tmp_path: Path):
+    # Several files so the process pool actually splits the work
+    for i in range(5):
+        code = f"""\
+# increment counter {i}
+def f{i}(x):
+    \"\"\"Clamp x because callers may pass negative values.\"\"\"
+    # add one
+    return x + {i}
+"""
+        (tmp_path / f"mod{i}.py").write_text(code, encoding="utf-8")
+
+    serial = analyze_path(tmp_path, jobs=1)
+    parallel = analyze_path(tmp_path, jobs=3)
+
+    assert parallel == serial
+    assert any("Files processed: 5" in ln for ln in parallel)
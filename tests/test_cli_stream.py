@@ -0,0 +1,23 @@
+from pathlib import Path
+
+from ccqe.cli import analyze_path, format_report_line, iter_results
+from ccqe.summary import Summary
+
+
+def test_iter_results_streams_and_fills_summary(tmp_path: Path):
+    (tmp_path / "a.py").write_text("# add one\nx = 1\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("y = 2\n", encoding="utf-8")
+
+    summary = Summary()
+    results = iter_results(tmp_path, summary=summary)
+
+    first = next(results)
+    assert first.span.file.name == "a.py"
+    assert first.quality.label in {"High", "Medium", "Low"}
+
+    rest = list(results)
+    assert rest == []
+    assert summary.files == 1 and summary.comments == 1
+
+    lines = analyze_path(tmp_path)
+    assert lines == [format_report_line(first)] + summary.lines()
@@ -0,0 +1,74 @@
+import ast
+from pathlib import Path
+
+import pytest
+
+from ccqe import preprocess
+from ccqe.context import ContextIndex
+from ccqe.parser import CommentSpan
+from ccqe.preprocess import PreparedSource, build_prepared, set_context_options
+
+SOURCE = '''\
+"""Module docstring."""
+import os
+
+
+def f(path):
+    """Open the file at path."""
+    # check the path first
+    if not os.path.exists(path):
+        return None
+    data = open(path).read()  # read all
+    return data
+
+
+def g():
+    """Only a docstring."""
+'''
+
+
+def span(lineno: int, context: str = "inline") -> CommentSpan:
+    return CommentSpan(file=Path("x.py"), lineno=lineno, text="note", context=context)
+
+
+@pytest.fixture
+def ast_context():
+    saved = dict(preprocess.CONTEXT_OPTIONS)
+    set_context_options("ast", 64)
+    yield
+    set_context_options(**saved)
+
+
+def test_index_ranges():
+    index = ContextIndex(ast.parse(SOURCE))
+    assert index.range_for(span(1, "docstring")) == (2, 15)
+    assert index.range_for(span(5, "docstring")) == (8, 11)
+    assert index.range_for(span(14, "docstring")) == (14, 14)
+    # Own-line comment: the statement that follows it.
+    assert index.range_for(span(7)) == (8, 9)
+    # Trailing comment: its own statement.
+    assert index.range_for(span(10)) == (10, 10)
+
+
+def test_ast_context_uses_the_documented_body(ast_context):
+    prepared = PreparedSource(SOURCE)
+    doc = build_prepared(span(5, "docstring"), prepared).code_context
+    assert "exists" in doc and "Open the file" not in doc
+
+    set_context_options(budget=3)
+    short = build_prepared(span(5, "docstring"), PreparedSource(SOURCE)).code_context
+    assert short.count("\n") < doc.count("\n")
+
+
+def test_unparsable_source_falls_back_to_window(ast_context):
+    source = "# note\nx = (\n"
+    assert build_prepared(span(1), PreparedSource(source)).code_context == (
+        PreparedSource(source).context(1)
+    )
+
+
+def test_invalid_options_are_rejected():
+    with pytest.raises(ValueError):
+        set_context_options("nearest")
+    with pytest.raises(ValueError):
+        set_context_options(budget=0)
@@ -0,0 +1,84 @@
+from pathlib import Path
+
+from ccqe.cli import analyze_path
+from ccqe.discover import DiscoveryConfig, iter_python_files, load_config
+
+
+def make_tree(root: Path, files) -> None:
+    for rel in files:
+        f = root / rel
+        f.parent.mkdir(parents=True, exist_ok=True)
+        f.write_text("# note\nx = 1\n", encoding="utf-8")
+
+
+def rels(root: Path, files) -> list:
+    return [f.relative_to(root).as_posix() for f in files]
+
+
+def test_default_rules_prune_tool_directories(tmp_path: Path):
+    make_tree(tmp_path, [
+        "a.py",
+        "pkg/b.py",
+        "pkg/data.txt",
+        ".venv/lib/site.py",
+        "node_modules/x/y.py",
+        "build/lib/c.py",
+        "pkg/__pycache__/b.py",
+        "ccqe.egg-info/d.py",
+    ])
+    assert rels(tmp_path, iter_python_files(tmp_path)) == ["a.py", "pkg/b.py"]
+
+
+def test_gitignore_and_globs(tmp_path: Path):
+    make_tree(tmp_path, [
+        "a.py",
+        "gen/big_pb2.py",
+        "pkg/keep.py",
+        "pkg/skip_me.py",
+        "pkg/sub/also.py",
+        "tests/test_a.py",
+    ])
+    (tmp_path / ".gitignore").write_text("gen/\n", encoding="utf-8")
+    (tmp_path / "pkg" / ".gitignore").write_text("skip_*.py\n/sub\n", encoding="utf-8")
+
+    found = rels(tmp_path, iter_python_files(tmp_path))
+    assert found == ["a.py", "pkg/keep.py", "tests/test_a.py"]
+
+    config = DiscoveryConfig(exclude=["tests/", "!gen/"], use_gitignore=True)
+    found = rels(tmp_path, iter_python_files(tmp_path, config))
+    assert found == ["a.py", "gen/big_pb2.py", "pkg/keep.py"]
+
+    config = DiscoveryConfig(include=["pkg/**/*.py"], use_gitignore=False)
+    found = rels(tmp_path, iter_python_files(tmp_path, config))
+    assert found == ["pkg/keep.py", "pkg/skip_me.py", "pkg/sub/also.py"]
+
+
+def test_pyproject_settings(tmp_path: Path):
+    make_tree(tmp_path, ["a.py", "vendor/lib.py"])
+    (tmp_path / "pyproject.toml").write_text(
+        '[tool.ccqe]\nexclude = ["vendor/"]\n', encoding="utf-8"
+    )
+    config = load_config(tmp_path)
+    assert config.project_exclude == ["vendor/"]
+    lines = analyze_path(tmp_path, discovery=config)
+    assert "  Files processed: 1" in lines
+
+
+def test_pyproject_patterns_are_relative_to_its_directory(tmp_path: Path):
+    make_tree(
+        tmp_path,
+        ["pkg/gen/a.py", "pkg/keep.py", "pkg/sub/gen/b.py", "pkg/sub/keep.py", "pkg/pkg/gen/c.py"],
+    )
+    (tmp_path / "pyproject.toml").write_text(
+        '[tool.ccqe]\nexclude = ["pkg/gen/", "pkg/sub/gen/b.py"]\n', encoding="utf-8"
+    )
+    root = tmp_path / "pkg"
+    config = load_config(root)
+    found = rels(root, iter_python_files(root, config))
+    # pkg/pkg/gen is pkg/gen relative to --path, not to pyproject.toml.
+    assert found == ["keep.py", "pkg/gen/c.py", "sub/keep.py"]
+
+    # Command line patterns stay relative to --path.
+    config.exclude.append("pkg/")
+    found = rels(root, iter_python_files(root, config))
+    assert found == ["keep.py", "sub/keep.py"]
@@ -10,3 +10,21 @@ def test_medium_needs_intent():
     qs = QualityScore(label="Medium", score=0.5, signals={"length": 6, "intent_hits": 0, "redundancy": 0.1})
     msg = suggestion_from(qs)
     assert "Add the reason or intent" in msg
+
+
+def test_suggestions_come_from_the_catalogue():
+    from ccqe.feedback import SUGGESTIONS, suggestion_for
+    from ccqe.summary import Summary
+
+    low = QualityScore(label="Low", score=0.2, signals={"length": 5, "intent_hits": 0, "redundancy": 0.6})
+    high = QualityScore(label="High", score=0.9, signals={"length": 9, "intent_hits": 2, "redundancy": 0.0})
+    assert suggestion_for(low) is SUGGESTIONS["avoid-repeating"]
+    assert suggestion_for(low).asks_for_intent
+    assert not suggestion_for(high).asks_for_intent
+
+    summary = Summary()
+    for q in (low, low, high):
+        summary.add(q, suggestion_for(q))
+    assert summary.suggestion_counts == {"avoid-repeating": 2, "keep": 1}
+    assert summary.needs_intent == 2
+    assert "    redundant: 2" in summary.lines()
@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from ccqe.cli import analyze_path, iter_results, main
+from ccqe.feedback import suggestion_for
+from ccqe.formats import make_writer
+from ccqe.model import QualityScore
+from ccqe.parser import CommentSpan
+from ccqe.results import CommentResult, format_report_line
+from ccqe.summary import Summary
+
+
+def write_report(tmp_path: Path, fmt: str) -> str:
+    summary = Summary()
+    out = io.StringIO()
+    writer = make_writer(fmt, out)
+    writer.begin()
+    for result in iter_results(tmp_path, summary=summary):
+        writer.write(result)
+    writer.end(summary)
+    return out.getvalue()
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    (tmp_path / "m.py").write_text(
+        '"""Module."""\n# add one because of retries\nx = x + 1\n\n'
+        'def f(a):\n    """Return a, "quoted", with a comma."""\n    return a\n',
+        encoding="utf-8",
+    )
+    return tmp_path
+
+
+def test_text_format_matches_analyze_path(tree: Path, capsys):
+    main(["--path", str(tree), "--no-cache", "--jobs", "1"])
+    assert capsys.readouterr().out.splitlines() == ["Report:"] + analyze_path(tree)
+
+
+def test_structured_formats_carry_the_same_records(tree: Path):
+    expected = [ln for ln in analyze_path(tree) if "|" in ln]
+
+    records = [json.loads(ln) for ln in write_report(tree, "jsonl").splitlines()]
+    assert len(records) == len(expected)
+    assert records[0]["file"] == str(tree / "m.py")
+    assert set(records[0]["signals"]) == {"length", "intent_hits", "redundancy"}
+
+    doc = json.loads(write_report(tree, "json"))
+    assert doc["results"] == records
+    assert doc["summary"]["comments"] == len(records)
+
+    rows = list(csv.DictReader(io.StringIO(write_report(tree, "csv"))))
+    assert [r["lineno"] for r in rows] == [str(r["lineno"]) for r in records]
+    assert rows[-1]["suggestion"] == records[-1]["suggestion"]
+
+
+def test_sarif_reports_low_and_medium_comments(tree: Path):
+    log = json.loads(write_report(tree, "sarif"))
+    assert log["version"] == "2.1.0"
+    run = log["runs"][0]
+    rule_ids = {r["id"] for r in run["tool"]["driver"]["rules"]}
+    assert run["results"]
+    for result in run["results"]:
+        assert result["ruleId"] in rule_ids
+        assert result["locations"][0]["physicalLocation"]["region"]["startLine"] >= 1
+    assert run["properties"]["summary"]["files"] == 1
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "json", "csv", "sarif"])
+def test_scores_are_written_as_in_the_text_report(fmt):
+    span = CommentSpan(file=Path("m.py"), lineno=1, text="x", context="inline")
+    quality = QualityScore(
+        label="Low", score=0.04999999999999999, signals={"length": 1, "intent_hits": 0, "redundancy": 1.0}
+    )
+    result = CommentResult(span=span, quality=quality, suggestion=suggestion_for(quality))
+    assert "score=0.05" in format_report_line(result)
+
+    out = io.StringIO()
+    writer = make_writer(fmt, out)
+    writer.begin()
+    writer.write(result)
+    writer.end(Summary())
+    text = out.getvalue()
+    assert "0.05" in text and "0.0499" not in text
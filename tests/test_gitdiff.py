@@ -0,0 +1,93 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from ccqe.cli import analyze_path, main
+from ccqe.gitdiff import changed_lines, diff_sources, parse_unified_diff
+
+
+DIFF = """\
+diff --git a/pkg/mod.py b/pkg/mod.py
+--- a/pkg/mod.py
++++ b/pkg/mod.py
+@@ -3,0 +4,2 @@ def f():
++    # new comment
++    x = 1
+@@ -10 +12 @@ def g():
+-    # old
++    # reworded
+diff --git a/gone.py b/gone.py
+--- a/gone.py
++++ /dev/null
+@@ -1,2 +0,0 @@
+-# removed
+-x = 1
+"""
+
+
+def test_parse_unified_diff_collects_new_side_lines():
+    assert parse_unified_diff(DIFF) == {"pkg/mod.py": {4, 5, 12}}
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+def test_diff_mode_scores_only_changed_comments(tmp_path: Path):
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init", "-q")
+    git("config", "user.email", "t@example.com")
+    git("config", "user.name", "t")
+    (tmp_path / "a.py").write_text("# old note\nx = 1\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("# untouched\ny = 2\n", encoding="utf-8")
+    git("add", ".")
+    git("commit", "-qm", "init")
+
+    (tmp_path / "a.py").write_text(
+        "# old note\nx = 1\n# check value because it may be zero\ny = x\n",
+        encoding="utf-8",
+    )
+
+    changed = changed_lines(tmp_path)
+    lines = analyze_path(tmp_path, changed=changed)
+
+    report = [ln for ln in lines if "|" in ln]
+    assert len(report) == 1
+    assert "a.py:   3" in report[0]
+    assert "  Files processed: 1" in lines
+    assert "  Comments analyzed: 1" in lines
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+def test_staged_mode_scores_the_index_not_the_working_tree(tmp_path: Path, capsys):
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init", "-q")
+    git("config", "user.email", "t@example.com")
+    git("config", "user.name", "t")
+    src = tmp_path / "a.py"
+    src.write_text("x = 1\ny = x\n", encoding="utf-8")
+    git("add", ".")
+    git("commit", "-qm", "init")
+
+    # Partially staged: line 2 of the index holds a comment that the
+    # working tree has since moved down and reworded.
+    src.write_text("x = 1\n# retry because the socket may be busy\ny = x\n", encoding="utf-8")
+    git("add", "a.py")
+    src.write_text("x = 1\ny = x\nz = y\n# tmp\n", encoding="utf-8")
+
+    changed = changed_lines(tmp_path, staged=True)
+    sources = diff_sources(tmp_path, changed, staged=True)
+    assert sources == {src.resolve(): b"x = 1\n# retry because the socket may be busy\ny = x\n"}
+
+    lines = analyze_path(tmp_path, changed=changed, sources=sources)
+    report = [ln for ln in lines if "|" in ln]
+    assert len(report) == 1
+    assert "a.py:   2" in report[0]
+
+    main(["--path", str(tmp_path), "--staged", "--no-cache", "--format", "jsonl"])
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [r["lineno"] for r in records if "lineno" in r] == [2]
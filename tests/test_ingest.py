@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import pytest
+
+from ccqe import cli
+from ccqe.cli import format_report_line, iter_results, main
+from ccqe.ingest import prefetch_sources
+
+
+def test_prefetch_sources_keeps_order(tmp_path: Path):
+    files = []
+    for i in range(20):
+        f = tmp_path / f"m{i:02d}.py"
+        f.write_bytes(f"# file {i}\n".encode())
+        files.append(f)
+
+    got = list(prefetch_sources(files, concurrency=4, prefetch=3))
+    assert [p for p, _ in got] == files
+    assert [d for _, d in got] == [f.read_bytes() for f in files]
+
+
+def test_prefetch_sources_raises_in_order(tmp_path: Path):
+    ok = tmp_path / "ok.py"
+    ok.write_text("x = 1\n", encoding="utf-8")
+    it = prefetch_sources([ok, tmp_path / "missing.py"], concurrency=2)
+    assert next(it)[0] == ok
+    with pytest.raises(FileNotFoundError):
+        next(it)
+
+
+def test_io_threads_output_is_identical(tmp_path: Path):
+    for i in range(6):
+        (tmp_path / f"m{i}.py").write_text(
+            f'"""Module {i}."""\n# add one because of retries\nx = x + {i}\n',
+            encoding="utf-8",
+        )
+
+    serial = [format_report_line(r) for r in iter_results(tmp_path)]
+    threaded = [format_report_line(r) for r in iter_results(tmp_path, io_threads=3)]
+    cached = [
+        format_report_line(r)
+        for r in iter_results(tmp_path, io_threads=3, cache_dir=tmp_path / "cache")
+    ]
+    assert threaded == serial
+    assert cached == serial
+
+
+def test_io_threads_run_serially(tmp_path: Path, monkeypatch, capsys):
+    for i in range(3):
+        (tmp_path / f"m{i}.py").write_text("# add one because of retries\n", encoding="utf-8")
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("read-ahead run used the process pool")
+
+    monkeypatch.setattr(cli, "_default_jobs", lambda: 4)
+    monkeypatch.setattr(cli, "_map_files_pool", no_pool)
+    main(["--path", str(tmp_path), "--no-cache", "--io-threads", "2"])
+    assert "Comments analyzed: 3" in capsys.readouterr().out
+
+    with pytest.raises(SystemExit) as exc:
+        main(["--path", str(tmp_path), "--no-cache", "--io-threads", "2", "--jobs", "2"])
+    assert exc.value.code == 2
+    assert "--io-threads needs a serial run" in capsys.readouterr().err
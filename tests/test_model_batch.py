@@ -0,0 +1,69 @@
+import random
+import subprocess
+import sys
+
+import pytest
+
+from ccqe import model
+from ccqe.model import predict_quality, predict_quality_batch
+from ccqe.preprocess import PreparedComment, normalize_code_text, tokenize_text
+
+WORDS = (
+    "increment add one zero value result because so ensure avoid check error "
+    "x i count total return if for loop the a to"
+).split()
+
+
+class DummySpan:
+    file = None
+    lineno = 1
+    text = ""
+    context = "inline"
+    func = None
+    cls = None
+
+
+def random_batch(n, seed=0):
+    rng = random.Random(seed)
+    batch = []
+    for _ in range(n):
+        comment = " ".join(rng.choices(WORDS, k=rng.randint(0, 9)))
+        code = " ".join(rng.choices(WORDS + ["+= 1", "== 0", "*", "\n"], k=rng.randint(0, 12)))
+        batch.append(
+            PreparedComment(DummySpan(), tokenize_text(comment), normalize_code_text(code))
+        )
+    return batch
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_batch_matches_scalar(use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    batch = random_batch(500)
+
+    result = predict_quality_batch(batch, use_numpy=use_numpy)
+
+    assert len(result) == len(batch)
+    assert list(result) == [predict_quality(pc) for pc in batch]
+
+
+def test_empty_batch():
+    assert len(predict_quality_batch([])) == 0
+
+
+def test_small_batch_does_not_import_numpy(monkeypatch):
+    def fail():
+        raise AssertionError("NumPy imported for a small batch")
+
+    monkeypatch.setattr(model, "_numpy", fail)
+    batch = random_batch(50)
+    assert list(predict_quality_batch(batch)) == [predict_quality(pc) for pc in batch]
+
+    code = (
+        "import sys\n"
+        "from ccqe.model import predict_quality_batch\n"
+        "from ccqe.preprocess import PreparedComment\n"
+        "predict_quality_batch([PreparedComment(None, ['add', 'one'], 'x += 1')])\n"
+        "assert 'numpy' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,46 @@
+import copy
+import json
+from pathlib import Path
+
+import pytest
+
+import ccqe.model as model
+from ccqe.model import SYNONYM_GROUPS, canonical_token, compile_model, load_synonym_groups
+
+
+@pytest.fixture
+def restore_synonyms():
+    saved = copy.deepcopy(SYNONYM_GROUPS)
+    yield
+    SYNONYM_GROUPS.clear()
+    SYNONYM_GROUPS.update(saved)
+    compile_model()
+
+
+def test_lookup_table_matches_group_scan():
+    for canon, group in SYNONYM_GROUPS.items():
+        for tok in group:
+            expected = next(c for c, g in SYNONYM_GROUPS.items() if tok in g)
+            assert canonical_token(tok.upper()) == expected
+    assert canonical_token("Unrelated") == "unrelated"
+
+
+def test_extra_groups_from_config(tmp_path: Path, restore_synonyms):
+    cfg = tmp_path / "synonyms.json"
+    cfg.write_text(json.dumps({"fetch": ["Download", "retrieve"], "log": ["journal"]}))
+
+    compile_model(load_synonym_groups(cfg))
+
+    assert canonical_token("download") == "fetch"
+    assert canonical_token("journal") == "log"
+    # Built-in mappings are unchanged
+    assert canonical_token("add") == "increment"
+    assert "journal" in model.SYNONYM_GROUPS["log"]
+
+
+@pytest.mark.parametrize("groups", [{"fetch": "download"}, {"fetch": ["download", 3]}, ["fetch"]])
+def test_malformed_groups_are_rejected(tmp_path: Path, groups):
+    cfg = tmp_path / "synonyms.json"
+    cfg.write_text(json.dumps(groups))
+    with pytest.raises(ValueError):
+        load_synonym_groups(cfg)
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from ccqe.parser import extract_python_entities
+
+
+def test_docstrings_found_from_tokens_in_source_order(tmp_path: Path):
+    code = '''\
+"""Module docstring."""
+class C:
+    """Class docstring."""
+    async def m(self, x: dict = {"k": 1}) -> int:
+        # explain
+        """Method docstring."""
+        return 1
+
+def f(): "Inline docstring."
+
+def g():
+    f"not a docstring"
+
+def h():
+    "not a docstring".strip()
+'''
+    p = tmp_path / "mod.py"
+    p.write_text(code, encoding="utf-8")
+
+    spans, _ = extract_python_entities(p)
+    docs = [(s.lineno, s.text, s.func, s.cls) for s in spans if s.context == "docstring"]
+
+    assert docs == [
+        (1, "Module docstring.", None, None),
+        (2, "Class docstring.", None, "C"),
+        (4, "Method docstring.", "m", None),
+        (9, "Inline docstring.", "f", None),
+    ]
+    assert [s.text for s in spans if s.context == "inline"] == ["explain"]
+
+
+def test_falls_back_to_ast_when_tokenization_fails(tmp_path: Path):
+    # A trailing unclosed bracket breaks the token stream at EOF; the comment
+    # seen before it is still reported.
+    p = tmp_path / "broken.py"
+    p.write_text('# kept\ndef f():\n    """Doc."""\nx = (\n', encoding="utf-8")
+
+    spans, _ = extract_python_entities(p)
+    assert [s.text for s in spans] == ["kept"]
@@ -0,0 +1,32 @@
+import pytest
+
+import ccqe.preprocess as preprocess
+from ccqe.preprocess import (
+    normalize_code_text,
+    normalize_numbers,
+    normalize_operations,
+    register_rewrite_rule,
+)
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "if i == 0:\n    i += 1\n",
+        "x = a + 10 - 1\ny -= 1x\nz = a*b/2",
+        "if n != 0 and m ==0x and k == 1_0:",
+        "total += 12; count+=1a; v = 3.14",
+    ],
+)
+def test_single_pass_matches_sequential_passes(code):
+    assert normalize_code_text(code) == normalize_operations(normalize_numbers(code))
+
+
+def test_registered_rule_joins_the_pass(monkeypatch):
+    monkeypatch.setattr(preprocess, "EXTRA_REWRITE_RULES", [])
+    monkeypatch.setattr(preprocess, "_normalizer", preprocess._normalizer)
+
+    register_rewrite_rule(r"%", " modulo ")
+
+    # Built-in number and operator rules still apply in the same pass
+    assert normalize_code_text("a % 2 * b") == "a  modulo   two   multiply  b"
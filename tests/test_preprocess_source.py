@@ -0,0 +1,23 @@
+from pathlib import Path
+
+from ccqe.parser import CommentSpan
+from ccqe.preprocess import PreparedSource, build_prepared, normalize_code_text
+
+
+def span(lineno: int) -> CommentSpan:
+    return CommentSpan(file=Path("x.py"), lineno=lineno, text="note", context="inline")
+
+
+def test_prepared_source_matches_plain_source():
+    source = "def f(i):\n    # bump\n    i += 1\n    x = i +\\\n1\n    return x * 2\n"
+    prepared = PreparedSource(source)
+    for lineno in range(0, 8):
+        expected = build_prepared(span(lineno), source).code_context
+        assert build_prepared(span(lineno), prepared).code_context == expected
+
+
+def test_operator_split_across_lines_is_normalized_as_a_whole():
+    source = "x = a +\n10\n"
+    prepared = PreparedSource(source)
+    assert prepared.context(1) == normalize_code_text(source.rstrip("\n"))
+    assert "add_one" in prepared.context(1)
@@ -0,0 +1,26 @@
+from pathlib import Path
+
+from ccqe.cli import format_report_line, iter_results
+from ccqe.profile import Profile
+
+
+def test_profile_records_stages_fallbacks_and_hooks(tmp_path: Path):
+    (tmp_path / "ok.py").write_text("# add one\nx = 1\n", encoding="utf-8")
+    (tmp_path / "broken.py").write_text("# kept\nx = (\n", encoding="utf-8")
+
+    seen = []
+    profile = Profile(top_n=1)
+    profile.hooks.append(lambda path, fp: seen.append(path.name))
+
+    with_profile = [format_report_line(r) for r in iter_results(tmp_path, profile=profile)]
+    without = [format_report_line(r) for r in iter_results(tmp_path)]
+
+    assert with_profile == without
+    assert seen == ["broken.py", "ok.py"]
+
+    data = profile.to_dict()
+    assert data["stages"]["extract_python_entities"]["calls"] == 2
+    assert data["stages"]["predict_quality"]["calls"] == 2
+    assert len(data["slowest_files"]) == 1
+    assert data["fallbacks"]["tokenize"] == [str(tmp_path / "broken.py")]
+    assert data["bytes_read"] == sum(p.stat().st_size for p in tmp_path.iterdir())
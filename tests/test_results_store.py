@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from ccqe.cli import format_report_line, iter_results
+from ccqe.results import ResultStore
+from ccqe.summary import Summary
+
+
+def test_store_reproduces_report_and_summary():
+    samples = Path(__file__).resolve().parents[1] / "samples"
+
+    summary = Summary()
+    results = list(iter_results(samples, summary=summary))
+    store = ResultStore()
+    store.extend(results)
+
+    assert len(store) == len(results)
+    assert list(store.report_lines()) == [format_report_line(r) for r in results]
+    assert store.summary().lines() == summary.lines()
+
+
+def test_store_filtering_and_aggregation():
+    samples = Path(__file__).resolve().parents[1] / "samples"
+    store = ResultStore()
+    store.extend(iter_results(samples))
+
+    low = store.where(label="Low")
+    assert len(low) == store.label_counts()["Low"]
+    assert all(row.label == "Low" for row in store.rows(low))
+
+    mixed = samples / "example_mixed.py"
+    docs = store.where(context="docstring", file=mixed)
+    assert [row.ctx for row in store.rows(docs)] == ["risky_divide"]
+    assert store.where(file=samples / "missing.py").tolist() == []
@@ -0,0 +1,129 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from ccqe import cache, scorers
+from ccqe.cli import analyze_file, analyze_path, format_report_line, iter_results, main
+from ccqe.feedback import KEEP
+from ccqe.linear import LinearScorer
+from ccqe.model import QualityScore, predict_quality_batch
+from ccqe.parser import CommentSpan
+from ccqe.preprocess import PreparedComment
+from ccqe.scorers import HeuristicScorer, Scorer, load_scorer, register_scorer, set_scorer
+
+
+def prepared(text: str, code: str = "x = y") -> PreparedComment:
+    span = CommentSpan(file=Path("x.py"), lineno=1, text=text, context="inline")
+    return PreparedComment(span=span, tokens=text.split(), code_context=code)
+
+
+@pytest.fixture(autouse=True)
+def default_scorer():
+    saved = dict(scorers.SCORERS)
+    yield
+    scorers.SCORERS.clear()
+    scorers.SCORERS.update(saved)
+    set_scorer()
+
+
+class ConstantScorer(Scorer):
+    name = "constant"
+
+    def score_batch(self, batch):
+        return [QualityScore("High", 1.0, {"length": 0, "intent_hits": 0, "redundancy": 0.0})] * len(batch)
+
+
+def test_heuristic_is_default_and_matches_model():
+    batch = [prepared("increment x"), prepared("retry because the server may drop requests")]
+    assert isinstance(scorers.active_scorer(), HeuristicScorer)
+    assert list(scorers.active_scorer().score_batch(batch)) == list(predict_quality_batch(batch))
+
+
+def test_backends_are_imported_lazily(monkeypatch):
+    monkeypatch.delitem(sys.modules, "ccqe.linear", raising=False)
+    assert "linear" in scorers.available_scorers()
+    assert "ccqe.linear" not in sys.modules
+    assert load_scorer("linear").name == "linear"
+    assert "ccqe.linear" in sys.modules
+
+
+def test_unknown_scorer():
+    with pytest.raises(ValueError, match="unknown scorer"):
+        load_scorer("missing")
+
+
+def test_linear_scorer_from_weights_file(tmp_path):
+    weights = tmp_path / "w.json"
+    weights.write_text(json.dumps({
+        "intercept": 0.2,
+        "weights": {"intent_hits": 0.3, "redundancy": -1.0},
+        "limits": {"intent_hits": 1},
+        "thresholds": [[0.5, "High"]],
+    }))
+    scorer = load_scorer("linear", weights)
+    batch = [prepared("because because reasons"), prepared("x y", code="x y")]
+    first, second = scorer.score_batch(batch)
+    assert first.score == pytest.approx(0.5) and first.label == "High"
+    assert second.score == 0.0 and second.label == "Low"
+    assert second.signals == {"length": 2, "intent_hits": 0, "redundancy": 1.0}
+
+
+def test_linear_scorer_rejects_unknown_features():
+    with pytest.raises(ValueError, match="unknown features"):
+        LinearScorer(0.0, {"colour": 1.0})
+
+
+@pytest.mark.parametrize("model", [
+    {"weights": {"length": 0.1}, "limits": [1]},
+    {"weights": {"length": "high"}},
+    {"weights": {"length": 0.1}, "limits": {"length": None}},
+    {"weights": {"length": 0.1}, "intercept": "zero"},
+    {"weights": {"length": 0.1}, "thresholds": [0.5]},
+    {"intercept": 0.5, "weights": {"length": 0.1}, "thresholds": [[0.8, "Great"], [0.5, "OK"]]},
+])
+def test_linear_scorer_rejects_malformed_weights_file(tmp_path, capsys, model):
+    weights = tmp_path / "w.json"
+    weights.write_text(json.dumps(model))
+    with pytest.raises(ValueError):
+        load_scorer("linear", weights)
+
+    src = tmp_path / "m.py"
+    src.write_text("x = 1  # set x\n")
+    with pytest.raises(SystemExit) as exc:
+        main(["--path", str(src), "--no-cache", "--scorer", "linear", "--scorer-config", str(weights)])
+    assert exc.value.code == 2
+    assert "cannot load scorer" in capsys.readouterr().err
+
+
+def test_registered_scorer_drives_analysis_and_cache_key(tmp_path):
+    src = tmp_path / "m.py"
+    src.write_text("x = 1  # set x\n")
+    before = cache.fingerprint()
+    register_scorer("constant", lambda config: ConstantScorer())
+    set_scorer("constant")
+    results, summary, _ = analyze_file(src)
+    assert [r.quality.label for r in results] == ["High"]
+    assert results[0].suggestion is KEEP
+    assert cache.fingerprint() != before
+
+
+def test_cli_scorer_flag(tmp_path, capsys):
+    src = tmp_path / "m.py"
+    src.write_text("x = 1  # set x\n")
+    main(["--path", str(src), "--no-cache", "--jobs", "1", "--scorer", "linear", "--format", "jsonl"])
+    record = json.loads(capsys.readouterr().out)
+    assert record["label"] == "Low"
+    assert scorers.SCORER_OPTIONS == {"name": "linear", "config": None}
+
+
+def test_linear_scores_report_the_same_from_store_and_stream():
+    # Linear scores are off the rules' 0.05 grid, so storing them with less
+    # precision than the report rounds from would change some lines.
+    root = Path(__file__).resolve().parents[1]
+    set_scorer("linear")
+    for path in (root / "samples", root / "ccqe"):
+        streamed = [format_report_line(r) for r in iter_results(path)]
+        stored = analyze_path(path)
+        assert stored[: len(streamed)] == streamed
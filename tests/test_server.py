@@ -0,0 +1,176 @@
+import io
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from ccqe.cli import analyze_path
+from ccqe.preprocess import set_context_options
+from ccqe.scorers import set_scorer
+from ccqe.server import Dispatcher, ScoringService, serve_socket, serve_stdio
+from ccqe.server import main as server_main
+
+
+def test_service_reuses_results_until_content_changes(tmp_path: Path):
+    f = tmp_path / "m.py"
+    f.write_text("# add one because of retries\nx = x + 1\n", encoding="utf-8")
+    service = ScoringService()
+
+    results, summary, cached = service.score_path(f)
+    assert not cached and summary.comments == 1
+    assert service.score_path(f)[2]
+
+    # Same content, new mtime: hashed again but not rescored.
+    os.utime(f, ns=(1, 1))
+    assert service.score_path(f)[2]
+
+    f.write_text("# check\n# and again\nx = 1\n", encoding="utf-8")
+    results, summary, cached = service.score_path(f)
+    assert not cached and summary.comments == 2
+    assert service.stats()["misses"] == 2
+
+
+def test_stdio_requests_match_batch_report(tmp_path: Path):
+    f = tmp_path / "m.py"
+    f.write_text('"""Module."""\n# add one because of retries\nx = x + 1\n', encoding="utf-8")
+    requests = [
+        {"jsonrpc": "2.0", "id": 1, "method": "score", "params": {"path": str(f)}},
+        {"jsonrpc": "2.0", "id": 2, "method": "score",
+         "params": {"path": str(f), "source": "# tmp\nx = 1\n"}},
+        {"jsonrpc": "2.0", "id": 3, "method": "nope"},
+        "not json",
+    ]
+    stdin = io.StringIO("".join(
+        (r if isinstance(r, str) else json.dumps(r)) + "\n" for r in requests
+    ))
+    stdout = io.StringIO()
+    serve_stdio(Dispatcher(ScoringService(), lambda: None), stdin, stdout)
+
+    responses = {}
+    for line in stdout.getvalue().splitlines():
+        msg = json.loads(line)
+        responses[msg["id"]] = msg
+    expected = [ln for ln in analyze_path(f) if "|" in ln]
+    assert [c["line"] for c in responses[1]["result"]["comments"]] == expected
+    assert responses[2]["result"]["comments"][0]["lineno"] == 1
+    assert responses[3]["error"]["code"] == -32601
+    assert responses[None]["error"]["code"] == -32700
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no Unix sockets")
+def test_socket_server_answers_and_shuts_down(tmp_path: Path):
+    sock_path = str(tmp_path / "ccqe.sock")
+    thread = threading.Thread(
+        target=serve_socket, args=(Dispatcher(ScoringService(), lambda: None), sock_path)
+    )
+    thread.start()
+    for _ in range(100):
+        if os.path.exists(sock_path):
+            break
+        time.sleep(0.01)
+
+    with socket.socket(socket.AF_UNIX) as client:
+        client.connect(sock_path)
+        reader = client.makefile("r")
+        client.sendall(b'{"jsonrpc": "2.0", "id": 1, "method": "ping"}\n')
+        assert json.loads(reader.readline())["result"] == "pong"
+        client.sendall(b'{"jsonrpc": "2.0", "id": 2, "method": "shutdown"}\n')
+        assert json.loads(reader.readline())["id"] == 2
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+def test_unexpected_errors_are_answered(tmp_path: Path):
+    dispatcher = Dispatcher(ScoringService(), lambda: None)
+    request = {"jsonrpc": "2.0", "id": 7, "method": "score", "params": {"path": "bad\0path.py"}}
+    response = json.loads(dispatcher.handle_line(json.dumps(request)))
+    assert response["id"] == 7
+    assert response["error"]["code"] == -32603
+
+
+def test_serve_accepts_scoring_options(tmp_path: Path, monkeypatch, capsys):
+    f = tmp_path / "m.py"
+    f.write_text("x = 1  # set x because callers expect one\n", encoding="utf-8")
+    request = {"jsonrpc": "2.0", "id": 1, "method": "score", "params": {"path": str(f)}}
+    monkeypatch.setattr(sys, "stdin", io.StringIO(json.dumps(request) + "\n"))
+    try:
+        server_main(["--stdio", "--scorer", "linear", "--context", "ast"])
+        response = json.loads(capsys.readouterr().out)
+        expected = [ln for ln in analyze_path(f) if "|" in ln]
+    finally:
+        set_scorer()
+        set_context_options("window")
+    assert [c["line"] for c in response["result"]["comments"]] == expected
+
+
+def test_service_keeps_the_most_recent_files(tmp_path: Path):
+    service = ScoringService(max_files=2)
+    files = []
+    for i in range(3):
+        f = tmp_path / f"m{i}.py"
+        f.write_text(f"# note {i}\nx = {i}\n", encoding="utf-8")
+        files.append(f)
+    service.score_path(files[0])
+    service.score_path(files[1])
+    service.score_path(files[0])
+    service.score_path(files[2])
+    assert service.stats()["files"] == 2
+    assert service.score_path(files[0])[2] is True
+    assert service.score_path(files[1])[2] is False
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no Unix sockets")
+def test_socket_path_is_only_replaced_when_stale(tmp_path: Path):
+    regular = tmp_path / "notes.txt"
+    regular.write_text("keep me", encoding="utf-8")
+    with pytest.raises(OSError, match="not a socket"):
+        serve_socket(Dispatcher(ScoringService(), lambda: None), str(regular))
+    assert regular.read_text(encoding="utf-8") == "keep me"
+
+    live = str(tmp_path / "live.sock")
+    with socket.socket(socket.AF_UNIX) as listener:
+        listener.bind(live)
+        listener.listen()
+        with pytest.raises(OSError, match="another server"):
+            serve_socket(Dispatcher(ScoringService(), lambda: None), live)
+    # The listener is closed but its file is left behind: a stale socket.
+    assert os.path.exists(live)
+    thread = threading.Thread(
+        target=serve_socket, args=(Dispatcher(ScoringService(), lambda: None), live)
+    )
+    thread.start()
+    for _ in range(200):
+        try:
+            with socket.socket(socket.AF_UNIX) as client:
+                client.connect(live)
+                client.sendall(b'{"jsonrpc": "2.0", "id": 1, "method": "shutdown"}\n')
+                client.makefile("r").readline()
+            break
+        except OSError:
+            time.sleep(0.01)
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no Unix sockets")
+def test_sigterm_removes_the_socket(tmp_path: Path):
+    sock_path = tmp_path / "ccqe.sock"
+    proc = subprocess.Popen([sys.executable, "-m", "ccqe.cli", "serve", "--socket", str(sock_path)])
+    try:
+        for _ in range(3000):
+            if sock_path.exists():
+                break
+            time.sleep(0.01)
+        assert sock_path.exists()
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=10) == 0
+    finally:
+        proc.kill()
+    assert not sock_path.exists()
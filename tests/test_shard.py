@@ -0,0 +1,162 @@
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+from ccqe import cli, scorers
+from ccqe.cli import analyze_path, format_report_line, main
+from ccqe.feedback import Suggestion
+from ccqe.shard import merge_partials, parse_shard, partition, write_partial
+from ccqe.summary import Summary
+
+
+def make_tree(root: Path) -> None:
+    for i in range(9):
+        body = "".join(f"# step {j} because of retries\nx = x + {j}\n" for j in range(i + 1))
+        (root / f"m{i}.py").write_text(f'"""Module {i}."""\n' + body, encoding="utf-8")
+    (root / "empty.py").write_text("", encoding="utf-8")
+
+
+def test_parse_shard():
+    assert parse_shard("2/3") == (2, 3)
+    for bad in ("0/3", "4/3", "3", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+
+
+def test_partition_is_complete_and_balanced(tmp_path: Path):
+    make_tree(tmp_path)
+    files = sorted(tmp_path.glob("*.py"))
+    shards = partition(files, tmp_path, 3)
+    assert sorted(i for s in shards for i in s) == list(range(len(files)))
+    assert partition(files, tmp_path, 3) == shards
+    sizes = [sum(files[i].stat().st_size for i in s) for s in shards]
+    assert max(sizes) - min(sizes) <= max(f.stat().st_size for f in files)
+
+
+def test_merged_shards_match_single_run(tmp_path: Path, capsys):
+    src = tmp_path / "src"
+    src.mkdir()
+    make_tree(src)
+    parts = []
+    for i in (1, 2, 3):
+        part = tmp_path / f"part{i}.jsonl"
+        with open(part, "w", encoding="utf-8") as out:
+            write_partial(out, src, (i, 3))
+        parts.append(part)
+
+    results, summary = merge_partials(parts)
+    results = list(results)
+    expected = analyze_path(src)
+    assert summary.lines() == expected[expected.index("Summary:") - 1:]
+
+    main(["merge", *map(str, reversed(parts))])
+    assert capsys.readouterr().out.splitlines() == ["Report:"] + expected
+
+    with pytest.raises(ValueError):
+        merge_partials(parts[:2])
+
+
+def test_summary_round_trips():
+    s = Summary(files=2, comments=3, label_counts={"Low": 3}, redundancy_sum=0.5,
+                redundancy_count=3, needs_intent=1)
+    assert Summary.from_dict(s.to_dict()) == s
+
+
+def test_shards_stream_large_files(tmp_path: Path, monkeypatch):
+    src = tmp_path / "src"
+    src.mkdir()
+    make_tree(src)
+    streamed = []
+    stream_file = cli.stream_file
+
+    def spy(file, *args, **kwargs):
+        streamed.append(file)
+        return stream_file(file, *args, **kwargs)
+
+    monkeypatch.setattr(cli, "stream_file", spy)
+
+    out = io.StringIO()
+    summary = write_partial(out, src, (1, 1), stream_threshold=1)
+    assert len(streamed) == 9
+    expected = analyze_path(src, stream_threshold=1)
+    assert summary.lines() == expected[expected.index("Summary:") - 1:]
+
+
+def test_shards_from_different_checkouts_merge(tmp_path: Path):
+    parts = []
+    for i in (1, 2):
+        checkout = tmp_path / f"machine{i}" / "src"
+        checkout.mkdir(parents=True)
+        make_tree(checkout)
+        part = tmp_path / f"part{i}.jsonl"
+        with open(part, "w", encoding="utf-8") as out:
+            write_partial(out, checkout, (i, 2))
+        parts.append(part)
+
+    results, summary = merge_partials(parts)
+    lines = [format_report_line(r) for r in results]
+    expected = analyze_path(tmp_path / "machine1" / "src")
+    assert lines == [ln for ln in expected if "|" in ln]
+    assert summary.lines() == expected[expected.index("Summary:") - 1:]
+
+    (tmp_path / "machine2" / "src" / "extra.py").write_text("# more\n", encoding="utf-8")
+    with open(parts[1], "w", encoding="utf-8") as out:
+        write_partial(out, tmp_path / "machine2" / "src", (2, 2))
+    with pytest.raises(ValueError, match="different runs"):
+        merge_partials(parts)
+
+
+class PluginScorer(scorers.HeuristicScorer):
+    name = "plugin"
+
+    def suggest(self, quality):
+        return Suggestion("plugin-tip", "Mention the ticket.", "plugin", False)
+
+
+def test_merge_keeps_plugin_suggestions(tmp_path: Path, monkeypatch):
+    src = tmp_path / "src"
+    src.mkdir()
+    make_tree(src)
+    monkeypatch.setitem(scorers.SCORERS, "plugin", lambda config: PluginScorer())
+    scorers.set_scorer("plugin")
+    try:
+        part = tmp_path / "part.jsonl"
+        with open(part, "w", encoding="utf-8") as out:
+            write_partial(out, src, (1, 1))
+    finally:
+        scorers.set_scorer()
+
+    results, _ = merge_partials([part])
+    suggestions = {(r.suggestion.id, r.suggestion.text) for r in results}
+    assert suggestions == {("plugin-tip", "Mention the ticket.")}
+
+
+def test_merge_reports_malformed_records(tmp_path: Path, capsys):
+    src = tmp_path / "src"
+    src.mkdir()
+    make_tree(src)
+    part = tmp_path / "part.jsonl"
+    with open(part, "w", encoding="utf-8") as out:
+        write_partial(out, src, (1, 1))
+
+    main(["merge", str(part), "--output", "-"])
+    assert not sys.stdout.closed
+    capsys.readouterr()
+
+    lines = part.read_text(encoding="utf-8").splitlines()
+    good = lines[:]
+    bad_records = [
+        '{"index": 0, "file": "m0.py"}',
+        "not json",
+        lines[2].replace('"lineno":', '"lineno":"x","_":'),
+    ]
+    for bad in bad_records:
+        lines[2] = bad
+        part.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        with pytest.raises(SystemExit) as exc:
+            main(["merge", str(part)])
+        assert exc.value.code == 2
+        assert f"{part}:3: malformed record" in capsys.readouterr().err
+        lines = good[:]
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from ccqe.parser import extract_python_entities
+from ccqe.source import SourceFile
+
+
+def test_source_file_matches_read_text(tmp_path: Path):
+    f = tmp_path / "crlf.py"
+    f.write_bytes(b"# one\r\nx = 1\r# two\ny = '\xff'\x0c\n\n")
+    spans, text = extract_python_entities(f)
+    with SourceFile(f) as source:
+        assert source.text() == text
+        assert list(source.lines) == text.splitlines()
+        spans2, _ = extract_python_entities(f, source=source)
+    assert spans2 == spans
+
+
+def test_source_file_honors_encoding_cookie(tmp_path: Path):
+    f = tmp_path / "latin.py"
+    f.write_bytes("# -*- coding: latin-1 -*-\n# caf\xe9 au lait\nx = 1\n".encode("latin-1"))
+    with SourceFile(f) as source:
+        assert source.encoding == "iso-8859-1"
+        spans, _ = extract_python_entities(f, source=source)
+        assert source.lines[1] == "# caf\xe9 au lait"
+    assert [s.text for s in spans][-1] == "caf\xe9 au lait"
+
+
+def test_source_file_skips_bom_and_handles_empty(tmp_path: Path):
+    f = tmp_path / "bom.py"
+    f.write_bytes(b"\xef\xbb\xbf# hello\n")
+    with SourceFile(f) as source:
+        assert source.lines[0] == "# hello"
+    empty = tmp_path / "empty.py"
+    empty.write_bytes(b"")
+    with SourceFile(empty) as source:
+        assert len(source.lines) == 0
+        assert extract_python_entities(empty, source=source)[0] == []
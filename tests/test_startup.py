@@ -0,0 +1,137 @@
+import compileall
+import json
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import ccqe
+
+PACKAGE = Path(ccqe.__file__).parent
+
+# Modules that plain runs do without; importing ccqe.cli must not pull
+# them in (see the lazy imports in ccqe/cli.py).
+DEFERRED = {
+    "asyncio",
+    "concurrent.futures",
+    "csv",
+    "multiprocessing",
+    "numpy",
+    "subprocess",
+    "tomllib",
+    "ccqe.context",
+    "ccqe.gitdiff",
+    "ccqe.ingest",
+    "ccqe.linear",
+    "ccqe.profile",
+    "ccqe.server",
+    "ccqe.shard",
+    "ccqe.tokenindex",
+    "ccqe.watch",
+}
+
+# Only needed once the result cache is used, which a single file is not
+# unless --cache-dir is given.
+CACHE_ONLY = {"hashlib", "sqlite3"}
+
+# Wall time of importing ccqe.cli, and of scoring one small file, as a
+# multiple of the start of a bare interpreter. Ratios rather than
+# milliseconds keep the checks meaningful on slow or busy machines; on a
+# developer machine they are about 5 and 5.5.
+IMPORT_RATIO = 8
+RUN_RATIO = 10
+
+
+def import_times(module: str):
+    """Cumulative import time in microseconds of each module, per -X importtime."""
+    compileall.compile_dir(str(PACKAGE), quiet=1)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def run_modules(*args: str):
+    """Modules loaded after main(args) ran in a fresh interpreter."""
+    code = (
+        "import io, json, sys\n"
+        "from ccqe.cli import main\n"
+        "out, sys.stdout = sys.stdout, io.StringIO()\n"
+        f"main({list(args)!r})\n"
+        "out.write(json.dumps(sorted(sys.modules)))\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return set(json.loads(proc.stdout))
+
+
+def best_time(argv, runs: int = 7) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def small_file(tmp_path: Path) -> Path:
+    src = tmp_path / "one.py"
+    src.write_text("x = 1  # because the counter starts at one\n")
+    return src
+
+
+def test_cli_import_defers_optional_modules():
+    times = import_times("ccqe.cli")
+    assert "ccqe.cli" in times
+    assert DEFERRED.isdisjoint(times), sorted(DEFERRED & set(times))
+    assert CACHE_ONLY.isdisjoint(times), sorted(CACHE_ONLY & set(times))
+
+
+def test_cli_import_within_budget():
+    compileall.compile_dir(str(PACKAGE), quiet=1)
+    bare = best_time([sys.executable, "-c", "pass"])
+    imported = best_time([sys.executable, "-c", "import ccqe.cli"])
+    assert imported < IMPORT_RATIO * bare, (imported, bare)
+
+
+def test_single_file_run_loads_only_what_it_needs(tmp_path):
+    src = small_file(tmp_path)
+    for args in (["--no-cache"], []):
+        loaded = run_modules("--path", str(src), *args)
+        assert (DEFERRED | CACHE_ONLY).isdisjoint(loaded), sorted((DEFERRED | CACHE_ONLY) & loaded)
+
+    loaded = run_modules("--path", str(src), "--cache-dir", str(tmp_path / "cache"))
+    assert "sqlite3" in loaded
+    assert DEFERRED.isdisjoint(loaded), sorted(DEFERRED & loaded)
+
+
+def test_single_file_run_within_budget(tmp_path):
+    src = small_file(tmp_path)
+    compileall.compile_dir(str(PACKAGE), quiet=1)
+    bare = best_time([sys.executable, "-c", "pass"])
+    run = best_time([sys.executable, "-m", "ccqe.cli", "--path", str(src)])
+    assert run < RUN_RATIO * bare, (run, bare)
+
+
+@pytest.mark.skipif(shutil.which("ccqe") is None, reason="ccqe is not installed")
+def test_console_script_runs_single_file(tmp_path):
+    src = small_file(tmp_path)
+    script = shutil.which("ccqe")
+    proc = subprocess.run([script, "--path", str(src)], capture_output=True, text=True, check=True)
+    assert "Comments analyzed: 1" in proc.stdout
+
+    bare = best_time([sys.executable, "-c", "pass"])
+    run = best_time([script, "--path", str(src)])
+    assert run < RUN_RATIO * bare, (run, bare)
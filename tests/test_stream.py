@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from ccqe.cli import iter_results
+from ccqe.formats import comment_record
+from ccqe.parser import iter_python_entities
+from ccqe.preprocess import normalize_window
+from ccqe.stream import _LineRing, stream_file
+from ccqe.summary import Summary
+
+SOURCE = '''\
+"""Module docstring explaining why this exists."""
+import os
+
+
+def f(path):
+    """Open the file at path."""
+    # check the path first
+    if not os.path.exists(path):
+        return None
+    data = open(path).read()  # read all
+    return data
+
+
+class C:
+    """Holds state because callers share it."""
+
+    def g(self, x):  # the hook
+        return x + 1
+'''
+
+
+def records(results):
+    return sorted(json.dumps(comment_record(r), sort_keys=True) for r in results)
+
+
+def test_iter_python_entities_matches_extract(tmp_path):
+    src = tmp_path / "m.py"
+    src.write_text(SOURCE)
+    with open(src) as fh:
+        spans = list(iter_python_entities(src, fh.readline))
+    kinds = [(s.context, s.lineno) for s in spans]
+    assert ("docstring", 5) in kinds and ("inline", 7) in kinds
+    # The docstring of f ends before the comment inside its body.
+    assert kinds.index(("docstring", 5)) < kinds.index(("inline", 7))
+
+
+def test_stream_matches_whole_file_analysis(tmp_path):
+    (tmp_path / "a.py").write_text(SOURCE)
+    (tmp_path / "b.py").write_text("x = 1  # set x\n")
+
+    runs = []
+    for threshold in (None, 1):
+        summary = Summary()
+        results = list(iter_results(tmp_path, summary=summary, stream_threshold=threshold))
+        runs.append((records(results), summary))
+    (whole, whole_summary), (streamed, streamed_summary) = runs
+
+    assert whole == streamed
+    assert streamed_summary.comments == whole_summary.comments
+    assert streamed_summary.files == whole_summary.files == 2
+    assert streamed_summary.label_counts == whole_summary.label_counts
+    assert streamed_summary.redundancy_sum == pytest.approx(whole_summary.redundancy_sum)
+
+
+def test_stream_with_pool_keeps_file_order(tmp_path):
+    (tmp_path / "a.py").write_text(SOURCE * 20)
+    (tmp_path / "b.py").write_text("x = 1  # set x\n")
+    (tmp_path / "c.py").write_text("y = 2  # set y\n")
+
+    results = list(iter_results(tmp_path, jobs=2, stream_threshold=100))
+    files = [r.span.file.name for r in results]
+    assert files == sorted(files)
+    assert records(results) == records(iter_results(tmp_path, stream_threshold=None))
+
+
+def test_stream_file_filters_lines_and_fills_summary(tmp_path):
+    src = tmp_path / "m.py"
+    src.write_text(SOURCE)
+    results, summary, profile = stream_file(src, lines={10}, profile=True)
+    assert summary.comments == 0
+    found = list(results)
+    assert [r.span.lineno for r in found] == [10]
+    assert summary.comments == 1 and summary.files == 1
+    assert profile.stages["stream_file"].calls == 1
+
+
+def test_stream_file_reports_tokenize_failure(tmp_path):
+    src = tmp_path / "bad.py"
+    src.write_text("x = 1  # kept\ny = (\n")
+    results, _, profile = stream_file(src, profile=True)
+    assert [r.span.lineno for r in results] == [1]
+    assert profile.fallbacks == {"tokenize": [str(src)]}
+
+
+def test_line_ring_is_bounded_and_clips_windows():
+    lines = iter(f"x{n} = {n}\n" for n in range(1, 101))
+    ring = _LineRing(lambda: next(lines, ""), keep=10)
+    while ring.readline():
+        pass
+    assert len(ring.lines) == 10 and ring.count == 100
+    assert ring.context(95) == normalize_window(["x94 = 94", "x95 = 95", "x96 = 96"])
+    # Line 90 has left the ring; only line 91 remains of its window.
+    assert ring.context(90) == normalize_window(["x91 = 91"])
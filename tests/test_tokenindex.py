@@ -0,0 +1,124 @@
+import math
+import os
+from pathlib import Path
+
+import pytest
+
+from ccqe import cache, model
+from ccqe.cli import main
+from ccqe.model import predict_quality, set_token_weights, weighted_overlap
+from ccqe.parser import CommentSpan
+from ccqe.preprocess import PreparedComment
+from ccqe.tokenindex import TokenIndex, TokenWeights, document_tokens, load_weights
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "proj"
+    root.mkdir()
+    (root / "a.py").write_text("def f(self, items):\n    return items  # the items\n")
+    (root / "b.py").write_text("def g(self, items):\n    total = items\n")
+    (root / "c.py").write_text("def h(self):\n    cache_size = 4\n")
+    return root
+
+
+@pytest.fixture
+def no_weights():
+    yield
+    set_token_weights(None)
+
+
+def frequencies(index: TokenIndex):
+    tokens, df = index._vocab()
+    return {tok: n for tok, n in zip(tokens, df) if n}
+
+
+def test_document_tokens_skip_comments(tree):
+    tokens = document_tokens(tree / "a.py")
+    assert {"def", "f", "self", "items", "return"} <= tokens
+    assert "the" not in tokens
+
+
+def test_update_counts_documents_incrementally(tree, tmp_path):
+    index = TokenIndex(tmp_path / "idx.sqlite3")
+    assert index.update(tree) == (3, 3, 0)
+    df = frequencies(index)
+    assert df["self"] == 3 and df["items"] == 2 and df["cache_size"] == 1
+    assert index.update(tree) == (3, 0, 0)
+
+    (tree / "c.py").unlink()
+    b = tree / "b.py"
+    b.write_text("def g(self):\n    result_list = []\n")
+    os.utime(b, ns=(1, 1))
+    assert index.update(tree) == (2, 1, 1)
+    incremental = frequencies(index)
+    index.close()
+
+    fresh = TokenIndex(tmp_path / "fresh.sqlite3")
+    fresh.update(tree)
+    assert incremental == frequencies(fresh) == {**incremental, "self": 2, "items": 1}
+    assert "cache_size" not in incremental
+    fresh.close()
+
+
+def test_weights_favor_rare_tokens(tree, tmp_path):
+    index = TokenIndex(tmp_path / "idx.sqlite3")
+    index.update(tree)
+    weights = index.weights()
+    index.close()
+    assert weights.weight("self") == pytest.approx(math.log(4 / 4) + 1)
+    assert weights.weight("self") < weights.weight("items") < weights.weight("cache_size")
+    assert weights.weight("never_seen") == pytest.approx(math.log(4) + 1)
+    assert load_weights(tmp_path / "idx.sqlite3").digest == weights.digest
+
+
+def test_load_weights_requires_an_index(tmp_path):
+    with pytest.raises(OSError):
+        load_weights(tmp_path / "missing.sqlite3")
+
+
+def test_weighted_overlap():
+    weight = {"self": 1.0, "items": 3.0}.get
+    assert weighted_overlap({"self", "items"}, {"self", "items"}, weight) == 1.0
+    assert weighted_overlap({"self"}, {"self", "items"}, weight) == pytest.approx(0.25)
+    assert weighted_overlap(set(), set(), weight) == 0.0
+
+
+def test_token_weights_change_redundancy_and_cache_key(no_weights):
+    span = CommentSpan(file=Path("x.py"), lineno=1, text="self items", context="inline")
+    pc = PreparedComment(span=span, tokens=["self", "items"], code_context="self.count = zero")
+    assert predict_quality(pc).signals["redundancy"] == 0.25
+
+    before = cache.fingerprint()
+    # self is everywhere, items nowhere: the shared token barely counts.
+    set_token_weights(TokenWeights(["self", "items"], [9, 0], 9))
+    weighted = predict_quality(pc).signals["redundancy"]
+    assert weighted < 0.2
+    assert cache.fingerprint() != before
+    assert model.predict_quality_batch([pc])[0].signals["redundancy"] == weighted
+
+
+def test_cli_index_and_idf_flag(tree, tmp_path, capsys, no_weights):
+    index = tmp_path / "idx.sqlite3"
+    main(["index", "--path", str(tree), "--index", str(index)])
+    assert "Indexed 3 files (3 read, 0 removed)" in capsys.readouterr().out
+
+    main(["--path", str(tree), "--no-cache", "--jobs", "1", "--idf-index", str(index)])
+    assert "Comments analyzed: 1" in capsys.readouterr().out
+    assert model.REDUNDANCY_OPTIONS["weights"] is not None
+
+
+def test_load_weights_never_resets_an_index(tree, tmp_path, monkeypatch):
+    path = tmp_path / "idx.sqlite3"
+    index = TokenIndex(path)
+    index.update(tree)
+    index.close()
+    before = path.read_bytes()
+
+    monkeypatch.setattr(model, "SYNONYM_GROUPS", {**model.SYNONYM_GROUPS, "items": {"things"}})
+    with pytest.raises(ValueError, match="other tokenization rules"):
+        load_weights(path)
+    assert path.read_bytes() == before
+
+    monkeypatch.undo()
+    assert load_weights(path).weight("self") == pytest.approx(1.0)
@@ -0,0 +1,151 @@
+import os
+from pathlib import Path
+
+from ccqe import cli, watch as watch_module
+from ccqe.cache import ResultCache
+from ccqe.cli import analyze_path
+from ccqe.watch import SERIAL_MAX_FILES, WatchState, watch
+
+
+def summary_of(state: WatchState) -> list:
+    return state.total.lines()
+
+
+def test_incremental_updates_match_full_run(tmp_path: Path):
+    for i in range(4):
+        (tmp_path / f"m{i}.py").write_text(
+            f"# add one because of retries\nx = x + {i}\n", encoding="utf-8"
+        )
+    state = WatchState(tmp_path)
+    changed, removed = state.scan()
+    assert len(changed) == 4 and not removed
+    state.update(changed, removed)
+    assert state.scan() == ({}, [])
+
+    m1 = tmp_path / "m1.py"
+    m1.write_text('"""Module."""\n# x\n# y\nx = 1\n', encoding="utf-8")
+    os.utime(m1, ns=(1, 1))
+    (tmp_path / "m2.py").unlink()
+    (tmp_path / "new.py").write_text("# new\nz = 2\n", encoding="utf-8")
+
+    changed, removed = state.scan()
+    assert sorted(p.name for p in changed) == ["m1.py", "new.py"]
+    assert [p.name for p in removed] == ["m2.py"]
+    state.update(changed, removed)
+
+    full = analyze_path(tmp_path)
+    assert state.report_lines() == [ln for ln in full if "|" in ln]
+    assert summary_of(state) == full[full.index("Summary:") - 1:]
+
+
+def test_watch_emits_initial_dashboard(tmp_path: Path):
+    (tmp_path / "a.py").write_text("# note\nx = 1\n", encoding="utf-8")
+    frames = []
+    state = watch(tmp_path, emit=frames.append, should_stop=lambda: True)
+    assert len(frames) == 1
+    assert "Summary:" in frames[0]
+    assert state.total.files == 1
+
+
+def test_watch_streams_large_files(tmp_path: Path, monkeypatch):
+    for i in range(3):
+        (tmp_path / f"m{i}.py").write_text(
+            f'"""Module {i}."""\n# add one because of retries\nx = x + {i}\n', encoding="utf-8"
+        )
+    streamed = []
+    stream_file = cli.stream_file
+
+    def spy(file, *args, **kwargs):
+        streamed.append(file)
+        return stream_file(file, *args, **kwargs)
+
+    monkeypatch.setattr(cli, "stream_file", spy)
+
+    state = WatchState(tmp_path, stream_threshold=1)
+    state.update(*state.scan())
+    assert len(streamed) == 3
+    full = analyze_path(tmp_path, stream_threshold=1)
+    assert state.report_lines() == [ln for ln in full if "|" in ln]
+    assert summary_of(state) == full[full.index("Summary:") - 1:]
+
+
+def test_small_change_sets_skip_the_process_pool(tmp_path: Path, monkeypatch):
+    for i in range(SERIAL_MAX_FILES + 1):
+        (tmp_path / f"m{i}.py").write_text(f"# add one because of retries\nx = {i}\n", encoding="utf-8")
+    pools = []
+    map_files_pool = cli._map_files_pool
+
+    def spy(files, *args, **kwargs):
+        pools.append(len(files))
+        return map_files_pool(files, *args, **kwargs)
+
+    monkeypatch.setattr(cli, "_map_files_pool", spy)
+    state = WatchState(tmp_path, jobs=2)
+    state.update(*state.scan())
+    assert pools == [SERIAL_MAX_FILES + 1]
+
+    (tmp_path / "m0.py").write_text("# changed\nx = 0\n", encoding="utf-8")
+    state.update(*state.scan())
+    assert pools == [SERIAL_MAX_FILES + 1]
+    m0 = tmp_path / "m0.py"
+    assert state.report_lines([m0]) == [ln for ln in analyze_path(m0) if "|" in ln]
+
+
+def test_debounce_only_rechecks_changed_files(tmp_path: Path, monkeypatch):
+    for i in range(3):
+        (tmp_path / f"m{i}.py").write_text("# note\nx = 1\n", encoding="utf-8")
+    scans = []
+    scan = WatchState.scan
+
+    def spy(self):
+        scans.append(1)
+        return scan(self)
+
+    monkeypatch.setattr(WatchState, "scan", spy)
+    frames = []
+
+    def emit(lines):
+        frames.append(lines)
+        if len(frames) == 1:
+            (tmp_path / "m1.py").write_text("# check the value because it may be zero\n", encoding="utf-8")
+
+    state = watch(
+        tmp_path, interval=0, debounce=0, emit=emit, should_stop=lambda: len(frames) == 2
+    )
+    # The initial scan and the poll that saw the change; the debounce
+    # loop re-stats m1.py only.
+    assert len(scans) == 2
+    assert "Updated 1 changed and 0 removed files" in frames[1][1]
+    m1 = tmp_path / "m1.py"
+    assert state.report_lines([m1]) == [ln for ln in analyze_path(m1) if "|" in ln]
+
+
+def test_recheck_counts_a_replaced_file_as_changed(tmp_path: Path):
+    a = tmp_path / "a.py"
+    a.write_text("# note\nx = 1\n", encoding="utf-8")
+    state = WatchState(tmp_path)
+    state.update(*state.scan())
+
+    a.unlink()
+    changed, removed = state.scan()
+    assert (changed, removed) == ({}, [a])
+    a.write_text("# reworded note\nx = 1\n", encoding="utf-8")
+    changed, removed = state.recheck(changed, removed)
+    assert list(changed) == [a] and removed == []
+
+
+def test_watch_prunes_the_cache_periodically(tmp_path: Path, monkeypatch):
+    (tmp_path / "a.py").write_text("# note\nx = 1\n", encoding="utf-8")
+    pruned = []
+    monkeypatch.setattr(ResultCache, "prune", lambda self: pruned.append(1) or 0)
+
+    state = WatchState(tmp_path, cache_dir=tmp_path / "cache")
+    state.update(*state.scan())
+    (tmp_path / "a.py").write_text("# changed\nx = 1\n", encoding="utf-8")
+    state.update(*state.scan())
+    assert len(pruned) == 1
+
+    monkeypatch.setattr(watch_module, "PRUNE_INTERVAL", 0.0)
+    (tmp_path / "a.py").write_text("# changed again\nx = 1\n", encoding="utf-8")
+    state.update(*state.scan())
+    assert len(pruned) == 2